@@ -6,6 +6,9 @@ __doc__ = """
 File for constructing and solving the optimization for the actor-based problem formulation.
 """
 
+# actors problem received by the current process, see ActorsProblem.execute_actors_problem
+_actors_problem = None
+
 
 class ActorsProblem(REHO):
     """
@@ -43,23 +46,26 @@ class ActorsProblem(REHO):
             self.samples = pd.DataFrame([[None, None]] * n_sample, columns=['utility_portfolio', 'owner_portfolio'])
     
         Scn_ID = self.scenario['name']
-        self.pool = mp.Pool(mp.cpu_count())
-        results = {ids: self.pool.apply_async(self.run_actors_optimization, args=(self.samples, ids)) for ids in self.samples.index}
-        while len(results[list(self.samples.index)[-1]].get()) != 3:
-            time.sleep(1)
-        for ids in self.samples.index:
-            df_Results, df_Results_MP, solver_attributes = results[ids].get()
-            self.add_df_Results_MP(Scn_ID, ids, self.iter, df_Results_MP, solver_attributes)    # store results MP (pool.apply_async don't store it)
+        pool = self.get_pool()
+        pool.execute_on_all_workers(set_actors_problem, self)  # the MP is solved in the workers, with the SP results
+        futures = {pool.submit(ids, run_actors_sample, self.samples, ids): ids for ids in self.samples.index}
+
+        def store_results(ids, res):
+            df_Results, df_Results_MP, solver_attributes = res
+            self.add_df_Results_MP(Scn_ID, ids, self.iter, df_Results_MP, solver_attributes)    # store results MP (the workers don't store it)
             self.add_df_Results(None, Scn_ID, ids, self.scenario)   # process results based on results MP
             self.get_KPIs(Scn_ID, ids)
 
+        errors = sub_problem_pool.collect_results(futures, store_results, raise_errors=False, logger=self.logger)
+        pool.execute_on_all_workers(set_actors_problem, None)
+        for ids in errors:
+            self.results_MP.setdefault(Scn_ID, {})[ids] = None  # infeasible sample
+
         self.samples["objective"] = None
         for i in self.results_MP[self.scenario["name"]]:
             if self.results_MP[self.scenario["name"]][i] is not None:
                 self.samples.loc[i, "objective"] = self.results_MP[self.scenario["name"]][i][0]["df_District"]["Objective"]["Network"]
     
-        self.pool.close()
-    
         gc.collect()  # free memory
     
     def run_actors_optimization(self, samples, ids):
@@ -67,20 +73,18 @@ class ActorsProblem(REHO):
             param = samples.iloc[ids]
             self.parameters = {'utility_portfolio_min': param['utility_portfolio'], 'owner_portfolio_min': param['owner_portfolio']}
         scenario, SP_scenario, SP_scenario_init = self.select_SP_obj_decomposition(self.scenario)
-        try:
-            scn = self.scenario["name"]
-            self.MP_iteration(scenario, Scn_ID=scn, binary=True, Pareto_ID=0)
-            self.add_df_Results(None, scn, 0, self.scenario)
-            return self.results[scn][0], self.results_MP[scn][0][self.iter], self.solver_attributes_MP
-        except:
-            return None, None
+        scn = self.scenario["name"]
+        self.MP_iteration(scenario, Scn_ID=scn, binary=True, Pareto_ID=0)
+        self.add_df_Results(None, scn, 0, self.scenario)
+        return self.results[scn][0], self.results_MP[scn][0][self.iter], self.solver_attributes_MP
     
     def read_configurations(self, path=None):
         if path is None:
             filename = 'tr_' + str(self.buildings_data["Building1"]["transformer"]) + '_' + str(len(self.buildings_data)) + '.pickle'
             path = os.path.join(path_to_configurations, filename)
         with open(path, 'rb') as reader:
-            [self.results_SP, self.feasible_solutions, self.number_SP_solutions] = pickle.load(reader)
+            [results_SP, self.feasible_solutions, self.number_SP_solutions] = pickle.load(reader)
+        self.results_SP = SubProblemResults(results_SP)
     
     def generate_configurations(self, n_sample=5, tariffs_ranges=None, delta_feed_in=0.15):
         if tariffs_ranges is None:
@@ -104,7 +108,6 @@ class ActorsProblem(REHO):
         tariffs_ranges['Electricity']['Cost_demand_cst'] = [tariffs_ranges['Electricity']['Cost_supply_cst'][0] - delta_feed_in,
                                                             tariffs_ranges['Electricity']['Cost_supply_cst'][1] - delta_feed_in]
     
-        self.pool = mp.Pool(mp.cpu_count())
         for s in samples.index:
             for layer in tariffs_ranges:
                 for param in tariffs_ranges[layer]:
@@ -116,19 +119,29 @@ class ActorsProblem(REHO):
     
             for beta in init_beta:  # execute SP for MP initialization
                 if self.method['parallel_computation']:
-                    results = {h: self.pool.apply_async(self.SP_initiation_execution, args=(SP_scenario_init, Scn_ID, s, h, None, beta)) for h in
-                               self.infrastructure.houses}
-                    while len(results[list(self.buildings_data.keys())[-1]].get()) != 2:
-                        time.sleep(1)
-                    for h in self.infrastructure.houses:
-                        (df_Results, attr) = results[h].get()
-                        self.add_df_Results_SP(Scn_ID, s, self.iter, h, df_Results, attr)
+                    SP_inputs = {h: self.get_SP_initiation_parameters(SP_scenario_init, h, None, beta) for h in self.infrastructure.houses}
+                    self.execute_SPs_with_static_data(SP_inputs, Scn_ID, s)
                 self.feasible_solutions += 1  # after each 'round' of SP execution the number of feasible solutions increases
-        self.pool.close()
+            self.release_persistent_SPs()  # the tariffs change with the sample
     
         if not os.path.exists(path_to_configurations):
             os.makedirs(path_to_configurations)
     
         filename = 'tr_' + str(self.buildings_data["Building1"]["transformer"]) + '_' + str(len(self.buildings_data)) + '.pickle'
         writer = open(os.path.join(path_to_configurations, filename), 'wb')
-        pickle.dump([self.results_SP, self.feasible_solutions, self.number_SP_solutions], writer)
+        pickle.dump([dict(self.results_SP), self.feasible_solutions, self.number_SP_solutions], writer)
+
+
+def set_actors_problem(model):
+    """
+    Keeps the actors problem in the current process, so that it is sent once per worker and not with each sample.
+    """
+    global _actors_problem
+    _actors_problem = model
+
+
+def run_actors_sample(samples, ids):
+    """
+    Solves the sample ``ids`` with the actors problem kept in the current process, see ``set_actors_problem``.
+    """
+    return _actors_problem.run_actors_optimization(samples, ids)
@@ -0,0 +1,79 @@
+######################################################################################################################
+#--------------------------------------------------------------------------------------------------------------------#
+# Coordination of the districts (e.g. LV transformer areas), each district being optimized by its own master problem
+#--------------------------------------------------------------------------------------------------------------------#
+######################################################################################################################
+
+# Sets
+set Layers;
+set District;
+set FeasibleSolutions ordered;
+
+set Period;
+param TimeStart default 1;
+param TimeEnd{p in Period};
+set Time{p in Period} := {TimeStart .. TimeEnd[p]} ordered;
+
+param dt{p in Period} default 1;       # h
+param dp{p in Period} default 1;       # days
+
+######################################################################################################################
+#--------------------------------------------------------------------------------------------------------------------#
+# Convexity constraints
+#--------------------------------------------------------------------------------------------------------------------#
+######################################################################################################################
+
+var lambda{f in FeasibleSolutions, d in District} >= 0;
+var lambda_binary{f in FeasibleSolutions, d in District} binary;
+
+subject to convexity_1{d in District}: #mu
+sum{f in FeasibleSolutions}(lambda[f,d]) = 1;
+
+subject to convexity_2{f in FeasibleSolutions, d in District}:
+lambda[f,d] <=1;
+
+subject to convexity_binary{f in FeasibleSolutions, d in District}:
+lambda[f,d] = lambda_binary[f,d];
+
+######################################################################################################################
+#--------------------------------------------------------------------------------------------------------------------#
+# Network balances
+#--------------------------------------------------------------------------------------------------------------------#
+######################################################################################################################
+
+param Grid_supply{l in Layers, f in FeasibleSolutions, d in District, p in Period, t in Time[p]} default 0;   # kW
+param Grid_demand{l in Layers, f in FeasibleSolutions, d in District, p in Period, t in Time[p]} default 0;   # kW
+param Network_capacity{l in Layers} default 1e8;
+
+var Network_supply{l in Layers, p in Period, t in Time[p]} >= 0, <= Network_capacity[l] * dp[p] * dt[p];
+var Network_demand{l in Layers, p in Period, t in Time[p]} >= 0, <= Network_capacity[l] * dp[p] * dt[p];
+
+# the exchanges between the districts are netted, only the balance is exchanged with the upper grid
+subject to complicating_cst{l in Layers, p in Period, t in Time[p]}: #pi
+   Network_supply[l,p,t] - Network_demand[l,p,t] = sum{f in FeasibleSolutions, d in District}(lambda[f,d] * (Grid_supply[l,f,d,p,t] - Grid_demand[l,f,d,p,t])) * dp[p] * dt[p];
+
+######################################################################################################################
+#--------------------------------------------------------------------------------------------------------------------#
+# Costs
+#--------------------------------------------------------------------------------------------------------------------#
+######################################################################################################################
+
+param Costs_inv_District{f in FeasibleSolutions, d in District} default 0;   # CHF/y, without the grid exchanges
+param Cost_supply_network{l in Layers, p in Period, t in Time[p]} default 0;   # CHF/kWh
+param Cost_demand_network{l in Layers, p in Period, t in Time[p]} default 0;   # CHF/kWh
+
+var Costs_op;
+var Costs_inv;
+var Costs_tot;
+
+subject to Costs_opex:
+Costs_op = sum{l in Layers, p in Period, t in Time[p]}(Cost_supply_network[l,p,t] * Network_supply[l,p,t] - Cost_demand_network[l,p,t] * Network_demand[l,p,t]);
+
+subject to Costs_capex:
+Costs_inv = sum{f in FeasibleSolutions, d in District} lambda[f,d] * Costs_inv_District[f,d];
+
+subject to total_costs:
+Costs_tot = Costs_op + Costs_inv;
+
+minimize TOTEX:
+Costs_tot;
@@ -0,0 +1,88 @@
+__doc__ = """
+File for managing the columns (feasible solutions of the sub-problems) given to the master problem.
+"""
+
+
+class ColumnPool:
+    """
+    Keeps track of the columns ``(FeasibleSolution, house)`` proposed by the sub-problems (SPs) and archives the ones
+    which are not used by the master problem (MP), so that the MP does not grow with every iteration.
+
+    A column is active as long as it has not been archived, new columns are therefore active. After each MP iteration,
+    ``update`` archives:
+
+    - the columns whose ``lambda`` has been zero for ``iter_zero`` consecutive MP iterations,
+    - the columns exceeding ``max_columns`` for a house, the least recently used first.
+
+    The incumbent columns (``lambda`` > 0 in the last MP) are never archived. Archived columns are kept with their results
+    and are restored with ``restore``, for instance when their reduced cost becomes negative.
+
+    Parameters
+    ----------
+    iter_zero : int, optional
+        Number of consecutive MP iterations with ``lambda`` = 0 after which a column is archived.
+    max_columns : int, optional
+        Maximal number of active columns per house.
+    tolerance : float
+        Value of ``lambda`` under which a column is considered unused.
+    """
+
+    def __init__(self, iter_zero=None, max_columns=None, tolerance=1e-6):
+        self.iter_zero = iter_zero
+        self.max_columns = max_columns
+        self.tolerance = tolerance
+        self.archive = set()
+        self.zero_iterations = dict()
+
+    @property
+    def enabled(self):
+        return self.iter_zero is not None or self.max_columns is not None
+
+    def is_active(self, column):
+        return tuple(column) not in self.archive
+
+    def update(self, lambdas):
+        """
+        Counts the iterations without use of the columns of the last MP and archives the columns given by the rules.
+
+        Parameters
+        ----------
+        lambdas : pd.Series
+            Values of ``lambda`` in the last MP, indexed on ``(FeasibleSolution, Hub)``.
+
+        Returns
+        -------
+        list
+            The columns archived.
+        """
+        archived = []
+        columns_house = dict()
+        for column, value in lambdas.items():
+            if not self.is_active(column):
+                continue
+            if value > self.tolerance:
+                self.zero_iterations[column] = 0
+            else:
+                self.zero_iterations[column] = self.zero_iterations.get(column, 0) + 1
+                if self.iter_zero is not None and self.zero_iterations[column] >= self.iter_zero:
+                    archived.append(column)
+                    continue
+            columns_house.setdefault(column[1], []).append(column)
+
+        if self.max_columns is not None:
+            for h, columns in columns_house.items():
+                # the most recently used columns are kept, the incumbent first
+                columns = sorted(columns, key=lambda column: (self.zero_iterations[column], -lambdas[column], -column[0]))
+                archived += [column for column in columns[self.max_columns:] if self.zero_iterations[column] > 0]
+
+        self.archive.update(archived)
+        return archived
+
+    def restore(self, columns):
+        """
+        Makes archived columns active again.
+        """
+        for column in columns:
+            column = tuple(column)
+            self.archive.discard(column)
+            self.zero_iterations[column] = 0
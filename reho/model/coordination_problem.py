@@ -0,0 +1,331 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import reho.model.sub_problem_pool as sub_problem_pool
+from reho.model.reho import *
+
+__doc__ = """
+File for the hierarchical decomposition of the districts made of several LV transformer areas.
+"""
+
+
+def split_districts(qbuildings_data, district_boundary='transformer'):
+    """
+    Splits the buildings into districts, e.g. their LV transformer area.
+
+    Parameters
+    ----------
+    qbuildings_data : dict
+        Buildings characterization, see ``QBuildingsReader.read_db``
+    district_boundary : str
+        Key of the buildings data giving the district of each building ('transformer')
+
+    Returns
+    -------
+    dict
+        Buildings characterization of each district, the facades, roofs and shadows are split along with the buildings
+    """
+    districts = dict()
+    for h, building_data in qbuildings_data['buildings_data'].items():
+        if district_boundary not in building_data:
+            raise ValueError('No district boundary for the building', h)
+        districts.setdefault(building_data[district_boundary], dict())[h] = building_data
+
+    qbuildings_districts = dict()
+    for district, buildings_data in districts.items():
+        qbuildings_districts[district] = {'buildings_data': buildings_data}
+        ids = [b['id_building'] for b in buildings_data.values() if 'id_building' in b]
+        for key in ['facades_data', 'roofs_data', 'shadows_data']:
+            if key in qbuildings_data:
+                qbuildings_districts[district][key] = qbuildings_data[key][qbuildings_data[key]['id_building'].isin(ids)]
+    return qbuildings_districts
+
+
+def optimize_district(inputs, Pareto_ID, prices=None):
+    """
+    Optimizes a district with its own REHO master problem, in a worker process.
+
+    Parameters
+    ----------
+    inputs : dict
+        Arguments of ``REHO``
+    Pareto_ID : int
+    prices : dict, optional
+        ``Cost_supply_network`` and ``Cost_demand_network`` at the boundary of the district, the tariffs of the grids by default
+
+    Returns
+    -------
+    dict
+        Results of the district (``df_Results``)
+    """
+    inputs = dict(inputs)
+    parameters = dict(inputs.pop('parameters') or {})
+    if prices is not None:
+        parameters.update(prices)
+    with REHO(parameters=parameters, **inputs) as reho:
+        reho.single_optimization(Pareto_ID=Pareto_ID)
+        return reho.results[reho.scenario['name']][Pareto_ID]
+
+
+class CoordinationProblem:
+    """
+    Two-level Dantzig-Wolfe decomposition for districts covering several LV transformer areas.
+
+    Each district (transformer area) is optimized by its own ``REHO`` master problem, in its own process. Its solution
+    is a column of the coordination problem (``coordination_problem.mod``): the exchanges of the district with the
+    upper grid and its investment costs. The coordination problem nets the exchanges between the districts and gives
+    their price (dual value ``pi``), which is the tariff of the next optimization of the districts. A district solution
+    with a negative reduced cost improves the coordination, the iterations stop when there is none left.
+
+    The coordination only applies to the TOTEX objective, the EMOO constraints of the scenario apply to each district.
+
+    Parameters
+    ----------
+    qbuildings_data : dict
+        Buildings characterization of all the districts
+    units, grids, parameters, set_indexed, cluster, method, scenario, solver, DW_params :
+        Same as ``REHO``, for the optimization of each district. The method has to be ``district-scale``.
+    coordination_params : dict, optional
+        Hyperparameters of the coordination, see ``initialise_coordination_params``
+
+    Notes
+    -----
+    - The districts are solved in a ``ProcessPoolExecutor`` by default. Any executor with the ``concurrent.futures``
+      interface can be given with ``coordination_params['executor']``, e.g. ``mpi4py.futures.MPIPoolExecutor`` to
+      solve the districts on several nodes.
+    - The district units are sized by each district and the inter-district exchanges have no cost.
+    """
+
+    def __init__(self, qbuildings_data, units, grids, parameters=None, set_indexed=None, cluster=None, method=None,
+                 scenario=None, solver="highs", DW_params=None, coordination_params=None):
+
+        self.logger = logging.getLogger(__name__)
+        self.method = initialize_default_methods(method)
+        if not self.method['district-scale']:
+            raise ValueError('The hierarchical decomposition requires the district-scale method')
+        if scenario.get('Objective', 'TOTEX') != 'TOTEX':
+            raise ValueError('The hierarchical decomposition only applies to the objective TOTEX, not', scenario['Objective'])
+
+        self.coordination_params = self.initialise_coordination_params(coordination_params)
+        self.solver = solver
+        self.scenario = scenario
+        self.districts = split_districts(qbuildings_data, self.coordination_params['district_boundary'])
+        self.inputs = {district: {'qbuildings_data': qbuildings_data_district, 'units': units, 'grids': grids, 'parameters': parameters,
+                                  'set_indexed': set_indexed, 'cluster': cluster, 'method': method, 'scenario': scenario,
+                                  'solver': solver, 'DW_params': copy.deepcopy(DW_params) if DW_params is not None else None}
+                       for district, qbuildings_data_district in self.districts.items()}
+
+        self.results = dict()
+        self.results_districts = dict()  # results of all the district solutions, indexed (Pareto_ID, iteration, district)
+        self.results_coordination = dict()  # lambda, pi, mu and costs of each coordination iteration
+        self.stopping_criteria = pd.DataFrame()
+        self.iter = 0
+
+    @staticmethod
+    def initialise_coordination_params(coordination_params):
+        """
+        Sets the default hyperparameters of the coordination.
+
+        - ``district_boundary``: key of the buildings data giving the district of each building ('transformer')
+        - ``max_iter``: maximal number of coordination iterations (5)
+        - ``threshold_reduced_cost``: reduced cost above which the district solutions are considered optimal (0)
+        - ``n_workers``: number of worker processes, one per district at most (None, one per CPU)
+        - ``executor``: executor solving the districts, ``concurrent.futures`` interface (None, local processes)
+        - ``Network_capacity``: capacity of the upper grid for each layer in kW, e.g. ``{'Electricity': 2000}`` (optional)
+        """
+        if coordination_params is None:
+            coordination_params = dict()
+        coordination_params = dict(coordination_params)
+        coordination_params.setdefault('district_boundary', 'transformer')
+        coordination_params.setdefault('max_iter', 5)
+        coordination_params.setdefault('threshold_reduced_cost', 0)
+        coordination_params.setdefault('n_workers', None)
+        coordination_params.setdefault('executor', None)
+        return coordination_params
+
+    def single_optimization(self, Pareto_ID=0):
+        """
+        Runs the coordination of the districts:
+
+        - Optimizes each district with the tariffs of the grids
+        - Solves the coordination problem with the district solutions found so far and gets the prices ``pi``
+        - Optimizes again each district with the prices ``pi`` at its boundary, until no district solution has a negative
+          reduced cost or ``coordination_params['max_iter']`` is reached
+        - Solves the coordination problem with binary ``lambda`` and keeps the selected solution of each district
+
+        The results of the districts are stored in ``results[Scn_ID][Pareto_ID][district]``.
+        """
+        Scn_ID = self.scenario['name']
+        self.iter = 0
+        self.logger.info('DISTRICTS INITIATION, Iter:' + str(self.iter) + ' Pareto_ID: ' + str(Pareto_ID))
+        self.optimize_districts(Pareto_ID)
+        self.coordination_iteration(Pareto_ID, binary=False)
+
+        while self.iter < self.coordination_params['max_iter'] - 1:
+            self.iter += 1
+            self.logger.info('DISTRICTS ITERATION, Iter:' + str(self.iter) + ' Pareto_ID: ' + str(Pareto_ID))
+            self.optimize_districts(Pareto_ID, prices=self.get_district_prices(Pareto_ID))
+            if self.check_termination_criteria(Pareto_ID):
+                break
+            self.coordination_iteration(Pareto_ID, binary=False)
+
+        self.iter += 1
+        self.logger.info('LAST COORDINATION ITERATION, Iter:' + str(self.iter) + ' Pareto_ID: ' + str(Pareto_ID))
+        self.coordination_iteration(Pareto_ID, binary=True)
+
+        lambdas = self.results_coordination[Pareto_ID][self.iter]['lambda']
+        selection = lambdas[lambdas >= 0.999].index
+        self.results.setdefault(Scn_ID, dict())[Pareto_ID] = {district: self.results_districts[(Pareto_ID, iteration, district)]
+                                                              for iteration, district in selection}
+
+    def get_executor(self):
+        if self.coordination_params['executor'] is not None:
+            return self.coordination_params['executor']
+        n_workers = sub_problem_pool.get_n_workers(self.coordination_params['n_workers'], len(self.districts))
+        return ProcessPoolExecutor(max_workers=n_workers)
+
+    def optimize_districts(self, Pareto_ID, prices=None):
+        """
+        Optimizes all the districts in parallel, each with its own master problem. Their results are the columns of
+        the current iteration.
+        """
+        executor = self.get_executor()
+        try:
+            futures = {executor.submit(optimize_district, self.inputs[district], Pareto_ID,
+                                       None if prices is None else prices[district]): district
+                       for district in order_districts(self.districts)}
+
+            def store(district, df_Results):
+                self.results_districts[(Pareto_ID, self.iter, district)] = df_Results
+
+            sub_problem_pool.collect_results(futures, store, logger=self.logger)
+        finally:
+            if self.coordination_params['executor'] is None:
+                executor.shutdown()
+
+    def get_district_column(self, df_Results):
+        """
+        Returns the exchanges of a district solution with the upper grid (kW) on the typical periods, and its investment costs.
+        """
+        df_Time = df_Results['df_Time']
+        periods = df_Time.index[:-2]  # the extreme periods are only used for the sizing of each district
+        df_grid = df_Results['df_Grid_t'].xs('Network', level='Hub')[['Grid_supply', 'Grid_demand']]
+        df_grid = df_grid[df_grid.index.get_level_values('Period').isin(periods)]
+        df_grid = df_grid.div(df_Time.dt, level='Period', axis=0)  # the exchanges of the district are given per time step
+        costs = df_Results['df_Performance'].loc['Network', 'Costs_inv']
+        return df_grid, costs
+
+    def coordination_iteration(self, Pareto_ID, binary):
+        """
+        Solves the coordination problem with all the district solutions of the current Pareto point.
+        """
+        columns = {key[1:]: self.get_district_column(df_Results) for key, df_Results in self.results_districts.items() if key[0] == Pareto_ID}
+        df_grid = pd.concat({key: column[0] for key, column in columns.items()}, names=['FeasibleSolution', 'District'])
+        df_grid = df_grid.reorder_levels(['Layer', 'FeasibleSolution', 'District', 'Period', 'Time']).sort_index()
+        costs = pd.Series({key: column[1] for key, column in columns.items()}, name='Costs_inv_District')
+        costs.index.names = ['FeasibleSolution', 'District']
+
+        df_Results = next(iter(self.results_districts.values()))
+        df_Time = df_Results['df_Time'].iloc[:-2]
+        df_tariffs = df_Results['df_Grid_t'].xs('Network', level='Hub')[['Cost_supply', 'Cost_demand']]
+        df_tariffs = df_tariffs[df_tariffs.index.get_level_values('Period').isin(df_Time.index)]
+        df_tariffs.columns = ['Cost_supply_network', 'Cost_demand_network']
+
+        ampl = self.build_coordination_problem()
+        ampl.getSet('Layers').setValues(df_grid.index.unique('Layer').to_numpy())
+        ampl.getSet('District').setValues(np.array(list(self.districts)))
+        ampl.getSet('FeasibleSolutions').setValues(df_grid.index.unique('FeasibleSolution').to_numpy())
+        ampl.getSet('Period').setValues(df_Time.index.to_numpy())
+        for parameter in ['dp', 'dt', 'TimeEnd']:
+            ampl.setData(pd.DataFrame(df_Time[parameter]))
+        ampl.setData(df_grid)
+        ampl.setData(pd.DataFrame(costs))
+        ampl.setData(df_tariffs)
+        if 'Network_capacity' in self.coordination_params:
+            ampl.getParameter('Network_capacity').setValues(self.coordination_params['Network_capacity'])
+
+        if binary:
+            ampl.getConstraint('convexity_binary').restore()
+        else:
+            ampl.getConstraint('convexity_binary').drop()
+        ampl.solve()
+        if exitcode_from_ampl(ampl) != 0:
+            raise Exception('Coordination problem did not converge')
+
+        results = dict()
+        results['lambda'] = write_results.get_ampl_data(ampl, 'lambda', multi_index=True)['lambda']
+        results['lambda'].index.names = ['FeasibleSolution', 'District']
+        results['pi'] = write_results.get_ampl_dual_values_in_pandas(ampl, 'complicating_cst', True).iloc[:, 0]
+        results['pi'].index.names = ['Layer', 'Period', 'Time']
+        results['mu'] = write_results.get_ampl_dual_values_in_pandas(ampl, 'convexity_1', False).iloc[:, 0]
+        results['df_District'] = pd.DataFrame({c: [ampl.getVariable(c).value()] for c in ['Costs_op', 'Costs_inv', 'Costs_tot']}, index=['Network'])
+        results['columns'] = columns
+        self.results_coordination.setdefault(Pareto_ID, dict())[self.iter] = results
+        self.logger.info('Coordination TOTEX: ' + str(results['df_District'].loc['Network', 'Costs_tot']))
+        del ampl
+
+    def build_coordination_problem(self):
+        if "AMPL_PATH" in os.environ:
+            try:
+                ampl = AMPL(Environment(os.environ["AMPL_PATH"]))
+            except:
+                raise Exception(f"Failed to use the local AMPL license as specified by AMPL_PATH: {os.environ['AMPL_PATH']}.")
+        else:
+            try:
+                from amplpy import modules
+                modules.load()
+                ampl = AMPL()
+            except:
+                raise Exception("No AMPL license was found. Please refer to the documentation to set the AMPL license: https://reho.readthedocs.io/en/main/sections/5_Getting_started.html#ampl-license")
+
+        ampl.setOption('solver', self.solver)
+        if not self.method['print_logs']:
+            ampl.setOption('show_stats', 0)
+            ampl.setOption('solver_msg', 0)
+        ampl.cd(path_to_ampl_model)
+        ampl.read('coordination_problem.mod')
+        return ampl
+
+    def get_district_prices(self, Pareto_ID):
+        """
+        Returns the prices at the boundary of each district given by the last coordination iteration.
+        """
+        pi = self.results_coordination[Pareto_ID][self.iter - 1]['pi']
+        prices = {'Cost_supply_network': pi, 'Cost_demand_network': pi * (1 - 1e-9)}
+        return {district: prices for district in self.districts}
+
+    def get_reduced_cost(self, df_grid, costs, pi, mu):
+        """
+        Reduced cost of a district solution: investment costs plus exchanges with the upper grid at the prices ``pi``,
+        minus the dual value of the convexity constraint of the district.
+        """
+        df_Time = next(iter(self.results_districts.values()))['df_Time']
+        exchanges = (df_grid['Grid_supply'] - df_grid['Grid_demand']).reorder_levels(pi.index.names)
+        exchanges = exchanges.mul(pi.reindex(exchanges.index)).mul(df_Time.dp * df_Time.dt, level='Period')
+        return costs + exchanges.sum() - mu
+
+    def check_termination_criteria(self, Pareto_ID):
+        """
+        Computes the reduced costs of the district solutions of the current iteration, with the dual values of the
+        last coordination iteration. Returns True if none is negative.
+        """
+        last_results = self.results_coordination[Pareto_ID][self.iter - 1]
+        reduced_costs = dict()
+        for district in self.districts:
+            df_grid, costs = self.get_district_column(self.results_districts[(Pareto_ID, self.iter, district)])
+            reduced_costs[district] = self.get_reduced_cost(df_grid, costs, last_results['pi'], last_results['mu'][district])
+
+        df = pd.DataFrame({'Pareto_ID': Pareto_ID, 'Iter': self.iter, 'District': list(reduced_costs),
+                           'reduced_cost': list(reduced_costs.values())})
+        self.stopping_criteria = pd.concat([self.stopping_criteria, df], ignore_index=True)
+        optimal = all(rc >= self.coordination_params['threshold_reduced_cost'] for rc in reduced_costs.values())
+        if optimal:
+            self.logger.info('Stopping criteria: no district solution with a negative reduced cost')
+        return optimal
+
+
+def order_districts(districts):
+    """
+    Largest districts first, so that the longest optimizations start first.
+    """
+    sizes = {district: sum(b['ERA'] for b in qbuildings_data['buildings_data'].values()) for district, qbuildings_data in districts.items()}
+    return sub_problem_pool.order_tasks(districts.keys(), sizes)
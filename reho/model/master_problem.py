@@ -1,6 +1,11 @@
+import copy
 import gc
+import hashlib
+import os
+import pickle
 import time
 import warnings
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from itertools import groupby
 
 import coloredlogs
@@ -8,6 +13,9 @@ import pandas as pd
 
 import reho.model.infrastructure as infrastructure
 import reho.model.postprocessing.write_results as write_results
+from reho.model.column_pool import ColumnPool
+from reho.model.postprocessing.results_store import SubProblemResults, is_same_SP_solution, rename_house
+import reho.model.sub_problem_pool as sub_problem_pool
 from reho.model.preprocessing.local_data import *
 from reho.model.sub_problem import *
 
@@ -68,7 +76,9 @@ class MasterProblem:
         if method['use_facades'] or method['use_pv_orientation']:
             self.qbuildings_data = qbuildings_data
         self.buildings_data = qbuildings_data['buildings_data']
-        self.ERA = sum([self.buildings_data[house]['ERA'] for house in self.buildings_data.keys()])
+        # number of buildings represented by each house, see building_aggregation.aggregate_buildings
+        self.multiplicity = pd.Series({house: self.buildings_data[house].get('multiplicity', 1) for house in self.buildings_data.keys()}, dtype=float)
+        self.ERA = sum([self.buildings_data[house]['ERA'] * self.multiplicity[house] for house in self.buildings_data.keys()])
 
         self.infrastructure = infrastructure.Infrastructure(qbuildings_data, units, grids)
         self.infrastructure_SP = dict()
@@ -113,18 +123,56 @@ class MasterProblem:
             self.DW_params = DW_params
         self.DW_params = self.initialise_DW_params(self.DW_params, self.cluster, self.buildings_data)
 
+        self.lists_SP = {"list_dual_parameters_SP": ['Cost_supply_network', 'Cost_demand_network', 'Cost_supply', 'Cost_demand',
+                                                     'GWP_supply', 'GWP_demand', 'lca_kpi_demand', 'beta_duals']
+                         }
+
         self.lists_MP = {"list_parameters_MP": ['utility_portfolio_min', 'owner_portfolio_min', 'EMOO_totex_renter', 'TransformerCapacity',
                                                 'EV_y', 'EV_plugged_out', 'n_vehicles', 'EV_capacity', 'EV_displacement_init', 'monthly_grid_connection_cost',
-                                                "area_district", "velocity", "density", "delta_enthalpy", "cinv1_dhn", "cinv2_dhn"],
+                                                "area_district", "velocity", "density", "delta_enthalpy", "cinv1_dhn", "cinv2_dhn",
+                                                'Cost_supply_network', 'Cost_demand_network'],
                          "list_constraints_MP": []
                          }
 
         self.df_fix_Units = pd.DataFrame()
         self.fix_units_list = []
 
+        self.pool = None  # worker processes solving the SPs, created at the first parallel execution, see get_pool
+        self.SP_data_sent = dict()  # fingerprint of the static data of each house sent to the workers, see get_SP_data_to_send
+        self.shared_local_data = None  # local_data in shared memory for the workers
+
+        # time spent in each stage of the optimization, see collect_stage_profile
+        profiler.enable(self.method['profile'])
+        self.stage_profile = pd.DataFrame()
+        self.SP_submission_times = dict()
+        # SP models built from an already read template, see collect_model_template_counts
+        self.model_template_counts = {'hits': 0, 'misses': 0, 'hit_rate': None}
+
     def initialize_optimization_tracking_attributes(self):
         # internal IT parameter
-        self.pool = None
+        self.SP_data_fingerprints = dict()  # fingerprint of the static data of each house in this decomposition
+        self.ampl_MP = None  # MP kept between iterations, see DW_params['persistent_MP']
+        self.persistent_MP_key = None
+        self.MP_columns = list()  # feasible solutions already given to the persistent MP
+        self.column_pool = ColumnPool(self.DW_params['iter_lambda_zero'], self.DW_params['max_columns_house'])  # see manage_columns
+        self.SP_duals = dict()  # stabilized dual values given to the SPs, see stabilize_dual_values
+        self.dual_separation = dict()
+        self.dual_center = dict()
+        self.dual_center_bound = -np.inf  # Lagrangian lower bound given by the stability center
+        self.dual_alpha = None  # weight of the stability center in the last separation point
+        self.dual_stabilized = False
+        self.dual_mispricing = False
+        self.dual_mispricings = 0  # consecutive mispricings
+        self.time_SP_iteration = time.time()
+        self.lower_bounds = dict()  # best Lagrangian lower bound of each decomposition, see check_Termination_criteria
+        self.SP_pricing = dict()  # dual values of the last solution of each SP, see reuse_SP_solutions
+        self.building_classes = dict()  # representative of each house, see get_building_classes
+        self.skipped_SPs = 0
+        self.pending_SPs = dict()  # SPs still running in the workers and their iteration, see collect_SPs_asynchronously
+        self.decomposition_position = None  # (Scn_ID, Pareto_ID) of the decomposition running, see save_checkpoint
+        self.resumed_decomposition = None
+        self.SP_sync_required = False
+        self.warm_start_duals = dict()  # dual values of the neighbouring Pareto point, see warm_start_decomposition
         self.iter = 0  # keeps track of iterations, takes value of last iteration circle
         self.feasible_solutions = 0  # keeps track how many sets of SP solutions are proposed to the MP eg '2' means two per building
         list_obj = list(self.infrastructure.lca_kpis) + ["TOTEX", "CAPEX", "OPEX", "GWP"]
@@ -137,7 +185,7 @@ class MasterProblem:
         self.number_SP_solutions = pd.DataFrame()  # records number of solutions per iteration circle
         self.number_MP_solutions = pd.DataFrame()  # records number of solutions per iteration circle
 
-        self.results_SP = dict()
+        self.results_SP = SubProblemResults()
         self.results_MP = dict()
 
         self.solver_attributes_SP = pd.DataFrame()
@@ -146,13 +194,94 @@ class MasterProblem:
 
     def __getstate__(self):
         self_dict = self.__dict__.copy()
-        if hasattr(self, 'pool'):
-            del self_dict['pool']
+        for attribute in ['pool', 'shared_local_data', 'ampl_MP', 'compact_model', 'pending_SPs']:
+            if attribute in self_dict:
+                del self_dict[attribute]
         return self_dict
 
     def __setstate__(self, state):
         self.__dict__.update(state)
 
+    # inputs of the model and attributes only valid in the current process, not saved in the checkpoints
+    checkpoint_excluded_attributes = ['local_data', 'qbuildings_data', 'buildings_data', 'infrastructure_SP', 'cluster', 'infrastructure',
+                                      'parameters', 'set_indexed', 'method', 'DW_params', 'scenario', 'solver', 'logger', 'lists_SP',
+                                      'lists_MP', 'multiplicity', 'ERA', 'nPareto', 'total_Pareto', 'df_fix_Units', 'fix_units_list',
+                                      'SP_data_sent', 'SP_data_fingerprints', 'persistent_MP_key', 'MP_columns', 'compact_model_key',
+                                      'compact_inputs_fingerprint', 'resumed_decomposition']
+
+    def save_checkpoint(self):
+        """
+        Saves the state of the optimization in the file ``method['checkpoint']``: the SP and MP results, the dual values,
+        the iteration counters and the results of the completed Pareto points. The file is replaced at each call, see
+        ``load_checkpoint``.
+        """
+        if self.method['checkpoint'] is None:
+            return
+        state = {key: value for key, value in self.__getstate__().items()
+                 if key not in self.checkpoint_excluded_attributes}
+        checkpoint_tmp = str(self.method['checkpoint']) + '.tmp'
+        with open(checkpoint_tmp, 'wb') as f:
+            pickle.dump(state, f)
+        os.replace(checkpoint_tmp, self.method['checkpoint'])
+
+    def load_checkpoint(self, checkpoint):
+        """
+        Restores the state saved by ``save_checkpoint``. The model must have been built with the same inputs.
+        The decomposition interrupted, if any, restarts after its last MP iteration, see ``decomposition_position``.
+        """
+        with open(checkpoint, 'rb') as f:
+            state = pickle.load(f)
+        self.__dict__.update(state)
+        self.resumed_decomposition = self.decomposition_position
+        self.logger.info('Resume from ' + str(checkpoint))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # data of the buildings which do not change their SP
+    building_identifiers = ['x', 'y', 'z', 'geometry', 'transformer', 'id_building', 'egid', 'multiplicity']
+
+    def get_pool(self):
+        """
+        Returns the pool of worker processes, created at the first call and reused by all the following decompositions.
+        Its size is given by ``DW_params['n_workers']``. The workers are stopped by ``close``, or otherwise when the pool
+        is garbage collected or at the exit of the interpreter.
+        """
+        if self.pool is None:
+            self.pool = sub_problem_pool.SubProblemPool(self.get_SP_order(), self.DW_params['n_workers'], self.get_SP_weights())
+        return self.pool
+
+    def get_shared_local_data(self):
+        """
+        Returns ``local_data`` as sent to the workers: with parallel computation, its large arrays are placed once in shared
+        memory (``sub_problem_pool.SharedLocalData``). The memory is freed by ``close``, or otherwise when it is garbage
+        collected or at the exit of the interpreter.
+        """
+        if not self.method['parallel_computation']:
+            return self.local_data
+        if self.shared_local_data is None:
+            self.shared_local_data = sub_problem_pool.SharedLocalData(self.local_data)
+        return self.shared_local_data
+
+    def close(self):
+        """
+        Stops the worker processes and frees the shared memory. Also called when leaving a ``with`` block.
+        """
+        self.collect_stage_profile()
+        if not self.method['profile']:
+            self.collect_model_template_counts()
+        self.release_persistent_SPs(keep_data=False)
+        self.release_persistent_MP()
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+        if self.shared_local_data is not None:
+            self.shared_local_data.close()
+            self.shared_local_data = None
+
     def select_SP_obj_decomposition(self, scenario):
         """
         The SPs in decomposition have another objective than in the compact formulation because their objective function is formulated as a reduced cost.
@@ -225,25 +354,26 @@ class MasterProblem:
         else:
             init_beta = []  # skip the initialization
 
-        for beta in init_beta:  # execute SP for MP initialization
-            if self.method['parallel_computation']:
+        self.warm_start_duals = dict()
+        if len(init_beta) > 0 and self.warm_start_decomposition(Scn_ID, Pareto_ID):
+            init_beta = self.DW_params['warm_start_beta']
 
-                # to run multiprocesses, a copy of the model is performed with pickles -> make sure there are no ampl libraries
-                results = {h: self.pool.apply_async(self.SP_initiation_execution, args=(scenario, Scn_ID, Pareto_ID, h, epsilon_init, beta)) for h in
-                           self.infrastructure.houses}
+        profiler.set_labels(Scn_ID=Scn_ID, Pareto_ID=Pareto_ID, Iter=self.iter, House=None)
 
-                # sometimes, python goes to fast and extract the results before calculating them. This step makes python wait finishing the calculations
-                while len(results[list(self.buildings_data.keys())[-1]].get()) != 2:
-                    time.sleep(1)
+        # epsilon constraints are given per house
+        self.building_classes = self.get_building_classes() if epsilon_init is None else {h: h for h in self.infrastructure.houses}
+        houses = self.get_SP_representatives(self.infrastructure.houses)
 
-                # the memory to write and share results is not parallel -> results have to be stored outside calculation
-                for h in self.infrastructure.houses:
-                    (df_Results, attr) = results[h].get()
-                    self.add_df_Results_SP(Scn_ID, Pareto_ID, self.iter, h, df_Results, attr)
+        for beta in init_beta:  # execute SP for MP initialization
+            if self.method['parallel_computation'] or self.DW_params['persistent_SP']:
+                SP_inputs = {h: self.get_SP_initiation_parameters(scenario, h, epsilon_init, beta) for h in houses}
+                self.execute_SPs_with_static_data(SP_inputs, Scn_ID, Pareto_ID)
             else:
-                for id, h in enumerate(self.infrastructure.houses):
-                    df_Results, attr = self.SP_initiation_execution(scenario, Scn_ID=Scn_ID, Pareto_ID=Pareto_ID, h=h, epsilon_init=epsilon_init, beta=beta)
+                for id, h in enumerate(houses):
+                    with profiler.labels(House=h), profiler.stage('execute_SP'):
+                        df_Results, attr = self.SP_initiation_execution(scenario, Scn_ID=Scn_ID, Pareto_ID=Pareto_ID, h=h, epsilon_init=epsilon_init, beta=beta)
                     self.add_df_Results_SP(Scn_ID, Pareto_ID, self.iter, h, df_Results, attr)
+            self.copy_SP_solutions(Scn_ID, Pareto_ID, [h for h in self.infrastructure.houses if h not in houses])
 
             self.feasible_solutions += 1  # after each 'round' of SP execution the number of feasible solutions increase
         return
@@ -278,22 +408,9 @@ class MasterProblem:
             print('INITIATE HOUSE: ' + h)
 
         # find district structure and parameter for one single building
-        buildings_data_SP, parameters_SP = self.split_parameter_sets_per_building(h)
-
-        # epsilon constraints on districts may lead to infeasibilities on building level -> apply them in MP only
-        if epsilon_init is not None and self.method['building-scale']:
-            emoo = scenario["EMOO"].copy()
-            emoo.pop("EMOO_grid")
-            if len(emoo) == 1:
-                if 'EMOO_lca' in emoo:
-                    scenario["EMOO"]["EMOO_lca"][list(emoo["EMOO_lca"].keys())[0]] = epsilon_init.loc[h]
-                else:
-                    scenario["EMOO"][list(emoo.keys())[0]] = epsilon_init.loc[h]
-            else:
-                raise warnings.warn("Multiple epsilon constraints")
-        elif not self.method['building-scale']:
-            scenario, beta_list = self.get_beta_values(scenario, beta)
-            parameters_SP['beta_duals'] = beta_list
+        scenario, parameters_SP = self.get_SP_initiation_parameters(scenario, h, epsilon_init, beta)
+        SP_inputs = (h, scenario, dict(parameters_SP))
+        buildings_data_SP, parameters_SP = self.split_parameter_sets_per_building(h, parameters_SP)
 
         if self.method['use_facades'] or self.method['use_pv_orientation']:
             REHO = SubProblem(self.infrastructure_SP[h], buildings_data_SP, self.local_data, parameters_SP, self.set_indexed, self.cluster, scenario,
@@ -304,18 +421,13 @@ class MasterProblem:
         ampl = REHO.build_model_without_solving()
 
         if self.method['fix_units']:
-            for unit in self.fix_units_list:
-                if unit == 'PV':
-                    ampl.getVariable('Units_Mult').get('PV_' + h).fix(self.df_fix_Units.Units_Mult.loc['PV_' + h] * 0.999)
-                    ampl.getVariable('Units_Use').get('PV_' + h).fix(float(self.df_fix_Units.Units_Use.loc['PV_' + h]))
-                else:
-                    ampl.getVariable('Units_Mult').get(unit + '_' + h).fix(self.df_fix_Units.Units_Mult.loc[unit + '_' + h])
-                    ampl.getVariable('Units_Use').get(unit + '_' + h).fix(float(self.df_fix_Units.Units_Use.loc[unit + '_' + h]))
+            ampl = fix_units_in_ampl(ampl, [h], self.fix_units_list, self.df_fix_Units)
 
-        ampl.solve()
+        with profiler.stage('solve_SP'):
+            ampl.solve()
         exitcode = exitcode_from_ampl(ampl)
 
-        df_Results = write_results.get_df_Results_from_SP(ampl, scenario, self.method, self.buildings_data)
+        df_Results = sub_problem_pool.get_SP_results(ampl, scenario, self.method, self.buildings_data, self.get_SP_extraction(), SP_inputs)
         attr = self.get_solver_attributes(Scn_ID, Pareto_ID, ampl)
 
         del ampl
@@ -327,6 +439,87 @@ class MasterProblem:
 
         return df_Results, attr
 
+    def get_SP_initiation_parameters(self, scenario, h, epsilon_init=None, beta=None):
+        """
+        Applies the epsilon constraints or the beta values of the initialization to the SP of house ``h``.
+
+        Returns
+        -------
+        scenario : dictionary
+            scenario of the SP
+        parameters_SP : dict
+            ``beta_duals`` if the initialization is done with beta
+        """
+        scenario = copy.deepcopy(scenario)
+        parameters_SP = dict()
+
+        # epsilon constraints on districts may lead to infeasibilities on building level -> apply them in MP only
+        if epsilon_init is not None and self.method['building-scale']:
+            emoo = scenario["EMOO"].copy()
+            emoo.pop("EMOO_grid")
+            if len(emoo) == 1:
+                if 'EMOO_lca' in emoo:
+                    scenario["EMOO"]["EMOO_lca"][list(emoo["EMOO_lca"].keys())[0]] = epsilon_init.loc[h]
+                else:
+                    scenario["EMOO"][list(emoo.keys())[0]] = epsilon_init.loc[h]
+            else:
+                raise warnings.warn("Multiple epsilon constraints")
+        elif not self.method['building-scale']:
+            scenario, beta_list = self.get_beta_values(scenario, beta)
+            parameters_SP['beta_duals'] = beta_list
+            if len(self.warm_start_duals) > 0:
+                parameters_SP.update(self.get_pricing_parameters(h, **self.warm_start_duals))
+
+        return scenario, parameters_SP
+
+    def warm_start_decomposition(self, Scn_ID, Pareto_ID):
+        """
+        Initializes the decomposition of a Pareto point from its neighbouring points (``Pareto_ID`` - 1 and + 1) already
+        solved, with ``DW_params['warm_start_pareto']``:
+
+        - the columns used by their last MPs (``lambda`` > 0) are added as feasible solutions of this point,
+        - the dual values of their last continuous MP price the SPs of the initialization, which is only done with
+          the beta values ``DW_params['warm_start_beta']``.
+
+        Returns
+        -------
+        bool
+            True if the decomposition is warm started
+        """
+        if not self.DW_params['warm_start_pareto'] or self.method['building-scale'] or self.method['include_all_solutions']:
+            return False
+        neighbours = [n for n in [Pareto_ID - 1, Pareto_ID + 1] if n in self.results_MP.get(Scn_ID, {}) and len(self.results_MP[Scn_ID][n]) > 1]
+        if len(neighbours) == 0:
+            return False
+
+        columns = dict()
+        for n in neighbours:
+            iterations = sorted(self.results_MP[Scn_ID][n])
+            for iter in iterations[-2:]:  # last continuous MP and binary MP
+                lambdas = self.results_MP[Scn_ID][n][iter]['df_DW']['lambda']
+                for f, h in lambdas[lambdas > 1e-6].index:
+                    keys = [key for key in self.results_SP.columns.get((f, h), []) if key[0:2] == (Scn_ID, n)]
+                    if len(keys) > 0 and keys[0] not in columns.setdefault(h, []):
+                        columns[h].append(keys[0])
+        if len(columns) < len(self.infrastructure.houses):
+            return False
+
+        # each feasible solution needs a column for all the houses
+        for i in range(max(len(keys) for keys in columns.values())):
+            for h in self.infrastructure.houses:
+                key = columns[h][min(i, len(columns[h]) - 1)]
+                attr = self.solver_attributes_SP.xs((h, key[2], key[3], Scn_ID, key[1]), level=('House', 'Iter', 'FeasibleSolution', 'Scn_ID', 'Pareto_ID'))
+                attr = attr.iloc[[0]].set_axis(pd.MultiIndex.from_tuples([(Scn_ID, Pareto_ID)], names=['Scn_ID', 'Pareto_ID']))
+                attr['solving_time'] = 0
+                self.add_df_Results_SP(Scn_ID, Pareto_ID, self.iter, h, self.results_SP.get_results(key), attr)
+            self.feasible_solutions += 1
+
+        n = neighbours[0]
+        iter = sorted(self.results_MP[Scn_ID][n])[-2]
+        self.warm_start_duals = {dual_variable: self.get_dual_values_SPs(Scn_ID, n, iter, None, dual_variable) for dual_variable in ['pi', 'pi_GWP', 'pi_lca']}
+        self.logger.info('Warm start of Pareto point ' + str(Pareto_ID) + ' from ' + str(neighbours) + ': ' + str(i + 1) + ' feasible solutions')
+        return True
+
     def MP_iteration(self, scenario, binary, Scn_ID=0, Pareto_ID=1, read_DHN=False):
         """
 
@@ -339,6 +532,10 @@ class MasterProblem:
         - Extracts the results (lambda, dual variables pi and mu, objective value of the MP (TOTEX, grid exchanges, ...)
         - Deletes the ampl_MP model
 
+        With ``DW_params['persistent_MP']``, the ampl_MP model is kept for the whole decomposition. The following
+        iterations only add the new feasible solutions of the SPs to the model and solve it again, starting from the
+        previous solution.
+
         Parameters
         -----------
         scenario : dictionary
@@ -353,6 +550,94 @@ class MasterProblem:
         ValueError: If the sets are not arrays or if the parameters are not arrays or floats or dataframes. Or if the MP optimization did not converge
         """
 
+        if self.method['building-scale']:
+            scenario = self.remove_emoo_constraints(scenario)
+        profiler.set_labels(Scn_ID=Scn_ID, Pareto_ID=Pareto_ID, Iter=self.iter, House=None)
+
+        MP_key = (Scn_ID, Pareto_ID, read_DHN)
+        if self.DW_params['persistent_MP'] and self.ampl_MP is not None and self.persistent_MP_key == MP_key:
+            ampl_MP = self.ampl_MP
+            new_SP_results = self.get_new_SP_results(Scn_ID, Pareto_ID)
+            if len(new_SP_results) > 0:
+                with profiler.stage('get_MP_columns'):
+                    MP_parameters, MP_set_indexed = self.get_MP_columns(new_SP_results, Scn_ID, Pareto_ID)
+                self.logger.info('Add ' + str(len(MP_set_indexed['FeasibleSolutions'])) + ' feasible solutions to the MP')
+                MP_set_indexed['FeasibleSolutions'] = np.array(self.MP_columns + list(MP_set_indexed['FeasibleSolutions']))
+                with profiler.stage('send_parameters_and_sets_to_ampl_MP'):
+                    self.send_parameters_and_sets_to_ampl_MP(ampl_MP, MP_parameters, MP_set_indexed)
+                self.MP_columns = list(MP_set_indexed['FeasibleSolutions'])
+            if self.column_pool.enabled:
+                self.fix_archived_columns(ampl_MP, self.MP_columns)
+        else:
+            self.release_persistent_MP()
+            with profiler.stage('build_MP'):
+                ampl_MP = self.build_MP(read_DHN)
+
+            with profiler.stage('get_MP_columns'):
+                MP_parameters, MP_set_indexed = self.get_MP_columns(self.get_new_SP_results(Scn_ID, Pareto_ID), Scn_ID, Pareto_ID)
+            with profiler.stage('get_MP_parameters_and_sets'):
+                MP_parameters, MP_set_indexed = self.get_MP_parameters_and_sets(MP_parameters, MP_set_indexed, read_DHN)
+            with profiler.stage('send_parameters_and_sets_to_ampl_MP'):
+                self.send_parameters_and_sets_to_ampl_MP(ampl_MP, MP_parameters, MP_set_indexed)
+            if self.column_pool.enabled:
+                self.fix_archived_columns(ampl_MP, MP_set_indexed['FeasibleSolutions'])
+
+            # select district units in exclude and enforce units
+            exclude_units = [s for s in scenario['exclude_units'] if any(xs in s for xs in ['district'])]
+            enforce_units = [s for s in scenario['enforce_units'] if any(xs in s for xs in ['district'])]
+            for i, value in ampl_MP.getVariable('Units_Use').instances():
+                for u in exclude_units:
+                    if u in i:
+                        ampl_MP.getVariable('Units_Use').get(str(i)).fix(0)
+                for u in enforce_units:
+                    if u in i:
+                        ampl_MP.getVariable('Units_Use').get(str(i)).fix(1)
+
+            ampl_MP = self.select_MP_objective(ampl_MP, scenario)
+
+            if self.DW_params['persistent_MP']:
+                self.ampl_MP = ampl_MP
+                self.persistent_MP_key = MP_key
+                self.MP_columns = list(MP_set_indexed['FeasibleSolutions'])
+
+        if binary:
+            ampl_MP.getConstraint('convexity_binary').restore()
+        else:
+            ampl_MP.getConstraint('convexity_binary').drop()
+
+        # Solve ampl_MP
+        with profiler.stage('solve_MP'):
+            ampl_MP.solve()
+
+        with profiler.stage('get_df_Results_from_MP'):
+            df_Results_MP = write_results.get_df_Results_from_MP(ampl_MP, binary, self.method, self.infrastructure, read_DHN=read_DHN, scenario=scenario)
+        self.logger.info(str(ampl_MP.getCurrentObjective().getValues().toPandas()))
+
+        df = self.get_solver_attributes(Scn_ID, Pareto_ID, ampl_MP)
+        self.add_df_Results_MP(Scn_ID, Pareto_ID, self.iter, df_Results_MP, df)
+        exitcode = exitcode_from_ampl(ampl_MP)
+
+        if not self.DW_params['persistent_MP']:
+            del ampl_MP
+            gc.collect()
+        if exitcode != 0:
+            self.release_persistent_MP()
+            raise Exception('Master problem did not converge')
+
+    def build_MP(self, read_DHN=False):
+        """
+        Creates the ampl_MP master problem, sets the options and reads the model and the frequency of the typical periods.
+
+        Parameters
+        ----------
+        read_DHN : bool
+            reads the district heating network model
+
+        Returns
+        -------
+        ampl_MP :
+            AMPL model of the MP, without data
+        """
         if "AMPL_PATH" in os.environ:
             try:
                 ampl_MP = AMPL(Environment(os.environ["AMPL_PATH"]))
@@ -397,7 +682,9 @@ class MasterProblem:
             ampl_MP.cd(path_to_district_units)
             if "EV_district" in self.infrastructure.UnitsOfDistrict:
                 ampl_MP.read('evehicle.mod')
-                self.lists_MP["list_constraints_MP"] = self.lists_MP["list_constraints_MP"] + ['unidirectional_service', 'unidirectional_service2']
+                for cst in ['unidirectional_service', 'unidirectional_service2']:
+                    if cst not in self.lists_MP["list_constraints_MP"]:
+                        self.lists_MP["list_constraints_MP"] = self.lists_MP["list_constraints_MP"] + [cst]
             if "NG_Boiler_district" in self.infrastructure.UnitsOfDistrict:
                 ampl_MP.read('ng_boiler_district.mod')
             if "HeatPump_Geothermal_district" in self.infrastructure.UnitsOfDistrict:
@@ -416,13 +703,47 @@ class MasterProblem:
         ampl_MP.readData('frequency_' + self.local_data['File_ID'] + '.dat')
         ampl_MP.cd(path_to_ampl_model)
 
-        # -------------------------------------------------------------------------------------------------------------
-        # Set Parameters, only bool to choose if including all solutions found also from other Pareto_IDs
-        # ------------------------------------------------------------------------------------------------------------
+        return ampl_MP
+
+    def get_new_SP_results(self, Scn_ID, Pareto_ID):
+        """
+        Selects the SP results given to the MP, only bool to choose if including all solutions found also from other Pareto_IDs.
+        With a persistent MP, the feasible solutions already in the model are left out. The feasible solutions whose
+        columns have all been archived (see ``manage_columns``) are left out as well.
+        """
+        if self.method['include_all_solutions']:
+            keys = self.results_SP.keys_list
+        else:
+            keys = [key for key in self.results_SP.keys_list if key[0:2] == (Scn_ID, Pareto_ID)]
+        if len(self.column_pool.archive) > 0:
+            active_solutions = {key[3] for key in keys if self.column_pool.is_active(key[3:5])}
+            keys = [key for key in keys if key[3] in active_solutions]
+        if len(self.MP_columns) == 0:
+            return self.results_SP if len(keys) == len(self.results_SP.keys_list) else self.results_SP.subset(keys)
+        MP_columns = set(self.MP_columns)
+        return self.results_SP.subset([key for key in keys if key[3] not in MP_columns])
+
+    def get_MP_columns(self, SP_results, Scn_ID, Pareto_ID):
+        """
+        Collects the parameters of the MP which are indexed on the feasible solutions of the SPs (the columns).
+
+        Parameters
+        ----------
+        SP_results : dict
+            SP results, see ``SubProblemResults``
+        Scn_ID : int
+        Pareto_ID : int
+
+        Returns
+        -------
+        MP_parameters : dict
+        MP_set_indexed : dict
+            Contains the set FeasibleSolutions
+        """
         # collect data
-        df_Performance = self.return_combined_SP_results(self.results_SP, 'df_Performance')
+        df_Performance = self.return_combined_SP_results(SP_results, 'df_Performance')
         df_Performance = df_Performance.drop(index='Network', level='Hub').groupby(level=['Scn_ID', 'Pareto_ID', 'FeasibleSolution', 'Hub']).head(1).droplevel('Hub')  # select current Scn_ID and Pareto_ID
-        df_Grid_t = np.round(self.return_combined_SP_results(self.results_SP, 'df_Grid_t'), 6)
+        df_Grid_t = np.round(self.return_combined_SP_results(SP_results, 'df_Grid_t'), 6)
 
         # prepare df to have the same index as AMPL model
         if not self.method['include_all_solutions']:
@@ -442,13 +763,38 @@ class MasterProblem:
         MP_parameters['GWP_house_constr_SPs'] = pd.DataFrame(df_Performance.GWP_constr).set_axis(['GWP_house_constr_SPs'], axis=1)
 
         if self.method['save_lca']:
-            df_lca_Units = self.return_combined_SP_results(self.results_SP, 'df_lca_Units')
+            df_lca_Units = self.return_combined_SP_results(SP_results, 'df_lca_Units')
             df_lca_Units = df_lca_Units.groupby(level=['Scn_ID', 'Pareto_ID', 'FeasibleSolution', 'house']).sum()
             MP_parameters['lca_house_units_SPs'] = df_lca_Units.droplevel(["Scn_ID", "Pareto_ID"]).stack().swaplevel(1, 2)
-            if not self.method['include_all_solutions']:
+            if not self.method['include_all_solutions'] and not self.DW_params['persistent_MP']:
                 MP_parameters['lca_house_units_SPs'] = MP_parameters['lca_house_units_SPs'].xs(self.feasible_solutions - 1, level="FeasibleSolution",
                                                                                                drop_level=False)
 
+        MP_parameters['df_grid'] = df_Grid_t[['Grid_demand', 'Grid_supply']]
+
+        # the solutions of an archetype count for all the buildings it represents
+        if (self.multiplicity != 1).any():
+            for key in ['Costs_inv_rep_SPs', 'Costs_ft_SPs', 'GWP_house_constr_SPs', 'lca_house_units_SPs', 'df_grid']:
+                if key in MP_parameters:
+                    MP_parameters[key] = MP_parameters[key].mul(self.multiplicity, axis=0, level='house')
+
+        MP_set_indexed = {}
+        MP_set_indexed['FeasibleSolutions'] = df_Performance.index.unique('FeasibleSolution').to_numpy()  # index to array as set
+
+        if self.method['actors_problem']:
+            df_Unit_t = self.return_combined_SP_results(SP_results, 'df_Unit_t').xs("Electricity", level="Layer")
+            df_PV_t = pd.DataFrame()
+            for bui in self.infrastructure.houses:
+                dummy = df_Unit_t.xs("PV_" + bui, level="Unit")
+                df_PV_t = pd.concat([df_PV_t, dummy])
+            MP_parameters["PV_prod"] = df_PV_t["Units_supply"].droplevel(["Scn_ID", "Pareto_ID", "Iter"])
+
+        return MP_parameters, MP_set_indexed
+
+    def get_MP_parameters_and_sets(self, MP_parameters, MP_set_indexed, read_DHN=False):
+        """
+        Adds the parameters and sets of the MP which do not depend on the feasible solutions of the SPs.
+        """
         MP_parameters['Grids_Parameters'] = self.infrastructure.Grids_Parameters
         MP_parameters['Grids_Parameters_lca'] = self.infrastructure.Grids_Parameters_lca
         MP_parameters['Units_flowrate'] = self.infrastructure.Units_flowrate.query('Unit.str.contains("district")')
@@ -463,8 +809,7 @@ class MasterProblem:
             if key in self.parameters.keys():
                 MP_parameters[key] = self.parameters[key]
 
-        MP_parameters['df_grid'] = df_Grid_t[['Grid_demand', 'Grid_supply']]
-        MP_parameters['ERA'] = np.asarray([self.buildings_data[house]['ERA'] for house in self.buildings_data.keys()])
+        MP_parameters['ERA'] = np.asarray([self.buildings_data[house]['ERA'] * self.multiplicity[house] for house in self.buildings_data.keys()])
         MP_parameters['Area_tot'] = self.ERA
 
         if 'EV_plugged_out' not in MP_parameters:
@@ -489,7 +834,6 @@ class MasterProblem:
         # -------------------------------------------------------------------------------------------------------------
         # Set Sets
         # ------------------------------------------------------------------------------------------------------------
-        MP_set_indexed = {}
         for sets in ['House', 'Layers', 'LayerTypes', 'LayersOfType', 'HousesOfLayer', 'Lca_kpi']:
             MP_set_indexed[sets] = self.infrastructure.Set[sets]
         MP_set_indexed['LayersOfType']['ResourceBalance'].sort()
@@ -499,19 +843,10 @@ class MasterProblem:
             lst = self.infrastructure.Set['UnitsOfLayer'][layer]
             MP_set_indexed['UnitsOfLayer'][layer] = np.array(list(filter(lambda k: 'district' in k, lst)))
 
-        MP_set_indexed['FeasibleSolutions'] = df_Performance.index.unique('FeasibleSolution').to_numpy()  # index to array as set
-
         if self.method['actors_problem']:
             # MP_parameters['Costs_tot_actors_min'] = df_Performance[["Costs_op", "Costs_inv", "Costs_rep"]].sum(axis=1).groupby("house").min()
             MP_set_indexed['ActorObjective'] = self.set_indexed["ActorObjective"]
 
-            df_Unit_t = self.return_combined_SP_results(self.results_SP, 'df_Unit_t').xs("Electricity", level="Layer")
-            df_PV_t = pd.DataFrame()
-            for bui in self.infrastructure.houses:
-                dummy = df_Unit_t.xs("PV_" + bui, level="Unit")
-                df_PV_t = pd.concat([df_PV_t, dummy])
-            MP_parameters["PV_prod"] = df_PV_t["Units_supply"].droplevel(["Scn_ID", "Pareto_ID", "Iter"])
-
         if "Heat" in self.infrastructure.grids.keys():
             if 'T_DHN_supply_cst' and 'T_DHN_return_cst' in self.parameters:
                 T_DHN_mean = (self.parameters["T_DHN_supply_cst"] + self.parameters["T_DHN_return_cst"]) / 2
@@ -536,9 +871,10 @@ class MasterProblem:
                     MP_set_indexed['UnitsOfType'][u['UnitOfType']] = np.array([])
                 MP_set_indexed['UnitsOfType'][u['UnitOfType']] = np.append(MP_set_indexed['UnitsOfType'][u['UnitOfType']], [name])
 
-        # ---------------------------------------------------------------------------------------------------------------
-        # give values to ampl
-        # ---------------------------------------------------------------------------------------------------------------
+        return MP_parameters, MP_set_indexed
+
+    @staticmethod
+    def send_parameters_and_sets_to_ampl_MP(ampl_MP, MP_parameters, MP_set_indexed):
 
         for s in MP_set_indexed:
             if isinstance(MP_set_indexed[s], np.ndarray):
@@ -551,70 +887,66 @@ class MasterProblem:
             else:
                 raise ValueError('Type Error setting AMPLPY Set', s)
 
-        # select district units in exclude and enforce units
-        exclude_units = [s for s in scenario['exclude_units'] if any(xs in s for xs in ['district'])]
-        enforce_units = [s for s in scenario['enforce_units'] if any(xs in s for xs in ['district'])]
-        for i, value in ampl_MP.getVariable('Units_Use').instances():
-            for u in exclude_units:
-                if u in i:
-                    ampl_MP.getVariable('Units_Use').get(str(i)).fix(0)
-            for u in enforce_units:
-                if u in i:
-                    ampl_MP.getVariable('Units_Use').get(str(i)).fix(1)
-
-        for i in MP_parameters:
-            if isinstance(MP_parameters[i], np.ndarray):
-                Para = ampl_MP.getParameter(i)
-                Para.setValues(MP_parameters[i])
-
-            elif isinstance(MP_parameters[i], float):
-                Para = ampl_MP.getParameter(i)
-                Para.setValues([MP_parameters[i]])
-
-            elif isinstance(MP_parameters[i], int):
-                Para = ampl_MP.getParameter(i)
-                Para.setValues([MP_parameters[i]])
-
-            elif isinstance(MP_parameters[i], pd.DataFrame):
-                if not MP_parameters[i].empty:
-                    ampl_MP.setData(MP_parameters[i])
-
-            elif isinstance(MP_parameters[i], pd.Series):
-                MP_parameters[i].name = i
-                df = pd.DataFrame(MP_parameters[i])
-                ampl_MP.setData(df)
-
-            elif isinstance(MP_parameters[i], list):
-                Para = ampl_MP.getParameter(i)
-                Para.setValues(np.array(MP_parameters[i]))
-            else:
-                raise ValueError('Type Error setting AMPLPY Parameter', i)
-
-        # -------------------------------------------------------------------------------------------------------------
-        # Set scenario and Pareto_IDs
-        # ------------------------------------------------------------------------------------------------------------
-        if self.method['building-scale']:
-            scenario = self.remove_emoo_constraints(scenario)
-
-        ampl_MP = self.select_MP_objective(ampl_MP, scenario)
-
-        if not binary:
-            ampl_MP.getConstraint('convexity_binary').drop()
+        send_parameters_to_ampl(ampl_MP, MP_parameters)
 
-        # Solve ampl_MP
-        ampl_MP.solve()
+    def fix_archived_columns(self, ampl_MP, feasible_solutions):
+        """
+        Fixes to 0 the ``lambda`` of the archived columns whose feasible solution is still in the MP, because other
+        houses still use it.
+        """
+        lambda_MP = ampl_MP.getVariable('lambda')
+        if self.DW_params['persistent_MP']:
+            lambda_MP.unfix()  # columns restored since the last iteration
+        feasible_solutions = set(feasible_solutions)
+        for f, h in self.column_pool.archive:
+            if f in feasible_solutions and h in self.infrastructure.houses:
+                lambda_MP.get(int(f), h).fix(0)
+
+    def manage_columns(self, scenario, Scn_ID=0, Pareto_ID=1):
+        """
+        Applies the rules of the column pool after a MP iteration, see ``DW_params['iter_lambda_zero']`` and
+        ``DW_params['max_columns_house']``:
 
-        df_Results_MP = write_results.get_df_Results_from_MP(ampl_MP, binary, self.method, self.infrastructure, read_DHN=read_DHN, scenario=scenario)
-        self.logger.info(str(ampl_MP.getCurrentObjective().getValues().toPandas()))
+        - Archives the columns which are not used anymore by the MP, the incumbent columns are kept
+        - Restores the archived columns whose reduced cost became negative with the last dual values
 
-        df = self.get_solver_attributes(Scn_ID, Pareto_ID, ampl_MP)
-        self.add_df_Results_MP(Scn_ID, Pareto_ID, self.iter, df_Results_MP, df)
-        exitcode = exitcode_from_ampl(ampl_MP)
+        The archived columns are left out of the next MP. The final binary MP is solved on the active columns only.
 
-        del ampl_MP
-        gc.collect()
-        if exitcode != 0:
-            raise Exception('Master problem did not converge')
+        Parameters
+        ----------
+        scenario : dictionary
+            scenario of the SPs
+        Scn_ID : int
+        Pareto_ID : int
+        """
+        if not self.column_pool.enabled:
+            return
+        archived = set(self.column_pool.update(self.results_MP[Scn_ID][Pareto_ID][self.iter]['df_DW']['lambda']))
+
+        # archived columns which were not in the last MP are priced with its dual values
+        restored = []
+        for column in self.column_pool.archive.difference(archived):
+            key = self.results_SP.columns[column][0]
+            if not self.method['include_all_solutions'] and key[0:2] != (Scn_ID, Pareto_ID):
+                continue
+            reduced_cost = self.get_reduced_cost(scenario, Scn_ID, Pareto_ID, column[1], self.results_SP.get_results(key), key[2:4])
+            if reduced_cost < self.DW_params['threshold_subP_value']:
+                restored.append(column)
+        self.column_pool.restore(restored)
+
+        self.logger.info('Column pool: ' + str(len(archived)) + ' columns archived, ' + str(len(restored)) + ' restored, ' +
+                         str(len(self.column_pool.archive)) + ' in the archive')
+
+    def release_persistent_MP(self):
+        """
+        Deletes the ampl_MP model kept during the decomposition, see ``DW_params['persistent_MP']``.
+        """
+        if self.ampl_MP is not None:
+            self.ampl_MP.close()
+            self.ampl_MP = None
+            gc.collect()  # free memory
+        self.persistent_MP_key = None
+        self.MP_columns = list()
 
     def SP_iteration(self, scenario, Scn_ID=0, Pareto_ID=1):
         """
@@ -629,27 +961,456 @@ class MasterProblem:
         Pareto_ID: int
             pareto ID
         """
+        self.time_SP_iteration = time.time()
+        profiler.set_labels(Scn_ID=Scn_ID, Pareto_ID=Pareto_ID, Iter=self.iter, House=None)
+        self.stabilize_dual_values(Scn_ID, Pareto_ID)
+        houses = self.reuse_SP_solutions(Scn_ID, Pareto_ID)
+        SP_houses = self.get_SP_representatives(houses)
+
+        if self.method['parallel_computation'] or self.DW_params['persistent_SP']:
+            SP_inputs = {h: self.get_SP_parameters(scenario, Scn_ID, Pareto_ID, h) for h in SP_houses}
+            received = self.execute_SPs_with_static_data(SP_inputs, Scn_ID, Pareto_ID, asynchronous=self.is_asynchronous())
+        else:
+            for h in SP_houses:
+                with profiler.labels(House=h), profiler.stage('execute_SP'):
+                    df_Results, attr = self.SP_execution(scenario, Scn_ID, Pareto_ID, h)
+                self.add_df_Results_SP(Scn_ID, Pareto_ID, self.iter, h, df_Results, attr)
+            received = SP_houses
+        self.copy_SP_solutions(Scn_ID, Pareto_ID, [h for h in houses if h not in SP_houses and self.building_classes[h] in received])
+        completed = self.complete_SP_round(Scn_ID, Pareto_ID)
+        # the SPs submitted at this iteration and still running are not priced with the last dual values either
+        self.skipped_SPs += len([h for h in completed if h in houses])
 
-        if self.method['parallel_computation']:
-            # to run multiprocesses, a copy of the model is performed with pickles -> make sure ampl libraries are removed
-            results = {h: self.pool.apply_async(self.SP_execution, args=(scenario, Scn_ID, Pareto_ID, h)) for h in self.infrastructure.houses}
+        self.feasible_solutions += 1  # after each 'round' of SP execution-> increase
 
-            while len(results[list(self.buildings_data.keys())[-1]].get()) != 2:
-                time.sleep(1)
-            # for now the memory which needs to be writable & shared is not parallel -> results have to be stored outside calculation
-            for h in self.infrastructure.houses:
-                (df_Results, attr) = results[h].get()
+    def execute_SPs_with_static_data(self, SP_inputs, Scn_ID=0, Pareto_ID=1, asynchronous=False):
+        """
+        Executes the SPs with the static data of each house kept in the process which solves it.
+
+        Each house is always sent to the same worker. Its static data (``get_SP_data``) is only sent when the worker
+        does not have it yet, see ``get_SP_data_to_send``, then only the scenario and the dual values are sent. With ``DW_params['persistent_SP']``, the AMPL model is also
+        kept alive between the iterations.
+
+        Parameters
+        ----------
+        SP_inputs : dict
+            scenario and parameters (dual values, beta) of the SP of each house
+        Scn_ID : int
+            scenario ID
+        Pareto_ID: int
+            pareto ID
+        asynchronous : bool
+            Returns before all the SPs are solved, see ``collect_SPs_asynchronously``.
+
+        Returns
+        -------
+        received : list
+            houses whose solution has been added
+        """
+        results = {}
+        for h in [h for h in self.get_SP_order() if h in SP_inputs]:
+            scenario_SP, parameters_SP = SP_inputs[h]
+            SP_data = self.get_SP_data_to_send(h)
+            args = (h, scenario_SP, parameters_SP, Scn_ID, Pareto_ID, self.DW_params['persistent_SP'], SP_data, self.iter, self.get_SP_extraction())
+            if self.method['parallel_computation']:
+                self.SP_submission_times[h] = time.perf_counter()
+                results[self.get_pool().submit(h, sub_problem_pool.execute_SP, *args)] = h
+            else:
+                df_Results, attr = sub_problem_pool.execute_SP(*args)
                 self.add_df_Results_SP(Scn_ID, Pareto_ID, self.iter, h, df_Results, attr)
+
+        if self.method['parallel_computation'] and asynchronous:
+            return self.collect_SPs_asynchronously(results, Scn_ID, Pareto_ID)
+        if self.method['parallel_computation']:
+            # the memory to write and share results is not parallel -> results are stored as soon as they arrive
+            sub_problem_pool.collect_results(results, lambda h, res: self.add_SP_result_from_worker(Scn_ID, Pareto_ID, h, *res), logger=self.logger)
+        return list(SP_inputs)
+
+    def add_SP_result_from_worker(self, Scn_ID, Pareto_ID, h, df_Results, attr):
+        """
+        Adds the SP solution of a worker. The profiler records the time between the submission of the SP and the
+        reception of its solution (``SP_roundtrip``): the difference with ``execute_SP`` is spent transferring the data and
+        waiting for the worker.
+        """
+        if h in self.SP_submission_times:
+            profiler.record('SP_roundtrip', time.perf_counter() - self.SP_submission_times.pop(h), House=h)
+        self.add_df_Results_SP(Scn_ID, Pareto_ID, self.iter, h, df_Results, attr)
+
+    def is_asynchronous(self):
+        return self.method['parallel_computation'] and (self.DW_params['async_fraction'] is not None or self.DW_params['async_time_budget'] is not None)
+
+    def collect_SPs_asynchronously(self, futures, Scn_ID, Pareto_ID):
+        """
+        Stores the SP solutions as they arrive and returns once ``DW_params['async_fraction']`` of the SPs running
+        have returned, or after ``DW_params['async_time_budget']`` seconds if at least one SP returned. The other SPs keep
+        running: their solutions are added to the next rounds, as soon as they arrive (see ``complete_SP_round``).
+        All the running SPs are awaited when ``SP_sync_required`` is set.
+
+        Parameters
+        ----------
+        futures : dict
+            Futures of the SPs submitted at this iteration and the corresponding house.
+        Scn_ID : int
+        Pareto_ID : int
+
+        Returns
+        -------
+        received : list
+            houses whose solution has been added at this round
+        """
+        for future, h in futures.items():
+            self.pending_SPs[future] = (h, self.iter)
+        if self.SP_sync_required or self.DW_params['async_fraction'] is None:
+            n_wait = len(self.pending_SPs)
         else:
-            for h in self.infrastructure.houses:
-                df_Results, attr = self.SP_execution(scenario, Scn_ID, Pareto_ID, h)
-                self.add_df_Results_SP(Scn_ID, Pareto_ID, self.iter, h, df_Results, attr)
+            n_wait = max(1, int(np.ceil(self.DW_params['async_fraction'] * len(self.pending_SPs))))
+        time_budget = None if self.SP_sync_required else self.DW_params['async_time_budget']
+
+        start = time.time()
+        received = []
+        while len(self.pending_SPs) > 0 and len(received) < n_wait:
+            timeout = None
+            if time_budget is not None and len(received) > 0:
+                timeout = max(0.0, time_budget - (time.time() - start))
+            done, not_done = wait(list(self.pending_SPs), timeout=timeout, return_when=FIRST_COMPLETED)
+            if len(done) == 0:
+                break
+            for future in done:
+                h, iter = self.pending_SPs.pop(future)
+                try:
+                    df_Results, attr = future.result()
+                except Exception as e:
+                    raise Exception('Sub problem of ' + h + ' failed: ' + repr(e)) from e
+                self.add_SP_result_from_worker(Scn_ID, Pareto_ID, h, df_Results, attr)
+                if h in self.SP_pricing:
+                    self.SP_pricing[h]['solution'] = (self.iter, self.feasible_solutions)
+                received.append(h)
+
+        self.SP_sync_required = False
+        if len(self.pending_SPs) > 0:
+            self.logger.info('Solve the MP with ' + str(len(received)) + ' new SP solutions, ' + str(len(self.pending_SPs)) + ' SPs still running')
+        return received
+
+    def complete_SP_round(self, Scn_ID, Pareto_ID):
+        """
+        Adds the last solution of the houses without solution at this round, whose SP is still running (see
+        ``collect_SPs_asynchronously``), so that each round of feasible solutions has a column for every house.
 
-        self.feasible_solutions += 1  # after each 'round' of SP execution-> increase
+        Returns
+        -------
+        completed : list
+            houses whose last solution has been added
+        """
+        completed = []
+        for h in self.infrastructure.houses:
+            if (self.feasible_solutions, h) in self.results_SP.columns:
+                continue
+            key = self.results_SP.last_key(Scn_ID, Pareto_ID, h)
+            attr = self.solver_attributes_SP.xs((h, key[2], key[3]), level=('House', 'Iter', 'FeasibleSolution'))
+            self.add_df_Results_SP(Scn_ID, Pareto_ID, self.iter, h, self.results_SP.get_results(key), attr)
+            completed.append(h)
+        return completed
+
+    def release_pending_SPs(self, Scn_ID, Pareto_ID):
+        """
+        Waits for the SPs still running at the end of the decomposition and adds their solutions as a last round.
+        """
+        if len(self.pending_SPs) == 0:
+            return
+        self.SP_sync_required = True
+        received = self.collect_SPs_asynchronously(dict(), Scn_ID, Pareto_ID)
+        self.copy_SP_solutions(Scn_ID, Pareto_ID, [h for h in self.infrastructure.houses if h not in received and self.building_classes.get(h, h) in received])
+        self.complete_SP_round(Scn_ID, Pareto_ID)
+        self.feasible_solutions += 1
+
+    def get_SP_extraction(self):
+        return 'column' if self.DW_params['lazy_extraction'] else 'full'
+
+    def extract_selected_SPs(self, Scn_ID, Pareto_ID):
+        """
+        With ``DW_params['lazy_extraction']``, the SPs only return the results needed by the MP (``extraction='column'``)
+        and keep their inputs under ``SP_inputs`` and their design under ``SP_design``. The full results of the columns
+        selected by the last MP are extracted, see ``set_full_SP_results``:
 
-    def SP_execution(self, scenario, Scn_ID, Pareto_ID, h):
+        - with ``DW_params['persistent_SP']``, from the AMPL model of the SP if it still holds the solution (``SP_solution``)
+        - otherwise, by solving the SP again with its inputs and the size and use of its units fixed to its design
+
+        The SPs shared by several columns (copied or reused solutions) are extracted once. When the extraction fails, the
+        results of the columns are kept.
         """
-        Inserts dual variables in ampl model, apply scenario, adapt model depending on the methods and get results.
+        if not self.DW_params['lazy_extraction']:
+            return
+        lambdas = self.results_MP[Scn_ID][Pareto_ID][self.iter]['df_DW']['lambda']
+        SP_columns = dict()
+        for column in lambdas[lambdas >= 0.999].index:
+            keys = self.results_SP.columns.get(tuple(column), [])
+            if len(keys) > 0 and 'SP_inputs' in self.results_SP.get_results(keys[0]):  # not extracted yet
+                results = self.results_SP.get_results(keys[0])
+                SP_inputs = results['SP_inputs']
+                if id(SP_inputs) not in SP_columns:
+                    design = results.get('SP_design')
+                    if design is not None and column[1] != SP_inputs[0]:  # copied solution
+                        design = rename_house({'SP_design': design}, column[1], SP_inputs[0])['SP_design']
+                    SP_columns[id(SP_inputs)] = (SP_inputs, results.get('SP_solution'), design, [])
+                SP_columns[id(SP_inputs)][3].append(tuple(column))
+
+        futures = dict()
+        with profiler.labels(Scn_ID=Scn_ID, Pareto_ID=Pareto_ID, Iter=self.iter), profiler.stage('extract_selected_SPs'):
+            for (h, scenario_SP, parameters_SP), solution, design, columns in SP_columns.values():
+                SP_data = self.get_SP_data_to_send(h)
+                args = (h, scenario_SP, parameters_SP, Scn_ID, Pareto_ID, False, SP_data, self.iter, 'full', solution, design)
+                if self.method['parallel_computation']:
+                    futures[self.get_pool().submit(h, sub_problem_pool.execute_SP, *args)] = (h, tuple(columns))
+                    continue
+                try:
+                    self.set_full_SP_results(h, columns, *sub_problem_pool.execute_SP(*args))
+                except Exception as e:
+                    self.logger.warning('The full results of the SP of ' + h + ' could not be extracted, the results of its columns are kept: ' + str(e))
+            errors = sub_problem_pool.collect_results(futures, lambda task, res: self.set_full_SP_results(*task, *res), raise_errors=False,
+                                                      logger=self.logger)
+            for (h, columns), e in errors.items():
+                self.logger.warning('The full results of the SP of ' + h + ' could not be extracted, the results of its columns are kept: ' + str(e))
+
+    def set_full_SP_results(self, h, columns, df_Results, attr):
+        """
+        Replaces the results of the ``columns`` (FeasibleSolution, house) by the full results of the SP of house ``h``,
+        see ``extract_selected_SPs``. The results are only replaced if the costs and the grid exchanges (``df_Grid_t``)
+        of the full results are the ones of the columns.
+        """
+        for column in columns:
+            results = df_Results if column[1] == h else rename_house(df_Results, h, column[1])
+            for key in list(self.results_SP.columns[column]):
+                if not is_same_SP_solution(self.results_SP.get_results(key), results):
+                    self.logger.warning('The SP of ' + column[1] + ' extracted again found another solution than the one selected by the MP, '
+                                        'the results of the column are kept')
+                    continue
+                self.results_SP.add(*key, results)
+
+    def collect_stage_profile(self):
+        """
+        With ``method['profile']``, gathers the stages recorded by the profiler in this process and in the workers into
+        ``stage_profile``, a DataFrame with one row per stage, see ``profiler.get_stage_profile``. With
+        ``method['profile_stream']``, the new records are also appended to this JSON-lines file. The hits of the SP model
+        templates are collected at the same time, see ``collect_model_template_counts``.
+        """
+        if not self.method['profile']:
+            return
+        self.collect_model_template_counts()
+        records = profiler.pop_records()
+        if self.pool is not None:
+            for worker_records in self.pool.execute_on_all_workers(profiler.pop_records):
+                records += worker_records
+        self.add_stage_records(records)
+
+    def collect_model_template_counts(self):
+        """
+        Adds the hits and misses of the SP model templates in this process and in the workers to
+        ``model_template_counts``, see ``sub_problem.get_model_template``, and updates its hit rate. Called by
+        ``collect_stage_profile`` with ``method['profile']``, otherwise only by ``close``.
+        """
+        counts = [pop_model_template_counts()]
+        if self.pool is not None:
+            counts += self.pool.execute_on_all_workers(pop_model_template_counts)
+        self.add_model_template_counts(counts)
+
+    def add_model_template_counts(self, counts):
+        n_new = 0
+        for c in counts:
+            self.model_template_counts['hits'] += c['hits']
+            self.model_template_counts['misses'] += c['misses']
+            n_new += c['hits'] + c['misses']
+        if n_new == 0:
+            return
+        n_models = self.model_template_counts['hits'] + self.model_template_counts['misses']
+        self.model_template_counts['hit_rate'] = self.model_template_counts['hits'] / n_models
+        self.logger.info('SP model templates: ' + str(self.model_template_counts['hits']) + ' hits out of ' + str(n_models) +
+                         ' models built (hit rate ' + str(round(100 * self.model_template_counts['hit_rate'], 1)) + ' %)')
+
+    def add_stage_records(self, records):
+        if len(records) == 0:
+            return
+        if self.method['profile_stream'] is not None:
+            profiler.stream_records(records, self.method['profile_stream'])
+        self.stage_profile = pd.concat([self.stage_profile, profiler.get_stage_profile(records)], ignore_index=True)
+
+    def release_persistent_SPs(self, keep_data=True):
+        """
+        Deletes the SPs kept during the decomposition, the workers keep running. With ``keep_data``, the workers also keep
+        the static data of the houses for the next decompositions, see ``get_SP_data_to_send``.
+        """
+        if self.SP_data_sent:
+            if self.pool is not None:
+                self.pool.execute_on_all_workers(sub_problem_pool.release_persistent_SPs, None, keep_data)
+            sub_problem_pool.release_persistent_SPs(list(self.SP_data_sent), keep_data)
+        if not keep_data:
+            self.SP_data_sent = dict()
+        self.SP_data_fingerprints = dict()  # the inputs may change before the next decomposition
+
+    def get_SP_data_to_send(self, h):
+        """
+        Returns the static data of house ``h`` if the process solving its SP does not have it yet, None otherwise.
+
+        The data sent is identified by its fingerprint (``get_SP_data_fingerprint``), computed once per decomposition:
+        the workers keep the data from one decomposition and Pareto point to the next, until the inputs of the house
+        change or the instance is closed. Without ``parallel_computation``, the SPs are solved in this process, whose
+        data may have been replaced by another instance: the fingerprint kept with the data is checked.
+        """
+        if h not in self.SP_data_fingerprints:
+            self.SP_data_fingerprints[h] = self.get_SP_data_fingerprint(h)
+        fingerprint = self.SP_data_fingerprints[h]
+        if self.method['parallel_computation']:
+            sent = self.SP_data_sent.get(h) == fingerprint
+        else:
+            sent = sub_problem_pool.get_SP_data_fingerprint(h) == fingerprint
+        if sent:
+            return None
+        self.SP_data_sent[h] = fingerprint
+        SP_data = self.get_SP_data(h)
+        SP_data['fingerprint'] = fingerprint
+        return SP_data
+
+    def get_SP_data_fingerprint(self, h):
+        """
+        Returns a hash of the static data of the SP of house ``h`` (``get_SP_data``): inputs of the house, see
+        ``get_building_fingerprint``, and inputs shared by the houses, hashed once per decomposition.
+        """
+        if None not in self.SP_data_fingerprints:
+            fix_units = (self.fix_units_list, self.df_fix_Units) if self.method['fix_units'] else None
+            qbuildings_data = self.qbuildings_data if self.method['use_facades'] or self.method['use_pv_orientation'] else None
+            shared_inputs = (self.buildings_data, self.set_indexed, self.cluster, self.method, self.solver, fix_units, qbuildings_data)
+            self.SP_data_fingerprints[None] = hashlib.sha1(pickle.dumps(shared_inputs)).hexdigest()
+        return hashlib.sha1((h + self.get_building_fingerprint(h) + self.SP_data_fingerprints[None]).encode()).hexdigest()
+
+    def get_building_fingerprint(self, h):
+        """
+        Returns a hash of the inputs of the SP of house ``h``: building data without its identifiers
+        (``building_identifiers``), parameters of the house and parameters of its units.
+        """
+        buildings_data_SP, parameters_SP = self.split_parameter_sets_per_building(h)
+        building_data = {key: value for key, value in self.buildings_data[h].items() if key not in self.building_identifiers}
+        units = self.infrastructure_SP[h].Units_Parameters.rename(index=lambda u: u[:-len(h)] if u.endswith(h) else u)
+
+        fingerprint = hashlib.sha1()
+        for key, value in sorted(building_data.items()) + sorted(parameters_SP.items()):
+            fingerprint.update(key.encode())
+            fingerprint.update(value.tobytes() if isinstance(value, np.ndarray) else repr(value).encode())
+        fingerprint.update(pd.util.hash_pandas_object(units.sort_index()).values.tobytes())
+        return fingerprint.hexdigest()
+
+    def get_building_classes(self):
+        """
+        Groups the houses with identical SPs (``DW_params['deduplicate_buildings']``), see ``get_building_fingerprint``.
+        The SP of the first house of each class is solved, its solutions are copied to the other houses of the class.
+        Not applied with facades, PV orientation or fixed units, which are specific to each building.
+
+        Returns
+        -------
+        building_classes : dict
+            representative house of each house
+        """
+        if not self.DW_params['deduplicate_buildings'] or self.method['use_facades'] or self.method['use_pv_orientation'] or self.method['fix_units']:
+            return {h: h for h in self.infrastructure.houses}
+
+        representatives = dict()
+        building_classes = dict()
+        for h in self.infrastructure.houses:
+            building_classes[h] = representatives.setdefault(self.get_building_fingerprint(h), h)
+        self.logger.info(str(len(representatives)) + ' classes of identical buildings among ' + str(len(building_classes)) + ' buildings')
+        return building_classes
+
+    def get_SP_representatives(self, houses):
+        """
+        Selects the houses whose SP is solved among ``houses``, the others get the solution of their representative.
+        """
+        return [h for h in houses if self.building_classes.get(h, h) == h or self.building_classes[h] not in houses]
+
+    def copy_SP_solutions(self, Scn_ID, Pareto_ID, houses):
+        """
+        Adds the last solution of the representative of each house as the solution of the house.
+        """
+        for h in houses:
+            representative = self.building_classes[h]
+            df_Results = self.results_SP[Scn_ID][Pareto_ID][self.iter][self.feasible_solutions][representative]
+            attr = self.solver_attributes_SP.xs((representative, self.iter, self.feasible_solutions), level=('House', 'Iter', 'FeasibleSolution'))
+            self.add_df_Results_SP(Scn_ID, Pareto_ID, self.iter, h, rename_house(df_Results, representative, h), attr)
+
+    def reuse_SP_solutions(self, Scn_ID, Pareto_ID):
+        """
+        Selects the houses whose SP has to be solved at this iteration. If the dual values given to the SP of a house
+        changed less than ``DW_params['dual_change_tolerance']`` since its last solution, this solution is reused as
+        the new feasible solution of the house without calling the solver. Its reduced cost is still evaluated with the
+        new dual values in ``check_Termination_criteria``.
+
+        The change is the largest relative change of ``pi`` and ``pi_GWP`` over (Layer, Period, Time), on the layers of
+        the house, and of ``beta``.
+
+        Returns
+        -------
+        houses : list
+            houses whose SP has to be solved
+        """
+        if self.iter == 1:
+            self.SP_pricing = dict()
+        tolerance = self.DW_params['dual_change_tolerance']
+        duals = {dual_variable: self.get_SP_dual_values(Scn_ID, Pareto_ID, None, dual_variable) for dual_variable in ['pi', 'pi_GWP', 'beta']}
+
+        pending = {h for h, iter in self.pending_SPs.values()}
+        houses = []
+        for h in self.infrastructure.houses:
+            if h in pending:
+                continue  # still solving, see collect_SPs_asynchronously
+            if tolerance is not None and h in self.SP_pricing and self.get_dual_change(self.SP_pricing[h]['duals'], duals, h) < tolerance:
+                Iter, FeasibleSolution = self.SP_pricing[h]['solution']
+                attr = self.solver_attributes_SP.xs((h, Iter, FeasibleSolution), level=('House', 'Iter', 'FeasibleSolution'))
+                self.add_df_Results_SP(Scn_ID, Pareto_ID, self.iter, h, self.results_SP[Scn_ID][Pareto_ID][Iter][FeasibleSolution][h], attr)
+            else:
+                houses.append(h)
+                self.SP_pricing[h] = {'duals': duals, 'solution': (self.iter, self.feasible_solutions)}
+
+        # the SPs still running are not priced with the last dual values either, see also SP_iteration
+        self.skipped_SPs = len(self.infrastructure.houses) - len(houses)
+        if self.skipped_SPs > len(pending):
+            self.logger.info('Reuse the last solution of ' + str(self.skipped_SPs - len(pending)) + ' SPs, dual values changed less than ' + str(tolerance))
+        return houses
+
+    def get_dual_change(self, duals_before, duals, h):
+        """
+        Returns the largest relative change of the dual values seen by the SP of house ``h``, see ``reuse_SP_solutions``.
+        """
+        layers = [layer for layer, houses in self.infrastructure.Set['HousesOfLayer'].items() if h in houses]
+        change = 0
+        for dual_variable, dual_value in duals.items():
+            delta = (dual_value - duals_before[dual_variable]).abs()
+            reference = duals_before[dual_variable].abs()
+            if 'Layer' in delta.index.names:
+                delta = delta[delta.index.get_level_values('Layer').isin(layers)]
+                reference = reference[reference.index.get_level_values('Layer').isin(layers)]
+            if len(delta) > 0:
+                change = max(change, delta.max() / max(reference.max(), 1e-9))
+        return change
+
+    def get_SP_weights(self):
+        """
+        Returns the expected solving effort of each SP, used to submit the longest SPs first (``DW_params['SP_order']``):
+
+        - ``largest_first``: ERA of the building
+        - ``longest_first``: solving time of the last SP of the building, ERA if not solved yet
+        """
+        if self.DW_params['SP_order'] is None:
+            return None
+        if self.DW_params['SP_order'] == 'longest_first' and not self.solver_attributes_SP.empty:
+            return self.solver_attributes_SP['solving_time'].groupby(level='House').last().to_dict()
+        return {h: self.buildings_data[h]['ERA'] for h in self.infrastructure.houses}
+
+    def get_SP_order(self):
+        """
+        Returns the houses in the order in which their SPs are submitted to the workers.
+        """
+        return sub_problem_pool.order_tasks(self.infrastructure.houses, self.get_SP_weights())
+
+    def get_SP_parameters(self, scenario, Scn_ID, Pareto_ID, h):
+        """
+        Gathers the dual variables of the last MP iteration to build the SP of the house.
 
         Parameters
         ----------
@@ -664,21 +1425,31 @@ class MasterProblem:
 
         Returns
         -------
-        df_Results :
-            results of the optimization (unit installed, power exchanged, costs, GWP emissions, ...)
-        attr :
-            results of the optimization process (CPU time, objective value, nb variables or constraints, ...)
-
-        Raises
-        ------
-        ValueError: If the SP optimization did not converge
+        scenario : dictionary
+            scenario of the SP, with the reduced cost as objective function
+        parameters_SP : dict
+            dual values and beta
         """
-        self.logger.info('iterate HOUSE: ' + h + 'iteration: ' + str(self.iter))
-
         # Give dual variables to Subproblem
-        pi = self.get_dual_values_SPs(Scn_ID, Pareto_ID, self.iter - 1, h, 'pi').reorder_levels(['Layer', 'Period', 'Time'])
-        pi_GWP = self.get_dual_values_SPs(Scn_ID, Pareto_ID, self.iter - 1, h, 'pi_GWP').reorder_levels(['Layer', 'Period', 'Time'])
+        pi = self.get_SP_dual_values(Scn_ID, Pareto_ID, h, 'pi')
+        pi_GWP = self.get_SP_dual_values(Scn_ID, Pareto_ID, h, 'pi_GWP')
         pi_lca = self.get_dual_values_SPs(Scn_ID, Pareto_ID, self.iter - 1, h, 'pi_lca')
+        parameters_SP = self.get_pricing_parameters(h, pi, pi_GWP, pi_lca)
+
+        # find objective and beta for one single building
+        beta = - self.get_SP_dual_values(Scn_ID, Pareto_ID, h, 'beta')
+        scenario, beta_list = self.get_beta_values(scenario, beta)
+        parameters_SP['beta_duals'] = beta_list
+
+        return scenario, parameters_SP
+
+    @staticmethod
+    def get_pricing_parameters(h, pi, pi_GWP, pi_lca):
+        """
+        Returns the parameters of the SP of house ``h`` giving the dual values as prices of the grid exchanges.
+        """
+        pi = pi.reorder_levels(['Layer', 'Period', 'Time'])
+        pi_GWP = pi_GWP.reorder_levels(['Layer', 'Period', 'Time'])
         pi_h = pd.concat([pi], keys=[h], names=['Building']).reorder_levels(['Building', 'Layer', 'Period', 'Time'])
 
         parameters_SP = {'Cost_supply_network': pi,
@@ -689,36 +1460,149 @@ class MasterProblem:
                          'GWP_demand': pi_GWP.mul(0),  # set emissions of feed in to 0 -> changed in  postcompute
                          'lca_kpi_demand': pi_lca.mul(0)
                          }
+        return parameters_SP
 
-        # find district structure, objective, beta and parameter for one single building
-        buildings_data_SP, parameters_SP, set_indexed_SP = self.split_parameter_sets_per_building(h, parameters_SP)
-        beta = - self.get_dual_values_SPs(Scn_ID, Pareto_ID, self.iter - 1, h, 'beta')
-        scenario, beta_list = self.get_beta_values(scenario, beta)
-        parameters_SP['beta_duals'] = beta_list
+    def get_SP_dual_values(self, Scn_ID, Pareto_ID, h, dual_variable):
+        """
+        Returns the dual values of the last MP iteration given to the SPs, stabilized if ``DW_params['dual_stabilization']``.
+        """
+        if dual_variable in self.SP_duals:
+            return self.SP_duals[dual_variable]
+        return self.get_dual_values_SPs(Scn_ID, Pareto_ID, self.iter - 1, h, dual_variable)
+
+    def stabilize_dual_values(self, Scn_ID, Pareto_ID):
+        """
+        Computes the dual values ``pi``, ``pi_GWP`` and ``beta`` given to the SPs at this iteration, to damp their
+        oscillations from one MP iteration to the next (``DW_params['dual_stabilization']``):
+
+        - ``wentges``: separation point ``alpha * center + (1 - alpha) * MP duals``
+        - ``in_out``: same separation point, at each mispricing the stability center moves to the separation point and
+          the SPs are priced again with a smaller weight ``alpha_k = max(0, 1 - k * (1 - alpha))``, k - 1 being the
+          number of consecutive mispricings, until the MP duals are reached (Pessoa et al., 2018)
+        - ``box_step``: MP duals restricted to a box of half-width ``box_step_width * |center| + box_step_abs_width``
+          around the stability center, which moves to the last separation point at each iteration
+
+        With ``wentges`` and ``in_out``, the stability center moves to the last separation point when it improved the
+        Lagrangian lower bound, see ``check_Termination_criteria``. The first iteration is priced with the MP duals. As
+        the SPs are not priced with the MP duals, SPs without a negative reduced cost for the MP duals do not prove
+        optimality (mispricing): with ``wentges`` and ``box_step``, the next iteration is then priced with the MP duals.
+
+        Parameters
+        ----------
+        Scn_ID : int
+        Pareto_ID : int
+        """
+        method = self.DW_params['dual_stabilization']
+        self.SP_duals = dict()
+        self.dual_stabilized = False
+        if method is None:
+            return
+
+        # pi and beta are the same for all houses
+        duals = {dual_variable: self.get_dual_values_SPs(Scn_ID, Pareto_ID, self.iter - 1, None, dual_variable) for dual_variable in ['pi', 'pi_GWP', 'beta']}
+        if self.iter == 1:
+            self.dual_center, self.dual_center_bound = duals, -np.inf
+            self.dual_separation = duals
+            self.dual_mispricings, self.dual_mispricing = 0, False
+            return
+
+        self.dual_mispricings = self.dual_mispricings + 1 if self.dual_mispricing else 0
+        self.dual_mispricing = False
+        lower_bound = self.lower_bounds.get((Scn_ID, Pareto_ID), -np.inf)
+        if method == 'box_step':
+            self.dual_center = self.dual_separation
+        elif lower_bound > self.dual_center_bound:
+            self.dual_center, self.dual_center_bound = self.dual_separation, lower_bound
+
+        alpha = self.DW_params['stabilization_alpha']
+        if method == 'in_out':
+            alpha = max(0.0, 1 - (self.dual_mispricings + 1) * (1 - alpha))
+        if self.dual_mispricings > 0 and (method != 'in_out' or alpha == 0):
+            self.dual_separation = duals
+            return
+
+        for dual_variable, dual_value in duals.items():
+            center = self.dual_center[dual_variable]
+            if method == 'box_step':
+                delta = self.DW_params['box_step_width'] * center.abs() + self.DW_params['box_step_abs_width']
+                self.SP_duals[dual_variable] = dual_value.clip(center - delta, center + delta)
+            else:
+                self.SP_duals[dual_variable] = alpha * center + (1 - alpha) * dual_value
+        self.dual_separation = self.SP_duals
+        self.dual_alpha = alpha
+        self.dual_stabilized = True
+
+    def get_SP_data(self, h):
+        """
+        Returns the static data needed to build the SP of house ``h`` in a worker, see ``sub_problem_pool.execute_SP``.
+        """
+        buildings_data_SP, parameters_SP = self.split_parameter_sets_per_building(h)
+        SP_data = {'infrastructure': self.infrastructure_SP[h],
+                   'buildings_data_SP': buildings_data_SP,
+                   'buildings_data': self.buildings_data,
+                   'local_data': self.get_shared_local_data(),
+                   'parameters_SP': parameters_SP,
+                   'set_indexed': self.set_indexed,
+                   'cluster': self.cluster,
+                   'method': self.method,
+                   'solver': self.solver,
+                   'qbuildings_data': None,
+                   'fix_units': None}
+        if self.method['use_facades'] or self.method['use_pv_orientation']:
+            SP_data['qbuildings_data'] = self.qbuildings_data
+        if self.method['fix_units']:
+            SP_data['fix_units'] = (self.fix_units_list, self.df_fix_Units)
+        return SP_data
+
+    def SP_execution(self, scenario, Scn_ID, Pareto_ID, h):
+        """
+        Inserts dual variables in ampl model, apply scenario, adapt model depending on the methods and get results.
+
+        Parameters
+        ----------
+        scenario: dictionary
+
+        Scn_ID : int
+            scenario ID
+        Pareto_ID : int
+            pareto ID
+        h : string
+            house ID
+
+        Returns
+        -------
+        df_Results :
+            results of the optimization (unit installed, power exchanged, costs, GWP emissions, ...)
+        attr :
+            results of the optimization process (CPU time, objective value, nb variables or constraints, ...)
+
+        Raises
+        ------
+        ValueError: If the SP optimization did not converge
+        """
+        self.logger.info('iterate HOUSE: ' + h + 'iteration: ' + str(self.iter))
+
+        scenario, parameters_SP = self.get_SP_parameters(scenario, Scn_ID, Pareto_ID, h)
+        SP_inputs = (h, scenario, dict(parameters_SP))
+        buildings_data_SP, parameters_SP = self.split_parameter_sets_per_building(h, parameters_SP)
 
         # Execute optimization
         if self.method['use_facades'] or self.method['use_pv_orientation']:
-            REHO = SubProblem(self.infrastructure_SP[h], buildings_data_SP, self.local_data, parameters_SP, set_indexed_SP, self.cluster,
-                              scenario, self.method, self.solver, self.qbuildings_data)
+            REHO = SubProblem(self.infrastructure_SP[h], buildings_data_SP, self.local_data, parameters_SP, self.set_indexed, self.cluster, scenario,
+                              self.method, self.solver, self.qbuildings_data)
         else:
-            REHO = SubProblem(self.infrastructure_SP[h], buildings_data_SP, self.local_data, parameters_SP, set_indexed_SP, self.cluster,
-                              scenario, self.method, self.solver)
-
+            REHO = SubProblem(self.infrastructure_SP[h], buildings_data_SP, self.local_data, parameters_SP, self.set_indexed, self.cluster, scenario,
+                              self.method, self.solver)
         ampl = REHO.build_model_without_solving()
 
         if self.method['fix_units']:
-            for unit in self.fix_units_list:
-                if unit == 'PV':
-                    ampl.getVariable('Units_Mult').get('PV_' + h).fix(self.df_fix_Units.Units_Mult.loc['PV_' + h] * 0.999)
-                    ampl.getVariable('Units_Use').get('PV_' + h).fix(float(self.df_fix_Units.Units_Use.loc['PV_' + h]))
-                else:
-                    ampl.getVariable('Units_Mult').get(unit + '_' + h).fix(self.df_fix_Units.Units_Mult.loc[unit + '_' + h])
-                    ampl.getVariable('Units_Use').get(unit + '_' + h).fix(float(self.df_fix_Units.Units_Use.loc[unit + '_' + h]))
+            ampl = fix_units_in_ampl(ampl, [h], self.fix_units_list, self.df_fix_Units)
 
-        ampl.solve()
+        with profiler.stage('solve_SP'):
+            ampl.solve()
         exitcode = exitcode_from_ampl(ampl)
 
-        df_Results = write_results.get_df_Results_from_SP(ampl, scenario, self.method, self.buildings_data)
+        df_Results = sub_problem_pool.get_SP_results(ampl, scenario, self.method, self.buildings_data, self.get_SP_extraction(), SP_inputs)
         attr = self.get_solver_attributes(Scn_ID, Pareto_ID, ampl)
 
         del ampl
@@ -737,7 +1621,14 @@ class MasterProblem:
 
         - Optimal solution found based on reduced costs -> last solutions proposed by the SPs did not improve the MP
         - No improvements
+        - Relative gap between the MP objective and the Lagrangian lower bound below ``DW_params['gap_threshold']``
 
+        The Lagrangian lower bound is the objective of the previous MP plus the negative reduced costs of the SPs priced
+        with its dual values. After a mispricing of ``in_out``, the bound at the separation point is at least
+        ``alpha * center bound + (1 - alpha) * previous MP objective``. The bound is only valid if the SPs are solved to
+        optimality: as they stop at the MIP gap of the solver, their reduced costs may be above the optimal ones and the
+        gap is only approximate. The bound is not updated at the other iterations priced with stabilized dual values nor
+        with reused SP solutions. The bound and the gap are stored in ``solver_attributes_MP``.
 
         Returns
         -------
@@ -767,69 +1658,64 @@ class MasterProblem:
         # optimal solution found based on reduced costs
         # --------------------------------------------------------------
         last_SP_results = self.results_SP[Scn_ID][Pareto_ID][self.iter][self.feasible_solutions - 1]
-        Cop = pd.DataFrame(dtype='float')
-        Cinv = pd.DataFrame(dtype='float')
-
-        for h in last_SP_results:
-            df_Grid_t = pd.concat([last_SP_results[h]["df_Grid_t"]], keys=[(self.iter, self.feasible_solutions - 1, h)],
-                                  names=['Iter', 'FeasibleSolution', 'house'])
-            df_Grid_t = df_Grid_t.xs(h, level='Hub')
-            pi = self.get_dual_values_SPs(Scn_ID, Pareto_ID, self.iter, h, 'pi')
-            pi_GWP = self.get_dual_values_SPs(Scn_ID, Pareto_ID, self.iter, h, 'pi_GWP')
-            pi_lca = self.get_dual_values_SPs(Scn_ID, Pareto_ID, self.iter, h, 'pi_lca')
-
-            # Operation impact
-            Cop_h = self.get_annual_grid_opex(df_Grid_t, cost_demand=pi, cost_supply=pi)
-            Cop_h_GWP = self.get_annual_grid_opex(df_Grid_t, cost_demand=pi_GWP, cost_supply=pi_GWP)
-            Cop_h_lca = [self.get_annual_grid_opex(df_Grid_t, cost_demand=pi_lca.xs(kpi), cost_supply=pi_lca.xs(kpi)) for kpi in self.infrastructure.lca_kpis]
-            Cop_h_lca = pd.concat(Cop_h_lca, axis=1)
-            Cop_h = pd.concat([Cop_h, Cop_h_GWP, Cop_h_lca], axis=1)
-            Cop_h.columns = ["TOTEX", "GWP"] + list(self.infrastructure.lca_kpis)
-            Cop = pd.concat([Cop, Cop_h])
-
-            # Investment impact
-            df = last_SP_results[h]["df_Performance"].iloc[0]
-            Cinv_h = pd.Series(df.Costs_rep + df.Costs_inv, index=["TOTEX"])
-            Cinv_h_GWP = pd.Series(df.GWP_constr, index=["GWP"])
-            if self.method['save_lca']:
-                Cinv_h_lca = last_SP_results[h]["df_lca_Units"].sum()
-                Cinv_h = pd.DataFrame(pd.concat([Cinv_h, Cinv_h_GWP, Cinv_h_lca])).transpose()
-            else:
-                Cinv_h = pd.DataFrame(pd.concat([Cinv_h, Cinv_h_GWP])).transpose()
-            Cinv_h.index = Cop_h.index
-            Cinv = pd.concat([Cinv, Cinv_h])
-
-        # calculate objective function for each Pareto_ID with latest dual values
         reduced_cost = pd.DataFrame()
         for h in last_SP_results:
-            mu = self.get_dual_values_SPs(Scn_ID, Pareto_ID, self.iter, h, 'mu')
-            Cop_house = Cop.xs((self.iter, self.feasible_solutions - 1, h))
-            Cinv_house = Cinv.xs((self.iter, self.feasible_solutions - 1, h))
-            obj_fct = pd.Series( [Cinv_house["TOTEX"], Cop_house["TOTEX"]], index=["CAPEX", "OPEX"])
-            impacts = Cop_house + Cinv_house
-            obj_fct = pd.concat([obj_fct, impacts.replace(np.nan, 0)])
-
-            beta = - self.get_dual_values_SPs(Scn_ID, Pareto_ID, self.iter, h, "beta")
-            if beta.sum() == 0 and len(scenario["EMOO"].keys()) > 1:
-                warnings.warn('beta value = 0')
-            beta_penalty = sum(beta * obj_fct)
-
-            Costs_ft = last_SP_results[h]["df_Performance"].iloc[0].Costs_ft
-            reduced_cost_h = obj_fct[scenario['Objective']] + Costs_ft + beta_penalty - mu
-            reduced_cost.at[h, 'Reduced_cost'] = reduced_cost_h
+            reduced_cost.at[h, 'Reduced_cost'] = self.get_reduced_cost(scenario, Scn_ID, Pareto_ID, h, last_SP_results[h],
+                                                                       (self.iter, self.feasible_solutions - 1))
 
         if (reduced_cost.Reduced_cost >= self.DW_params['threshold_subP_value']).all():
             optimal_criteria = True
         else:
             optimal_criteria = False
+        reduced_cost_SPs = None
+        if self.skipped_SPs == 0:
+            # reduced costs for the dual values of the previous MP, the ones the SPs were priced with (or stabilized from)
+            reduced_cost_SPs = [self.get_reduced_cost(scenario, Scn_ID, Pareto_ID, h, last_SP_results[h], (self.iter, self.feasible_solutions - 1),
+                                                      iter=self.iter - 1) for h in last_SP_results]
+        if self.dual_stabilized:
+            # the SPs were not priced with the dual values of the MP: mispricing if they give no column with a negative
+            # reduced cost for these dual values
+            optimal_criteria = False
+            self.dual_mispricing = reduced_cost_SPs is not None and min(reduced_cost_SPs) >= self.DW_params['threshold_subP_value']
+        if optimal_criteria and self.skipped_SPs > 0:
+            # some SPs were not solved with the last dual values -> solve all of them again
+            optimal_criteria = False
+            self.SP_pricing = dict()
+            self.SP_sync_required = True
+
+        # --------------------------------------------------------------
+        # optimality gap based on the Lagrangian lower bound
+        # --------------------------------------------------------------
+        lower_bound = None
+        if not self.dual_stabilized and reduced_cost_SPs is not None:
+            lower_bound = solving_attributes.val_objective.loc[self.iter - 1] + sum(min(rc, 0) for rc in reduced_cost_SPs)
+        elif self.dual_mispricing and self.DW_params['dual_stabilization'] == 'in_out':
+            # bound at the separation point after a mispricing, see stabilize_dual_values
+            lower_bound = self.dual_alpha * self.dual_center_bound + (1 - self.dual_alpha) * solving_attributes.val_objective.loc[self.iter - 1]
+        if lower_bound is not None:
+            self.lower_bounds[(Scn_ID, Pareto_ID)] = max(lower_bound, self.lower_bounds.get((Scn_ID, Pareto_ID), -np.inf))
+        lower_bound = self.lower_bounds.get((Scn_ID, Pareto_ID), -np.inf)
+        val_objective = solving_attributes.val_objective.iloc[-1]
+        gap = (val_objective - lower_bound) / abs(val_objective) if val_objective != 0 else val_objective - lower_bound
+        self.solver_attributes_MP.loc[(self.iter, Scn_ID, Pareto_ID), ['lower_bound', 'gap']] = [lower_bound, gap]
+        self.logger.info('Lagrangian lower bound: ' + str(lower_bound) + ', gap: ' + str(gap))
+        gap_criteria = self.DW_params['gap_threshold'] is not None and gap <= self.DW_params['gap_threshold']
 
         # --------------------------------------------------------------
         # construct dataframe
         # --------------------------------------------------------------
         mux = pd.MultiIndex.from_tuples([(Scn_ID, Pareto_ID, self.iter)], names=['Scn_ID', 'Pareto_ID', 'Iter'])
-        df = pd.DataFrame([[iter_criteria, optimal_criteria]], columns=['max_iter_no_improv_reached', 'all_optimal'], index=mux)
+        df = pd.DataFrame([[iter_criteria, optimal_criteria, gap_criteria]], columns=['max_iter_no_improv_reached', 'all_optimal', 'gap_reached'], index=mux)
 
         df_value = pd.DataFrame([[no_improvments, reduced_cost.sum()]], columns=['iterations_no_improvement', 'total_reduced_cost'], index=mux)
+        df_value['time_iteration'] = time.time() - self.time_SP_iteration
+        if self.column_pool.enabled:
+            df_value['archived_columns'] = len(self.column_pool.archive)
+        if self.DW_params['dual_change_tolerance'] is not None or self.is_asynchronous():
+            df_value['skipped_SPs'] = self.skipped_SPs
+        if self.DW_params['dual_stabilization'] is not None:
+            df_value['dual_stabilization'] = self.DW_params['dual_stabilization'] if self.dual_stabilized else None
+            df_value['mispricing'] = self.dual_mispricing
         df_criteria = pd.concat([df, df_value], axis=1)
         self.stopping_criteria = pd.concat([self.stopping_criteria, df_criteria])
 
@@ -839,6 +1725,73 @@ class MasterProblem:
 
         return df.any(axis=None)
 
+    def get_reduced_cost(self, scenario, Scn_ID, Pareto_ID, h, SP_results_h, column_id, iter=None):
+        """
+        Computes the reduced cost of a SP solution of house ``h`` with the dual values of the current MP iteration, or of
+        the MP iteration ``iter``.
+
+        Parameters
+        ----------
+        scenario : dictionary
+            scenario of the SPs
+        Scn_ID : int
+        Pareto_ID : int
+        h : string
+            house ID
+        SP_results_h : dict
+            results of the SP solution
+        column_id : tuple
+            ``(Iter, FeasibleSolution)`` of the SP solution
+        iter : int, optional
+            MP iteration of the dual values
+
+        Returns
+        -------
+        reduced_cost : float
+        """
+        if iter is None:
+            iter = self.iter
+        df_Grid_t = pd.concat([SP_results_h["df_Grid_t"]], keys=[(*column_id, h)], names=['Iter', 'FeasibleSolution', 'house'])
+        df_Grid_t = df_Grid_t.xs(h, level='Hub')
+        pi = self.get_dual_values_SPs(Scn_ID, Pareto_ID, iter, h, 'pi')
+        pi_GWP = self.get_dual_values_SPs(Scn_ID, Pareto_ID, iter, h, 'pi_GWP')
+        pi_lca = self.get_dual_values_SPs(Scn_ID, Pareto_ID, iter, h, 'pi_lca')
+
+        # Operation impact
+        Cop_h = self.get_annual_grid_opex(df_Grid_t, cost_demand=pi, cost_supply=pi)
+        Cop_h_GWP = self.get_annual_grid_opex(df_Grid_t, cost_demand=pi_GWP, cost_supply=pi_GWP)
+        Cop_h_lca = [self.get_annual_grid_opex(df_Grid_t, cost_demand=pi_lca.xs(kpi), cost_supply=pi_lca.xs(kpi)) for kpi in self.infrastructure.lca_kpis]
+        Cop_h_lca = pd.concat(Cop_h_lca, axis=1)
+        Cop_h = pd.concat([Cop_h, Cop_h_GWP, Cop_h_lca], axis=1)
+        Cop_h.columns = ["TOTEX", "GWP"] + list(self.infrastructure.lca_kpis)
+
+        # Investment impact
+        df = SP_results_h["df_Performance"].iloc[0]
+        Cinv_h = pd.Series(df.Costs_rep + df.Costs_inv, index=["TOTEX"])
+        Cinv_h_GWP = pd.Series(df.GWP_constr, index=["GWP"])
+        if self.method['save_lca']:
+            Cinv_h_lca = SP_results_h["df_lca_Units"].sum()
+            Cinv_h = pd.DataFrame(pd.concat([Cinv_h, Cinv_h_GWP, Cinv_h_lca])).transpose()
+        else:
+            Cinv_h = pd.DataFrame(pd.concat([Cinv_h, Cinv_h_GWP])).transpose()
+        Cinv_h.index = Cop_h.index
+
+        # objective function with latest dual values
+        mu = self.get_dual_values_SPs(Scn_ID, Pareto_ID, iter, h, 'mu')
+        Cop_house = Cop_h.xs((*column_id, h))
+        Cinv_house = Cinv_h.xs((*column_id, h))
+        obj_fct = pd.Series([Cinv_house["TOTEX"], Cop_house["TOTEX"]], index=["CAPEX", "OPEX"])
+        impacts = Cop_house + Cinv_house
+        obj_fct = pd.concat([obj_fct, impacts.replace(np.nan, 0)])
+
+        beta = - self.get_dual_values_SPs(Scn_ID, Pareto_ID, iter, h, "beta")
+        if beta.sum() == 0 and len(scenario["EMOO"].keys()) > 1:
+            warnings.warn('beta value = 0')
+        beta_penalty = sum(beta * obj_fct)
+
+        Costs_ft = SP_results_h["df_Performance"].iloc[0].Costs_ft
+        return self.multiplicity[h] * (obj_fct[scenario['Objective']] + Costs_ft + beta_penalty) - mu
+
     ####################################################################################################################
     #
     # THE FOLLOWING ATTRIBUTES ARE DOING DATA PROCESSING
@@ -846,6 +1799,32 @@ class MasterProblem:
     ####################################################################################################################
 
     def initialise_DW_params(self, DW_params, cluster, buildings_datas):
+        """
+        Sets the default hyperparameters of the decomposition.
+
+        - ``max_iter``: maximal number of iterations (15)
+        - ``iter_no_improv``: number of iterations without improvement of the MP objective before stopping (5)
+        - ``threshold_no_improv``: relative improvement of the MP objective below which an iteration has no improvement (5e-5)
+        - ``threshold_subP_value``: reduced cost above which the SPs are considered optimal (0)
+        - ``persistent_SP``: keeps the AMPL model of each SP alive during the decomposition, only the dual values are sent at each iteration (False)
+        - ``n_workers``: number of worker processes solving the SPs in parallel (None, one per CPU)
+        - ``SP_order``: order in which the SPs are submitted to the workers, ``largest_first``, ``longest_first`` or None ('largest_first')
+        - ``persistent_MP``: keeps the AMPL model of the MP during the decomposition, only the new feasible solutions are added at each iteration (False)
+        - ``iter_lambda_zero``: number of consecutive MP iterations with lambda = 0 after which a SP solution is archived out of the MP (None, never)
+        - ``max_columns_house``: maximal number of SP solutions per house in the MP, the least recently used are archived (None, no limit)
+        - ``dual_stabilization``: stabilization of the dual values given to the SPs, ``wentges``, ``in_out``, ``box_step`` or None (None)
+        - ``stabilization_alpha``: weight of the stability center for ``wentges`` and ``in_out`` (0.5)
+        - ``box_step_width``: relative half-width of the box around the stability center for ``box_step`` (0.2)
+        - ``box_step_abs_width``: absolute half-width added to the box of ``box_step``, for the dual values close to 0 (0.01)
+        - ``dual_change_tolerance``: relative change of the dual values below which the last solution of a SP is reused instead of solving it again (None, always solved)
+        - ``deduplicate_buildings``: solves a single SP for the buildings with identical inputs, see ``get_building_classes`` (False)
+        - ``gap_threshold``: relative gap between the MP objective and the Lagrangian lower bound below which the decomposition stops (None). The bound assumes SPs solved to optimality, whereas they stop at the MIP gap of the solver (1e-4 by default with Gurobi): the gap is approximate and may be underestimated
+        - ``warm_start_pareto``: initializes the decomposition of a Pareto point with the columns and the dual values of the neighbouring points already solved, see ``warm_start_decomposition`` (False)
+        - ``warm_start_beta``: beta values of the initialization with ``warm_start_pareto`` ([1.0])
+        - ``async_fraction``: with ``parallel_computation``, fraction of the running SPs awaited before solving the MP again, the late SPs add their solutions to the next MP, see ``collect_SPs_asynchronously`` (None, all)
+        - ``async_time_budget``: with ``parallel_computation``, time in seconds after which the MP is solved again with the SPs returned so far (None, no limit)
+        - ``lazy_extraction``: the SPs only return the results needed by the MP, the full results of the columns selected by the binary MP are extracted at the end, see ``extract_selected_SPs`` (False)
+        """
         if 'timesteps' not in DW_params:
             DW_params['timesteps'] = cluster['Periods'] * cluster['PeriodDuration'] + 2
         if 'max_iter' not in DW_params:
@@ -862,6 +1841,44 @@ class MasterProblem:
             DW_params['grid_cost_exchange'] = 0.0
         if 'weight_lagrange_cst' not in DW_params:
             DW_params['weight_lagrange_cst'] = 2.0
+        if 'persistent_SP' not in DW_params:
+            DW_params['persistent_SP'] = False
+        if 'n_workers' not in DW_params:
+            DW_params['n_workers'] = None
+        if 'SP_order' not in DW_params:
+            DW_params['SP_order'] = 'largest_first'
+        if 'persistent_MP' not in DW_params:
+            DW_params['persistent_MP'] = False
+        if 'iter_lambda_zero' not in DW_params:
+            DW_params['iter_lambda_zero'] = None
+        if 'max_columns_house' not in DW_params:
+            DW_params['max_columns_house'] = None
+        if 'dual_stabilization' not in DW_params:
+            DW_params['dual_stabilization'] = None
+        elif DW_params['dual_stabilization'] not in [None, 'wentges', 'in_out', 'box_step']:
+            raise ValueError('Unknown dual stabilization', DW_params['dual_stabilization'])
+        if 'dual_change_tolerance' not in DW_params:
+            DW_params['dual_change_tolerance'] = None
+        if 'deduplicate_buildings' not in DW_params:
+            DW_params['deduplicate_buildings'] = False
+        if 'gap_threshold' not in DW_params:
+            DW_params['gap_threshold'] = None
+        if 'warm_start_pareto' not in DW_params:
+            DW_params['warm_start_pareto'] = False
+        if 'warm_start_beta' not in DW_params:
+            DW_params['warm_start_beta'] = [1.0]
+        if 'async_fraction' not in DW_params:
+            DW_params['async_fraction'] = None
+        if 'async_time_budget' not in DW_params:
+            DW_params['async_time_budget'] = None
+        if 'lazy_extraction' not in DW_params:
+            DW_params['lazy_extraction'] = False
+        if 'stabilization_alpha' not in DW_params:
+            DW_params['stabilization_alpha'] = 0.5
+        if 'box_step_width' not in DW_params:
+            DW_params['box_step_width'] = 0.2
+        if 'box_step_abs_width' not in DW_params:
+            DW_params['box_step_abs_width'] = 0.01
         if self.method['building-scale']:
             DW_params['max_iter'] = 1
 
@@ -878,7 +1895,7 @@ class MasterProblem:
         MP_selection = lambdas[lambdas >= 0.999].index
 
         # get selected Units
-        df_Unit_all = self.return_combined_SP_results(self.results_SP, 'df_Unit')
+        df_Unit_all = self.results_SP.select('df_Unit', MP_selection.values).sort_index()
         df_Unit_all = df_Unit_all.reset_index(level='Unit')
 
         # drop useless indices
@@ -1071,20 +2088,7 @@ class MasterProblem:
         df : pd.DataFrame
             Information on the optimization (CPU time, nb constraints, ...)
         """
-        time = ampl.getValue('_total_solve_time')
-        constr = ampl.getValue('_ncons')
-        pres_constr = ampl.getValue('_sncons')  # after presolve
-        var = ampl.getValue('_nvars')
-        pres_var = ampl.getValue('_snvars')  # after presolve
-        binaries = ampl.getValue('_snbvars')  # after presolve
-        integer = ampl.getValue('_snivars')  # after presolve
-        no_ojectives = ampl.getValue('_snobjs')  # after presolve
-        val_objectives = ampl.getCurrentObjective().getValues().toList()[0]
-
-        mux = pd.MultiIndex.from_tuples([(Scn_ID, Pareto_ID)], names=['Scn_ID', 'Pareto_ID'])
-        df = pd.DataFrame([[time, constr, pres_constr, var, pres_var, binaries, integer, no_ojectives, val_objectives]], index=mux,
-                          columns=['solving_time', 'constraints', 'presolve_constraints', 'variables', 'presolve_variables',
-                                   'presolve_binaries', 'presolve_integer', 'no_objective', 'val_objective'])
+        df = get_solver_attributes_from_ampl(Scn_ID, Pareto_ID, ampl)
 
         if not self.method['district-scale']:  # for decompose method, stored in solver_attributes_MP or _SP
             self.solver_attributes = pd.concat([self.solver_attributes, df])
@@ -1100,6 +2104,7 @@ class MasterProblem:
             new_order_MPresults[id + 1] = self.results_MP[Scn_ID][sc]
 
         self.results_SP[Scn_ID] = new_order_SPresults
+        self.results_SP.reindex()
         self.results_MP[Scn_ID] = new_order_MPresults
         self.number_SP_solutions = self.number_SP_solutions.sort_values(['Pareto_ID', 'FeasibleSolution'])
         self.number_MP_solutions = self.number_MP_solutions.sort_values(['Pareto_ID', 'FeasibleSolution'])
@@ -1110,18 +2115,7 @@ class MasterProblem:
 
     def add_df_Results_SP(self, Scn_ID, Pareto_ID, iter, house, df_Results, attr):
 
-        if Scn_ID not in self.results_SP:
-            self.results_SP[Scn_ID] = {}
-        if Pareto_ID not in self.results_SP[Scn_ID]:
-            self.results_SP[Scn_ID][Pareto_ID] = {}
-        if iter not in self.results_SP[Scn_ID][Pareto_ID]:
-            self.results_SP[Scn_ID][Pareto_ID][iter] = {}
-        if self.feasible_solutions not in self.results_SP[Scn_ID][Pareto_ID][iter]:
-            self.results_SP[Scn_ID][Pareto_ID][iter][self.feasible_solutions] = {}
-        if house not in self.results_SP[Scn_ID][Pareto_ID][iter][self.feasible_solutions]:
-            self.results_SP[Scn_ID][Pareto_ID][iter][self.feasible_solutions][house] = {}
-
-        self.results_SP[Scn_ID][Pareto_ID][iter][self.feasible_solutions][house] = df_Results
+        self.results_SP.add(Scn_ID, Pareto_ID, iter, self.feasible_solutions, house, df_Results)
         attr = pd.concat([attr], keys=[(house, iter, self.feasible_solutions)], names=['House', 'Iter', 'FeasibleSolution'])
         self.solver_attributes_SP = pd.concat([self.solver_attributes_SP, attr])
 
@@ -1148,7 +2142,7 @@ class MasterProblem:
         col = self.number_SP_solutions.columns.difference(["House"])
         self.number_MP_solutions = self.number_SP_solutions[col].groupby('MP_solution').mean(numeric_only=True)
 
-    def split_parameter_sets_per_building(self, h, parameters_SP=dict({})):
+    def split_parameter_sets_per_building(self, h, parameters_SP=None):
         """
         Some inputs are for the district and some other for the houses. This function fuses the two
         and gives the parameters per house. This is important to run an optimization on a single building
@@ -1169,6 +2163,8 @@ class MasterProblem:
         infrastructure_SP : dict
             The district structure for a single house
         """
+        if parameters_SP is None:
+            parameters_SP = dict()
         ID = np.where(h == self.infrastructure.House)[0][0]
         buildings_data_SP = {h: self.buildings_data[h]}
 
@@ -1200,6 +2196,9 @@ class MasterProblem:
     @staticmethod
     def return_combined_SP_results(df_Results, df_name):
 
+        if isinstance(df_Results, SubProblemResults):
+            return df_Results.combined(df_name)
+
         t = {(i, j, k, l, m): df_Results[i][j][k][l][m][df_name]
              for i in df_Results.keys()
              for j in df_Results[i].keys()
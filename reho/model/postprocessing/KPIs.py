@@ -524,7 +524,8 @@ def calculate_KPIs(df_Results, infrastructure, buildings_data, cluster, timestam
     for h in buildings_data:
         df = pd.DataFrame([buildings_data[h]['ERA']], columns=['ERA'], index=[h])
         df_hsA = pd.concat([df_hsA, df])
-    network = pd.DataFrame(df_hsA.sum().values, index=['Network'], columns=['ERA'])
+    multiplicity = [buildings_data[h].get('multiplicity', 1) for h in buildings_data]  # archetypes of building_aggregation
+    network = pd.DataFrame([df_hsA.ERA.mul(multiplicity).sum()], index=['Network'], columns=['ERA'])
     df_hsA = pd.concat([df_hsA, network])
 
     # ------------------------------------------------------------------------------------------------------
@@ -0,0 +1,186 @@
+import numpy as np
+import pandas as pd
+
+__doc__ = """
+File for storing the results of the sub-problems of the decomposition.
+"""
+
+
+class SubProblemResults(dict):
+    """
+    Stores the results of the sub-problems (SPs), indexed on ``[Scn_ID][Pareto_ID][Iter][FeasibleSolution][house]``.
+
+    The nested dictionary access of the former ``results_SP`` is kept, but the results have to be added with
+    ``add``. The DataFrames are then combined incrementally: each call of ``combined`` only concatenates the results
+    added since the previous call, and ``select`` directly picks the results of given feasible solutions without
+    concatenating the whole history.
+
+    Parameters
+    ----------
+    results : dict, optional
+        Nested dictionary of SP results, as stored by former versions of REHO.
+    """
+
+    names = ['Scn_ID', 'Pareto_ID', 'Iter', 'FeasibleSolution', 'house']
+
+    def __init__(self, results=None):
+        super().__init__()
+        if results is not None:
+            for Scn_ID in results:
+                self[Scn_ID] = results[Scn_ID]
+        self.reindex()
+
+    def __reduce__(self):
+        # the index is rebuilt by __init__ from the nested dictionary, for pickle and copy alike
+        return SubProblemResults, (dict(self),)
+
+    def __setstate__(self, state):
+        # results pickled by former versions: the dictionary items are unpickled first, only the index is rebuilt
+        self.reindex()
+
+    def reindex(self):
+        """
+        Rebuilds the index of the results from the nested dictionary, for instance after the Pareto IDs have been sorted.
+        """
+        self.keys_list = []
+        self.positions = dict()
+        self.columns = dict()
+        self.last_keys = dict()
+        self.blocks = dict()
+        for Scn_ID in self:
+            for Pareto_ID in self[Scn_ID]:
+                for Iter in self[Scn_ID][Pareto_ID]:
+                    for FeasibleSolution in self[Scn_ID][Pareto_ID][Iter]:
+                        for house in self[Scn_ID][Pareto_ID][Iter][FeasibleSolution]:
+                            self.index_key((Scn_ID, Pareto_ID, Iter, FeasibleSolution, house))
+
+    def index_key(self, key):
+        self.positions[key] = len(self.keys_list)
+        self.keys_list.append(key)
+        self.columns.setdefault((key[3], key[4]), []).append(key)
+        last_key = self.last_keys.get((key[0], key[1], key[4]))
+        if last_key is None or key[3] >= last_key[3]:
+            self.last_keys[(key[0], key[1], key[4])] = key
+
+    def add(self, Scn_ID, Pareto_ID, Iter, FeasibleSolution, house, df_Results):
+        """
+        Adds the results of the SP of ``house`` for the given feasible solution. Existing results are replaced in place:
+        the combined DataFrames which contain them are updated at their next call of ``combined``.
+        """
+        key = (Scn_ID, Pareto_ID, Iter, FeasibleSolution, house)
+        columns = self.setdefault(Scn_ID, {}).setdefault(Pareto_ID, {}).setdefault(Iter, {}).setdefault(FeasibleSolution, {})
+        if house in columns:
+            for df, n_keys, replaced in self.blocks.values():
+                if self.positions[key] < n_keys:  # already concatenated
+                    replaced.add(key)
+        else:
+            self.index_key(key)
+        columns[house] = df_Results
+
+    def last_key(self, Scn_ID, Pareto_ID, house):
+        """
+        Returns the key of the results of ``house`` with the highest feasible solution of the Pareto point.
+        """
+        return self.last_keys[(Scn_ID, Pareto_ID, house)]
+
+    def get_results(self, key):
+        Scn_ID, Pareto_ID, Iter, FeasibleSolution, house = key
+        return self[Scn_ID][Pareto_ID][Iter][FeasibleSolution][house]
+
+    def concat(self, keys, df_name):
+        if len(keys) == 0:
+            return pd.DataFrame()
+        frames = [self.get_results(key)[df_name] for key in keys]
+        return pd.concat(frames, keys=keys, names=self.names, axis=0)
+
+    def combined(self, df_name):
+        """
+        Returns the results ``df_name`` of all the SPs in a single DataFrame indexed on ``names``.
+
+        The combined DataFrame is kept in memory, only the results added since the last call are concatenated to it.
+        """
+        df, n_keys, replaced = self.blocks.get(df_name, (None, 0, set()))
+        if df is None or n_keys < len(self.keys_list) or len(replaced) > 0:
+            keys = self.keys_list[n_keys:]
+            if df is not None and len(replaced) > 0:
+                # only the rows of the replaced results are dropped, they are concatenated again with the new results
+                key_index = pd.MultiIndex.from_arrays([df.index.get_level_values(name) for name in self.names])
+                df = df[~key_index.isin(list(replaced))]
+                keys = list(replaced) + keys
+            df_new = self.concat(keys, df_name)
+            if df is not None:
+                df_new = pd.concat([df, df_new])
+            if not df_new.index.is_monotonic_increasing:
+                df_new = df_new.sort_index()
+            df = df_new
+            self.blocks[df_name] = (df, len(self.keys_list), set())
+        return df
+
+    def subset(self, keys):
+        """
+        Returns a new SubProblemResults with the results of the given keys ``(Scn_ID, Pareto_ID, Iter, FeasibleSolution, house)``.
+        The DataFrames are not copied.
+        """
+        results = SubProblemResults()
+        for key in keys:
+            results.add(*key, self.get_results(key))
+        return results
+
+    def select(self, df_name, columns):
+        """
+        Returns the results ``df_name`` of the given feasible solutions.
+
+        Parameters
+        ----------
+        df_name : str
+            Name of the results DataFrame, e.g. ``df_Performance``.
+        columns : iterable
+            Tuples ``(FeasibleSolution, house)``, the order is kept in the returned DataFrame.
+
+        Returns
+        -------
+        pd.DataFrame
+            Indexed on ``names`` and the index of ``df_name``.
+        """
+        frames = [self.concat(self.columns[tuple(column)], df_name).sort_index() for column in columns if tuple(column) in self.columns]
+        if len(frames) == 0:
+            return pd.DataFrame()
+        return pd.concat(frames)
+
+
+def rename_house(df_Results, house, new_house):
+    """
+    Returns a copy of the results of a SP of ``house`` for ``new_house``: the labels ``house`` and the unit names ending
+    with ``_house`` are renamed in the indices and columns of the DataFrames.
+    """
+    def rename(label):
+        if isinstance(label, str):
+            if label == house:
+                return new_house
+            if label.endswith('_' + house):
+                return label[:-len(house)] + new_house
+        return label
+
+    results = dict()
+    for df_name, df in df_Results.items():
+        if isinstance(df, pd.DataFrame):
+            df = df.rename(index=rename, columns=rename)
+        elif isinstance(df, pd.Series):
+            df = df.rename(index=rename)
+        results[df_name] = df
+    return results
+
+
+def is_same_SP_solution(df_Results, new_df_Results, rtol=1e-6):
+    """
+    Returns if two results of a SP describe the same solution: same costs (``df_Performance``) and same grid exchanges
+    (``df_Grid_t``), up to the relative tolerance ``rtol``.
+    """
+    previous, new = df_Results['df_Performance'].iloc[0], new_df_Results['df_Performance'].iloc[0]
+    if not np.isclose(previous.Costs_op + previous.Costs_inv, new.Costs_op + new.Costs_inv, rtol=rtol):
+        return False
+    if 'df_Grid_t' not in df_Results or 'df_Grid_t' not in new_df_Results:
+        return True
+    previous = df_Results['df_Grid_t'].select_dtypes('number')
+    new = new_df_Results['df_Grid_t'].reindex(index=previous.index, columns=previous.columns)
+    return np.allclose(previous.to_numpy(dtype=float), new.to_numpy(dtype=float), rtol=rtol, atol=1e-6)
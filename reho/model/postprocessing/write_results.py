@@ -7,58 +7,42 @@ Extracts the results from the AMPL model and converts it to Python dictionary an
 """
 
 
-def get_df_Results_from_SP(ampl, scenario, method, buildings_data, filter=True):
+def get_df_Results_from_SP(ampl, scenario, method, buildings_data, filter=True, extraction='full'):
+    """
+    Extracts the results of a SP. With ``extraction='column'``, only the results needed to add the solution to the MP
+    are extracted: ``df_Performance``, ``df_Grid_t``, ``df_Time``, the LCA results with ``save_lca`` and the PV
+    profiles with ``actors_problem``.
+    """
     def set_df_performance(ampl, scenario):
-        df1 = get_ampl_data(ampl, 'Costs_House_op')  # without the comfort penalty costs
-        df1 = df1.rename(columns={'Costs_House_op': 'Costs_op'})
-
-        df2 = get_ampl_data(ampl, 'Costs_House_inv')
-        df2 = df2.rename(columns={'Costs_House_inv': 'Costs_inv'})
         tau = ampl.getParameter('tau').getValues().toList()
-        df2['Costs_inv'] = df2['Costs_inv'] * tau[0]
-        df2['ANN_factor'] = tau[0]
 
-        df2['Costs_grid_connection'] = get_ampl_data(ampl, 'Costs_grid_connection_House', multi_index=True).groupby(
+        df_PerformanceBuilding = get_ampl_data(ampl, ['Costs_House_op', 'Costs_House_inv', 'Costs_House_rep', 'Costs_House_cft',
+                                                      'GWP_house_op', 'GWP_house_constr'])
+        df_PerformanceBuilding = df_PerformanceBuilding.rename(columns={'Costs_House_op': 'Costs_op',  # without the comfort penalty costs
+                                                                        'Costs_House_inv': 'Costs_inv', 'Costs_House_rep': 'Costs_rep',
+                                                                        'Costs_House_cft': 'Costs_ft', 'GWP_house_op': 'GWP_op',
+                                                                        'GWP_house_constr': 'GWP_constr'})
+        df_PerformanceBuilding[['Costs_inv', 'Costs_rep']] = df_PerformanceBuilding[['Costs_inv', 'Costs_rep']] * tau[0]
+        df_PerformanceBuilding['ANN_factor'] = tau[0]
+        df_PerformanceBuilding['Costs_grid_connection'] = get_ampl_data(ampl, 'Costs_grid_connection_House', multi_index=True).groupby(
             level=1).sum()  # yearly cost for grid connection
 
-        df3 = get_ampl_data(ampl, 'Costs_House_rep')
-        df3['Costs_House_rep'] = df3['Costs_House_rep'] * tau[0]
-        df3 = df3.rename(columns={'Costs_House_rep': 'Costs_rep'})
-
-        df4 = get_ampl_data(ampl, 'Costs_House_cft')
-        df4 = df4.rename(columns={'Costs_House_cft': 'Costs_ft'})
-
-        df5 = get_ampl_data(ampl, 'GWP_house_op')
-        df5 = df5.rename(columns={'GWP_house_op': 'GWP_op'})
-
-        df6 = get_ampl_data(ampl, 'GWP_house_constr')
-        df6 = df6.rename(columns={'GWP_house_constr': 'GWP_constr'})
-
-        df71 = get_ampl_data(ampl, 'EMOO_CAPEX')
-        df72 = get_ampl_data(ampl, 'EMOO_OPEX')
-        df73 = get_ampl_data(ampl, 'EMOO_TOTEX')
-        df75 = get_ampl_data(ampl, 'EMOO_GWP')
-        df76 = get_ampl_data(ampl, 'EMOO_grid')
-
-        df_N1 = get_ampl_data(ampl, 'Costs_op')  # without the comfort penalty costs
-        df_N2 = get_ampl_data(ampl, 'Costs_inv')
-        df_N2['Costs_inv'] = df_N2['Costs_inv'] * tau[0]
-        df_N2['ANN_factor'] = tau[0]
-        df_N2['Costs_grid_connection'] = get_ampl_data(ampl, 'Costs_grid_connection').sum().values / 2  # TODO enhance
-        df_N3 = get_ampl_data(ampl, 'Costs_rep')
-        df_N3['Costs_rep'] = df_N3['Costs_rep'] * tau[0]
-        df_N4 = pd.DataFrame({'Costs_ft': [df4.sum()['Costs_ft']]})
-        df_N5 = get_ampl_data(ampl, 'GWP_op')
-        df_N6 = get_ampl_data(ampl, 'GWP_constr')
-
-        df_PerformanceBuilding = pd.concat([df1, df2, df3, df4, df5, df6], axis=1)
-        df_PerformanceNetwork = pd.concat([df_N1, df_N2, df_N3, df_N4, df_N5, df_N6], axis=1)
+        # scalars of the district: costs without the comfort penalty costs, epsilon constraints and objective
+        epsilon = ['EMOO_CAPEX', 'EMOO_OPEX', 'EMOO_TOTEX', 'EMOO_GWP', 'EMOO_grid']
+        df_N = get_ampl_data(ampl, ['Costs_op', 'Costs_inv', 'Costs_rep', 'GWP_op', 'GWP_constr', 'Costs_grid_connection'] + epsilon +
+                             [scenario["Objective"]])
+        df_PerformanceNetwork = df_N[['Costs_op', 'Costs_inv', 'Costs_rep', 'GWP_op', 'GWP_constr']].copy()
+        df_PerformanceNetwork[['Costs_inv', 'Costs_rep']] = df_PerformanceNetwork[['Costs_inv', 'Costs_rep']] * tau[0]
+        df_PerformanceNetwork['ANN_factor'] = tau[0]
+        df_PerformanceNetwork['Costs_grid_connection'] = df_N['Costs_grid_connection'] / 2  # TODO enhance
+        df_PerformanceNetwork['Costs_ft'] = df_PerformanceBuilding['Costs_ft'].sum()
         df_PerformanceNetwork = df_PerformanceNetwork.rename(index={0: 'Network'})
 
-        df_Performance = pd.concat([df_PerformanceBuilding, df_PerformanceNetwork], axis=0)
+        columns = ['Costs_op', 'Costs_inv', 'ANN_factor', 'Costs_grid_connection', 'Costs_rep', 'Costs_ft', 'GWP_op', 'GWP_constr']
+        df_Performance = pd.concat([df_PerformanceBuilding[columns], df_PerformanceNetwork[columns]], axis=0)
 
-        df_Epsilon = pd.concat([df71, df72, df73, df75, df76], axis=1)
-        df_Epsilon['Objective'] = get_ampl_data(ampl, scenario["Objective"]).values[0][0] - df_N4.values[0][0]
+        df_Epsilon = df_N[epsilon].copy()
+        df_Epsilon['Objective'] = df_N[scenario["Objective"]].values[0] - df_PerformanceNetwork['Costs_ft'].values[0]
         df_Epsilon = df_Epsilon.rename(index={0: 'Network'})
 
         df_Performance = pd.concat([df_Performance, df_Epsilon], axis=1)
@@ -70,15 +54,10 @@ def get_df_Results_from_SP(ampl, scenario, method, buildings_data, filter=True):
 
     def set_df_annuals(ampl):
         # Annuals
-        df1 = get_ampl_data(ampl, 'AnnualNetwork_demand')
-        df1.columns = ['Demand_MWh']
-        df1 = pd.concat([df1], keys=['Network'])
-        df1.index = df1.index.reorder_levels([1, 0])
-        df2 = get_ampl_data(ampl, 'AnnualNetwork_supply')
-        df2.columns = ['Supply_MWh']
-        df2 = pd.concat([df2], keys=['Network'])
-        df2.index = df2.index.reorder_levels([1, 0])
-        df12 = pd.concat([df1, df2], axis=1, sort=False)
+        df12 = get_ampl_data(ampl, ['AnnualNetwork_demand', 'AnnualNetwork_supply'])
+        df12.columns = ['Demand_MWh', 'Supply_MWh']
+        df12 = pd.concat([df12], keys=['Network'])
+        df12.index = df12.index.reorder_levels([1, 0])
 
         df3 = get_ampl_data(ampl, 'AnnualDomestic_electricity')
         df3 = df3.set_index([pd.Index(["Electricity"] * df3.index.size), df3.index])
@@ -93,11 +72,8 @@ def get_df_Results_from_SP(ampl, scenario, method, buildings_data, filter=True):
         df6 = pd.concat([df6], keys=['SolarGains'])
         df3456 = pd.concat([df3, df4, df5, df6], sort=False)
 
-        df7 = get_ampl_data(ampl, 'AnnualUnit_in')
-        df7.columns = ['Demand_MWh']
-        df8 = get_ampl_data(ampl, 'AnnualUnit_out')
-        df8.columns = ['Supply_MWh']
-        df78 = pd.concat([df7, df8], axis=1, sort=False)
+        df78 = get_ampl_data(ampl, ['AnnualUnit_in', 'AnnualUnit_out'])
+        df78.columns = ['Demand_MWh', 'Supply_MWh']
         df9 = get_ampl_data(ampl, 'AnnualUnit_Q')
         df9.columns = ['Supply_MWh']
         df789 = pd.concat([df78, df9], sort=False)
@@ -125,22 +101,15 @@ def get_df_Results_from_SP(ampl, scenario, method, buildings_data, filter=True):
     def set_df_unit(ampl):
         # Unit
         tau = ampl.getParameter('tau').getValues().toList()
-        df1 = get_ampl_data(ampl, 'Units_Use')
-        df2 = get_ampl_data(ampl, 'Units_Mult')
-
-        df3 = tau[0] * get_ampl_data(ampl, 'Costs_Unit_inv')
-        df4 = get_ampl_data(ampl, 'GWP_Unit_constr')  # per year! For total, multiply with lifetime
-        df5 = get_ampl_data(ampl, 'lifetime')
-        df_Unit = pd.concat([df1, df2, df3, df4, df5], axis=1)
+        df_Unit = get_ampl_data(ampl, ['Units_Use', 'Units_Mult', 'Costs_Unit_inv', 'GWP_Unit_constr', 'lifetime'])  # GWP per year! For total, multiply with lifetime
+        df_Unit['Costs_Unit_inv'] = tau[0] * df_Unit['Costs_Unit_inv']
         df_Unit.index.names = ['Unit']
         df_Unit = df_Unit.sort_index()
         if method['print_logs']:
             print(df_Unit)
 
         # Unit_t
-        df1 = get_ampl_data(ampl, 'Units_demand', multi_index=True)
-        df2 = get_ampl_data(ampl, 'Units_supply', multi_index=True)
-        df3 = get_ampl_data(ampl, 'Units_curtailment', multi_index=True)
+        df123 = get_ampl_data(ampl, ['Units_demand', 'Units_supply', 'Units_curtailment'], multi_index=True)
         df4 = get_ampl_data(ampl, 'BAT_E_stored', multi_index=True)
         df4 = pd.concat([df4], keys=['Electricity'], names=['Layer'])
         if "EV_district" in [unit for unit, value in ampl.getVariable('Units_Use').instances()]:
@@ -148,9 +117,9 @@ def get_df_Results_from_SP(ampl, scenario, method, buildings_data, filter=True):
             df5 = pd.concat([df5], keys=['Electricity'], names=['Layer'])
             df6 = get_ampl_data(ampl, "EV_displacement", multi_index=True)
             df6 = pd.concat([df6], keys=['Electricity'], names=['Layer'])
-            df_Unit_t = pd.concat([df1, df2, df3, df4, df5, df6], axis=1)
+            df_Unit_t = pd.concat([df123, df4, df5, df6], axis=1)
         else:
-            df_Unit_t = pd.concat([df1, df2, df3, df4], axis=1)
+            df_Unit_t = pd.concat([df123, df4], axis=1)
         df_Unit_t.index.names = ['Layer', 'Unit', 'Period', 'Time']
         df_Unit_t = df_Unit_t.sort_index()
 
@@ -158,43 +127,36 @@ def get_df_Results_from_SP(ampl, scenario, method, buildings_data, filter=True):
 
     def set_df_grid(ampl, method):
         # Grid_t
-        df1 = get_ampl_data(ampl, 'Grid_demand', multi_index=True)
-        df2 = get_ampl_data(ampl, 'Grid_supply', multi_index=True)
+        df12 = get_ampl_data(ampl, ['Grid_demand', 'Grid_supply'], multi_index=True)
 
-        df_cs = get_ampl_data(ampl, 'Cost_supply', multi_index=True)
-        df_cs = df_cs.reorder_levels((1, 0, 2, 3))
-        df_cd = get_ampl_data(ampl, 'Cost_demand', multi_index=True)
-        df_cd = df_cd.reorder_levels((1, 0, 2, 3))
+        df_c = get_ampl_data(ampl, ['Cost_supply', 'Cost_demand'], multi_index=True)
+        df_c = df_c.reorder_levels((1, 0, 2, 3))
 
         df_electricity = get_ampl_data(ampl, 'Domestic_electricity', multi_index=True)
         df_electricity.columns = ['Uncontrollable_load']
         df_electricity = df_electricity.set_index([pd.Index(["Electricity"] * df_electricity.index.size), df_electricity.index])
 
-        df_es = get_ampl_data(ampl, 'GWP_supply', multi_index=True)
-        df_ed = get_ampl_data(ampl, 'GWP_demand', multi_index=True)
-        df_em = pd.concat([df_es, df_ed], axis=1)
+        # the profiles of the network share the index of the emissions
+        network = not method["district-scale"] and not method["actors_problem"]
+        network_names = ['Network_demand', 'Network_supply', 'Cost_supply_network', 'Cost_demand_network'] if network else []
+        df_layers = get_ampl_data(ampl, network_names + ['GWP_supply', 'GWP_demand'], multi_index=True)
+
+        df_em = df_layers[['GWP_supply', 'GWP_demand']].copy()
         df_em_tot = pd.DataFrame()
-        for bui in df1.index.get_level_values(1).unique():
+        for bui in df12.index.get_level_values(1).unique():
             df = df_em
             df["Hub"] = bui
             df_em_tot = pd.concat([df_em_tot, df])
         df_em_tot.set_index('Hub', append=True, inplace=True)
         df_em_tot = df_em_tot.reorder_levels((0, 3, 1, 2))
 
-        df_Grid_t = pd.concat([df1, df2, df_cs, df_cd, df_em_tot, df_electricity], axis=1)
-
-        if not method["district-scale"] and not method["actors_problem"]:
-            df3 = get_ampl_data(ampl, 'Network_demand', multi_index=True)
-            df3.columns = ['Grid_demand']
-            df4 = get_ampl_data(ampl, 'Network_supply', multi_index=True)
-            df4.columns = ['Grid_supply']
-            df_cs_net = get_ampl_data(ampl, 'Cost_supply_network', multi_index=True)
-            df_cs_net.columns = ['Cost_supply']
-            df_cd_net = get_ampl_data(ampl, 'Cost_demand_network', multi_index=True)
-            df_cd_net.columns = ['Cost_demand']
+        df_Grid_t = pd.concat([df12, df_c, df_em_tot, df_electricity], axis=1)
 
+        if network:
+            df34 = df_layers.rename(columns={'Network_demand': 'Grid_demand', 'Network_supply': 'Grid_supply',
+                                             'Cost_supply_network': 'Cost_supply', 'Cost_demand_network': 'Cost_demand'})
             df_electricity_net = df_electricity.groupby(level=(0, 2, 3)).sum()
-            df34 = pd.concat([df3, df4, df_cs_net, df_cd_net, df_es, df_ed, df_electricity_net], axis=1)
+            df34 = pd.concat([df34, df_electricity_net], axis=1)
             df34['Hub'] = 'Network'
             df34.set_index('Hub', append=True, inplace=True)
             df34 = df34.reorder_levels((0, 3, 1, 2))
@@ -205,23 +167,11 @@ def get_df_Results_from_SP(ampl, scenario, method, buildings_data, filter=True):
 
     def set_df_buildings_t(ampl):
         # Building_t
-        df1 = get_ampl_data(ampl, 'Domestic_electricity', multi_index=True)
-
-        m_DWH = get_ampl_data(ampl, 'DHW_flowrate', multi_index=True)
+        df_Buildings_t = get_ampl_data(ampl, ['Domestic_electricity', 'DHW_flowrate', 'T_in', 'House_Q_heating', 'House_Q_cooling',
+                                              'Th_supply', 'Th_return', 'HeatGains', 'SolarGains'], multi_index=True)
         delta_T = get_ampl_data(ampl, 'DHW_dT').iloc[0, 0]
-        df2 = 4.18 * m_DWH * delta_T / 3600
-        df2 = df2.rename(columns={'DHW_flowrate': 'House_Q_DHW'})
-
-        df31 = get_ampl_data(ampl, 'T_in', multi_index=True)
-        df32 = get_ampl_data(ampl, 'House_Q_heating')
-        df33 = get_ampl_data(ampl, 'House_Q_cooling')
-        df34 = get_ampl_data(ampl, 'Th_supply', multi_index=True)
-        df35 = get_ampl_data(ampl, 'Th_return', multi_index=True)
-
-        df4 = get_ampl_data(ampl, 'HeatGains', multi_index=True)
-        df5 = get_ampl_data(ampl, 'SolarGains', multi_index=True)
-
-        df_Buildings_t = pd.concat([df1, df2, df31, df32, df33, df34, df35, df4, df5], axis=1)
+        df_Buildings_t['DHW_flowrate'] = 4.18 * df_Buildings_t['DHW_flowrate'] * delta_T / 3600
+        df_Buildings_t = df_Buildings_t.rename(columns={'DHW_flowrate': 'House_Q_DHW'})
         df_Buildings_t.index.names = ['Hub', 'Period', 'Time']
 
         return df_Buildings_t.sort_index()
@@ -326,17 +276,12 @@ def get_df_Results_from_SP(ampl, scenario, method, buildings_data, filter=True):
 
     def set_dfs_other(ampl):
         # Time
-        df1 = get_ampl_data(ampl, 'dp')
-        df2 = get_ampl_data(ampl, 'TimeEnd')
-        df3 = get_ampl_data(ampl, 'dt')
-        df_Time = pd.concat([df1, df2, df3], axis=1)
+        df_Time = get_ampl_data(ampl, ['dp', 'TimeEnd', 'dt'])
         df_Time.index.names = ['Period']
         df_Time = df_Time.sort_index()
 
         # External
-        df1 = get_ampl_data(ampl, 'T_ext', multi_index=True)
-        df2 = get_ampl_data(ampl, 'I_global', multi_index=True)
-        df_Weather = pd.concat([df1, df2], axis=1)
+        df_Weather = get_ampl_data(ampl, ['T_ext', 'I_global'], multi_index=True)
         df_Weather.index.names = ['Period', 'Time']
         df_Weather = df_Weather.sort_index()
 
@@ -349,6 +294,18 @@ def get_df_Results_from_SP(ampl, scenario, method, buildings_data, filter=True):
 
     df_Results = dict()
     df_Results["df_Performance"] = set_df_performance(ampl, scenario)
+    if extraction == 'column':
+        df_Results["df_Grid_t"] = set_df_grid(ampl, method)
+        df_Results["df_Time"] = set_dfs_other(ampl)[0]
+        if method['save_lca']:
+            df_Results["df_lca_Units"], df_Results["df_lca_Performance"], df_Results["df_lca_operation"] = set_dfs_lca(ampl)
+        if method['actors_problem']:
+            df_Unit_t = set_df_unit(ampl)[1]
+            df_Results["df_Unit_t"] = df_Unit_t[df_Unit_t.index.get_level_values("Unit").str.contains("PV")][['Units_supply', 'Units_curtailment']]
+        return df_Results
+    elif extraction != 'full':
+        raise ValueError('Unknown extraction profile', extraction)
+
     df_Results["df_Annuals"] = set_df_annuals(ampl)
     df_Results["df_Unit"], df_Unit_t = set_df_unit(ampl)
     df_Results["df_Grid_t"] = set_df_grid(ampl, method)
@@ -598,9 +555,19 @@ def get_df_Results_from_MP(ampl, binary=False, method=None, district=None, read_
     return df_Results
 
 
+def get_SP_design(ampl):
+    """
+    Returns the size and the use of the units of a SP solution, indexed on the units, to solve the SP again with this
+    design (see ``MasterProblem.extract_selected_SPs``).
+    """
+    return get_ampl_data(ampl, ['Units_Mult', 'Units_Use'])
+
+
 def get_ampl_data(ampl, ampl_name, multi_index=False):
-    # AMPl data in AMPLPY Dataframe
-    df = ampl.getData(ampl_name)
+    # AMPl data in AMPLPY Dataframe, the entities of a list sharing the same indexing set are retrieved in a single call
+    if isinstance(ampl_name, str):
+        ampl_name = [ampl_name]
+    df = ampl.getData(*ampl_name)
     # transform to Pandas Dataframe
     df = df.toPandas()
     # Change index from tuple to multi index
@@ -0,0 +1,212 @@
+import numpy as np
+import pandas as pd
+from pyclustering.cluster.kmedoids import kmedoids
+from pyclustering.utils import calculate_distance_matrix
+from pyclustering.utils.metric import distance_metric, type_metric
+
+from reho.model.postprocessing.results_store import rename_house
+
+__doc__ = """
+Aggregation of the buildings of very large districts into archetypes.
+"""
+
+aggregation_features = ['ERA', 'id_class', 'U_h', 'SolarRoofArea', 'Th_supply_0', 'Th_return_0']
+
+# yearly demands of the buildings data, compared by get_aggregation_error
+demand_features = ['energy_heating_signature_kWh_y', 'energy_cooling_signature_kWh_y', 'energy_hotwater_signature_kWh_y', 'energy_el_kWh_y']
+
+# buildings data which scale with the size of the building, the others are compared as ERA-weighted means
+extensive_features = ['ERA', 'SolarRoofArea', 'area_facade_m2', 'n_p'] + demand_features
+
+# result columns which do not scale with the size of the building
+intensive_columns = ['ANN_factor', 'Units_Use', 'lifetime', 'Cost_supply', 'Cost_demand', 'GWP_supply', 'GWP_demand', 'T_in',
+                     'Th_supply', 'Th_return', 'Streams_Tin', 'Streams_Tout', 'dTmin']
+
+
+def aggregate_buildings(qbuildings_data, n_archetypes, features=None, random_state=None):
+    """
+    Clusters the buildings into ``n_archetypes`` archetypes with the K-Medoids algorithm.
+
+    The medoid of each cluster is the archetype, it keeps its name and its data. Its ``multiplicity`` is the ERA of the
+    cluster divided by its own ERA: the MP weights the solutions of the archetype by this multiplicity, so that the district
+    balances and costs are those of the original district. The facades and roofs are not aggregated.
+
+    Parameters
+    ----------
+    qbuildings_data : dict
+        Buildings characterization, see ``QBuildingsReader.read_db``
+    n_archetypes : int
+        Number of archetypes
+    features : list, optional
+        Keys of the buildings data used to compare the buildings, ``aggregation_features`` by default.
+        The non-numerical features (e.g. ``id_class``) are one-hot encoded.
+    random_state : int, optional
+        Seed of the initial medoids
+
+    Returns
+    -------
+    qbuildings_archetypes : dict
+        Buildings characterization of the archetypes, to be given to ``REHO``
+    df_archetypes : pd.DataFrame
+        Archetype of each building and its weight, the ratio between the ERA of the building and of the archetype
+    """
+    if features is None:
+        features = aggregation_features
+    buildings_data = qbuildings_data['buildings_data']
+    df = pd.DataFrame.from_dict(buildings_data, orient='index')[features]
+
+    numerical = df.apply(pd.to_numeric, errors='coerce').notnull().all()
+    df_numerical = df.loc[:, numerical].astype(float)
+    std = df_numerical.std(ddof=0).replace(0, 1)
+    matrix = pd.concat([(df_numerical - df_numerical.mean()) / std, pd.get_dummies(df.loc[:, ~numerical].astype(str), dtype=float)], axis=1)
+
+    if n_archetypes >= len(df):
+        medoids = list(range(len(df)))
+        clusters = [[i] for i in medoids]
+    else:
+        metric = distance_metric(type_metric.EUCLIDEAN_SQUARE)
+        dist_matrix = calculate_distance_matrix(matrix.values.tolist(), metric)
+        initial_medoids = np.random.RandomState(random_state).choice(len(df), n_archetypes, replace=False).tolist()
+
+        kmedoids_instance = kmedoids(dist_matrix, initial_medoids, ccore=False, data_type='distance_matrix')  # ccore=False, otherwise incompatible with ARM64
+        kmedoids_instance.process()
+        medoids = kmedoids_instance.get_medoids()
+        clusters = kmedoids_instance.get_clusters()
+
+    df_archetypes = pd.DataFrame(index=pd.Index(df.index, name='Building'), columns=['archetype', 'weight'])
+    archetypes_data = dict()
+    for medoid, cluster in zip(medoids, clusters):
+        archetype = df.index[medoid]
+        ERA_archetype = float(buildings_data[archetype]['ERA'])
+        for building in df.index[cluster]:
+            df_archetypes.loc[building] = [archetype, float(buildings_data[building]['ERA']) / ERA_archetype]
+        archetypes_data[archetype] = dict(buildings_data[archetype])
+        archetypes_data[archetype]['multiplicity'] = df_archetypes.loc[df.index[cluster], 'weight'].sum()
+
+    df_archetypes['weight'] = df_archetypes['weight'].astype(float)
+    return {'buildings_data': archetypes_data}, df_archetypes
+
+
+def disaggregate_results(df_Results, df_archetypes, buildings_data=None):
+    """
+    Returns the results of the original buildings from the results of an optimization of the archetypes.
+
+    The results of each archetype are copied to the buildings of its cluster, with the values scaled by the weight of
+    the building, except the ``intensive_columns``. The district results ('Network', district units) are kept, as they
+    already include the multiplicity of the archetypes.
+
+    Parameters
+    ----------
+    df_Results : dict
+        Results of the optimization of the archetypes, e.g. ``reho.results[Scn_ID][Pareto_ID]``
+    df_archetypes : pd.DataFrame
+        See ``aggregate_buildings``
+    buildings_data : dict, optional
+        Original buildings data, to build ``df_Buildings``
+
+    Returns
+    -------
+    dict
+        Results with the same DataFrames as ``df_Results``, for the original buildings
+    """
+    members = df_archetypes.groupby('archetype').groups
+    results = dict()
+    for df_name, df in df_Results.items():
+        if df_name == 'df_Buildings' and buildings_data is not None:
+            df = pd.DataFrame.from_dict(buildings_data, orient='index')
+            df.index.names = ['Hub']
+        elif isinstance(df, pd.DataFrame):
+            frames = []
+            in_archetype = pd.Series(False, index=range(len(df)))
+            for archetype, buildings in members.items():
+                mask = archetype_mask(df.index, archetype)
+                in_archetype |= mask
+                if not mask.any():
+                    continue
+                df_archetype = df[mask.values]
+                extensive = [c for c in df_archetype.columns if c not in intensive_columns and pd.api.types.is_numeric_dtype(df_archetype[c])]
+                for building in buildings:
+                    df_building = rename_house({df_name: df_archetype}, archetype, building)[df_name]
+                    if building != archetype:
+                        df_building = df_building.copy()
+                    df_building[extensive] = df_building[extensive] * df_archetypes.loc[building, 'weight']
+                    frames.append(df_building)
+            if in_archetype.any():
+                df = pd.concat([df[~in_archetype.values]] + frames).sort_index()
+        results[df_name] = df
+    return results
+
+
+def archetype_mask(index, archetype):
+    """
+    Selects the rows of ``index`` which belong to the archetype: label ``archetype`` or unit names ending with ``_archetype``.
+    """
+    mask = pd.Series(False, index=range(len(index)))
+    for level in range(index.nlevels):
+        labels = pd.Series(index.get_level_values(level), index=range(len(index)))
+        if labels.dtype == object:
+            labels = labels.astype(str)
+            mask |= (labels == archetype) | labels.str.endswith('_' + archetype)
+    return mask
+
+
+def get_aggregation_error(qbuildings_data, df_archetypes, features=None):
+    """
+    Returns the distortion of the buildings data by the archetypes, which needs no optimization.
+
+    Each building is represented by its archetype scaled by its weight, see ``aggregate_buildings``. For each cluster and
+    for the whole district ('District'), the error is the relative difference between the represented and the original
+    values: sums for the ``extensive_features`` (e.g. ERA, yearly demands), ERA-weighted means for the other numerical
+    features and, for the non-numerical features (e.g. ``id_class``), the share of the ERA whose value differs from the
+    one of the archetype.
+
+    Parameters
+    ----------
+    qbuildings_data : dict
+        Original buildings characterization, given to ``aggregate_buildings``
+    df_archetypes : pd.DataFrame
+        See ``aggregate_buildings``
+    features : list, optional
+        Keys of the buildings data to compare, ``aggregation_features`` and ``demand_features`` by default.
+        The keys missing from the buildings data are ignored.
+
+    Returns
+    -------
+    pd.DataFrame
+        Relative error of each feature (columns) for each archetype and the district (index)
+    """
+    if features is None:
+        features = aggregation_features + demand_features
+    df = pd.DataFrame.from_dict(qbuildings_data['buildings_data'], orient='index').loc[df_archetypes.index]
+    archetypes = df_archetypes['archetype']
+    ERA = df['ERA'].astype(float)
+
+    def get_sums(values):
+        return pd.concat([values.groupby(archetypes).sum(), pd.Series({'District': values.sum()})])
+
+    def relative_error(represented, original):
+        return (get_sums(represented) - get_sums(original)) / get_sums(original).abs().replace(0, np.nan)
+
+    errors = dict()
+    for feature in [feature for feature in features if feature in df.columns]:
+        original = df[feature]
+        represented = original.loc[archetypes.values].set_axis(df.index)  # value of the archetype of each building
+        if not pd.to_numeric(original, errors='coerce').notnull().all():
+            errors[feature] = get_sums(ERA * (represented.astype(str) != original.astype(str))) / get_sums(ERA)
+        elif feature in extensive_features:
+            errors[feature] = relative_error(represented.astype(float) * df_archetypes['weight'], original.astype(float))
+        else:
+            errors[feature] = relative_error(represented.astype(float) * ERA, original.astype(float) * ERA)
+    return pd.DataFrame(errors)
+
+
+def get_KPI_aggregation_error(df_KPI, df_KPI_reference):
+    """
+    Returns the relative error of the district KPIs ('Network') of an optimization of the archetypes, compared to a
+    reference optimization of the original buildings. Both are given by ``calculate_KPIs``. This validation needs
+    the full optimization, see ``get_aggregation_error`` otherwise.
+    """
+    kpis = [kpi for kpi in df_KPI.columns.intersection(df_KPI_reference.columns) if pd.api.types.is_numeric_dtype(df_KPI[kpi])]
+    value = df_KPI.loc['Network', kpis].astype(float)
+    reference = df_KPI_reference.loc['Network', kpis].astype(float)
+    return ((value - reference) / reference.abs().replace(0, np.nan)).rename('relative_error')
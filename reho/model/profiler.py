@@ -0,0 +1,115 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+__doc__ = """
+File for measuring the time spent in each stage of the optimization (model construction, solving, results extraction...).
+"""
+
+# the records are kept in the process which measures them, the worker processes included, until pop_records is called
+_enabled = False
+_records = []
+_labels = dict()
+
+# columns of the profile, see get_stage_profile
+profile_labels = ['Scn_ID', 'Pareto_ID', 'Iter', 'House']
+
+
+def enable(enabled=True):
+    """
+    Starts or stops recording the stages in the current process. The flag is shared by all the models of the process:
+    REHO sets it from its ``method['profile']`` at the start of each optimization and each SP, so that the models
+    optimized one after the other keep their own setting. The stages of models optimized concurrently in the same
+    process (e.g. in threads) are not separated.
+    """
+    global _enabled
+    _enabled = enabled
+
+
+def is_enabled():
+    return _enabled
+
+
+def set_labels(**new_labels):
+    """
+    Sets the labels of the next stages recorded, e.g. the iteration of the decomposition.
+    """
+    if _enabled:
+        _labels.update(new_labels)
+
+
+def record(name, wall_time, cpu_time=None, **stage_labels):
+    """
+    Adds a stage measured outside of a ``stage`` block, e.g. spanning several function calls.
+    """
+    if _enabled:
+        _records.append({'stage': name, **_labels, **stage_labels, 'wall_time': wall_time, 'cpu_time': cpu_time,
+                         'start': time.time() - wall_time, 'pid': os.getpid()})
+
+
+@contextmanager
+def labels(**new_labels):
+    """
+    Adds labels (``Scn_ID``, ``Pareto_ID``, ``Iter``, ``House``) to the stages recorded in the block.
+    """
+    if not _enabled:
+        yield
+        return
+    previous = dict(_labels)
+    _labels.update(new_labels)
+    try:
+        yield
+    finally:
+        _labels.clear()
+        _labels.update(previous)
+
+
+@contextmanager
+def stage(name, **stage_labels):
+    """
+    Records the wall time and the CPU time of the current process spent in the block, with the current labels.
+    """
+    if not _enabled:
+        yield
+        return
+    start, start_cpu = time.perf_counter(), time.process_time()
+    try:
+        yield
+    finally:
+        stage_record = {'stage': name, **_labels, **stage_labels}
+        stage_record.update({'wall_time': time.perf_counter() - start, 'cpu_time': time.process_time() - start_cpu,
+                             'start': time.time() - (time.perf_counter() - start), 'pid': os.getpid()})
+        _records.append(stage_record)
+
+
+def pop_records():
+    """
+    Returns the records of the current process and forgets them.
+    """
+    records = list(_records)
+    _records.clear()
+    return records
+
+
+def get_stage_profile(records):
+    """
+    Builds a tidy DataFrame with one row per stage and the columns ``stage``, ``profile_labels``, ``wall_time``,
+    ``cpu_time`` (s), ``start`` (epoch time) and ``pid`` (process which executed the stage).
+    """
+    df = pd.DataFrame(records)
+    for column in ['stage'] + profile_labels + ['wall_time', 'cpu_time', 'start', 'pid']:
+        if column not in df:
+            df[column] = None
+    return df
+
+
+def stream_records(records, file):
+    """
+    Appends the records to a JSON-lines file, one record per line.
+    """
+    with open(file, 'a') as f:
+        for record in records:
+            f.write(json.dumps(record, default=str) + '\n')
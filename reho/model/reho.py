@@ -1,9 +1,11 @@
+import hashlib
 import multiprocessing as mp
 import pickle
 
 from reho.model.master_problem import *
 from reho.model.postprocessing.KPIs import *
 from reho.model.postprocessing.building_scale_network_builder import *
+from reho.model.preprocessing.building_aggregation import *
 from reho.paths import *
 
 __doc__ = """
@@ -17,6 +19,9 @@ class REHO(MasterProblem):
 
     Parameters are inherited from ``MasterProblem``.
 
+    With ``parallel_computation``, the worker processes are started at the first decomposition and reused until
+    ``close`` is called, e.g. by using the instance as a context manager: ``with REHO(...) as reho:``.
+
     See also
     --------
     reho.model.master_problem.MasterProblem
@@ -54,53 +59,158 @@ class REHO(MasterProblem):
 
         self.solver_attributes = pd.DataFrame()
         self.epsilon_constraints = {}
+        self.compact_model = None  # SubProblem and AMPL model kept between the optimizations, see get_compact_model
+        self.compact_model_key = None
+        self.compact_inputs_fingerprint = None  # hashed once per optimization run, see get_compact_model_key
+        self.checkpoint_run = None  # optimization executed again by resume
 
     def single_optimization(self, Pareto_ID=0):
         Scn_ID = self.scenario['name']
+        self.checkpoint_run = ('single_optimization', Pareto_ID)
+        self.compact_inputs_fingerprint = None  # the inputs may have changed since the last optimization
+        profiler.enable(self.method['profile'])  # the flag is shared by the instances of the process
+        profiler.set_labels(Scn_ID=Scn_ID, Pareto_ID=Pareto_ID, Iter=None, House=None)
         if self.method['district-scale'] or self.method['building-scale']:  # decomposition formulation
             ampl, exitcode = self.execute_dantzig_wolfe_decomposition(self.scenario, Scn_ID, Pareto_ID=Pareto_ID)
 
-        else:  # compact formulation
-            if self.method['use_facades'] or self.method['use_pv_orientation']:
-                reho = SubProblem(self.infrastructure, self.buildings_data, self.local_data, self.parameters, self.set_indexed,
-                                  self.cluster, self.scenario, self.method, self.solver, self.qbuildings_data)
-            else:
-                reho = SubProblem(self.infrastructure, self.buildings_data, self.local_data, self.parameters, self.set_indexed,
-                                  self.cluster, self.scenario, self.method, self.solver)
+        elif self.method['fix_units']:  # compact formulation with the units of a previous optimization
+            reho = self.get_compact_SP(self.scenario)
             ampl = reho.build_model_without_solving()
-
-            if self.method['fix_units']:
-                for unit in self.fix_units_list:
-                    for h in self.infrastructure.House:
-                        if unit == 'PV':
-                            ampl.getVariable('Units_Mult').get('PV_' + h).fix(self.df_fix_Units.Units_Mult.loc['PV_' + h] * 0.999)
-                            ampl.getVariable('Units_Use').get('PV_' + h).fix(float(self.df_fix_Units.Units_Use.loc['PV_' + h]))
-                        else:
-                            ampl.getVariable('Units_Mult').get(unit + '_' + h).fix(self.df_fix_Units.Units_Mult.loc[unit + '_' + h])
-                            ampl.getVariable('Units_Use').get(unit + '_' + h).fix(float(self.df_fix_Units.Units_Use.loc[unit + '_' + h]))
+            ampl = fix_units_in_ampl(ampl, self.infrastructure.House, self.fix_units_list, self.df_fix_Units)
 
             ampl.solve()
             exitcode = exitcode_from_ampl(ampl)
 
+        else:  # compact formulation
+            ampl, exitcode = self.solve_compact_model(self.scenario)
+
         self.add_df_Results(ampl, Scn_ID, Pareto_ID, self.scenario)
         self.get_KPIs(Scn_ID, Pareto_ID=Pareto_ID)
+        self.collect_stage_profile()
+        self.save_checkpoint()
 
         gc.collect()  # free memory
         del ampl
         if exitcode == 'infeasible':
             sys.exit(exitcode)
 
+    def close(self):
+        self.release_compact_model()
+        super().close()
+
+    def resume(self, checkpoint=None):
+        """
+        Resumes an optimization from the checkpoint written during a previous run, see ``method['checkpoint']``.
+
+        The REHO instance must be built with the same inputs as the interrupted one. The optimization which was running
+        (``single_optimization`` or ``generate_pareto_curve``) is executed again: the Pareto points already completed are
+        not optimized again and the decomposition interrupted restarts after its last MP iteration.
+
+        Parameters
+        ----------
+        checkpoint : str, optional
+            Checkpoint file, ``method['checkpoint']`` by default.
+        """
+        if checkpoint is None:
+            checkpoint = self.method['checkpoint']
+        self.load_checkpoint(checkpoint)
+        if self.checkpoint_run[0] == 'single_optimization':
+            if self.checkpoint_run[1] not in self.results.get(self.scenario['name'], {}):
+                self.single_optimization(self.checkpoint_run[1])
+        else:
+            self.generate_pareto_curve()
+
+    def get_compact_SP(self, scenario):
+        if self.method['use_facades'] or self.method['use_pv_orientation']:
+            return SubProblem(self.infrastructure, self.buildings_data, self.local_data, self.parameters, self.set_indexed,
+                              self.cluster, scenario, self.method, self.solver, self.qbuildings_data)
+        else:
+            return SubProblem(self.infrastructure, self.buildings_data, self.local_data, self.parameters, self.set_indexed,
+                              self.cluster, scenario, self.method, self.solver)
+
+    def get_compact_model_key(self, scenario):
+        """
+        Identifies the data of the compact model: the units excluded or enforced, which are fixed in the model, and the
+        inputs of the REHO instance. The objective, the epsilon constraints and the specific constraints are not part of it.
+
+        The inputs are hashed once per optimization run (``single_optimization``, ``generate_pareto_curve``) and when
+        the model is built, see ``get_compact_inputs_fingerprint``. Only the units are hashed at each call.
+        """
+        units = repr([scenario.get('exclude_units', []), scenario.get('enforce_units', [])])
+        return hashlib.sha1((units + self.get_compact_inputs_fingerprint()).encode()).hexdigest()
+
+    def get_compact_inputs_fingerprint(self):
+        """
+        Returns a hash of the inputs of the compact model (buildings, parameters, sets, units and grids), computed at
+        the first call after ``compact_inputs_fingerprint`` has been reset.
+        """
+        if self.compact_inputs_fingerprint is None:
+            fingerprint = hashlib.sha1()
+            fingerprint.update(pickle.dumps((self.buildings_data, self.parameters, self.set_indexed, self.cluster, self.method)))
+            fingerprint.update(pickle.dumps((self.infrastructure.Units_Parameters, self.infrastructure.Grids_Parameters)))
+            self.compact_inputs_fingerprint = fingerprint.hexdigest()
+        return self.compact_inputs_fingerprint
+
+    def get_compact_model(self, scenario):
+        """
+        Returns the AMPL model of the compact formulation for ``scenario``.
+
+        With ``method['persistent_compact_model']``, the model is built once and kept between the Pareto points and the
+        scenarios: only the objective function and the epsilon and specific constraints are updated, and the previous
+        solution is given to the solver as starting point (MIP start). The model is built again when the units excluded
+        or enforced or the inputs (parameters, sets, buildings, units) change between two optimization runs, see
+        ``get_compact_model_key``.
+        """
+        if not self.method['persistent_compact_model']:
+            return self.get_compact_SP(scenario).build_model_without_solving()
+
+        key = self.get_compact_model_key(scenario)
+        if self.compact_model is not None and self.compact_model_key == key:
+            reho, ampl = self.compact_model
+            return reho.update_scenario(ampl, scenario)
+
+        self.release_compact_model()
+        reho = self.get_compact_SP(scenario)
+        ampl = reho.build_model_without_solving()
+        ampl.setOption('reset_initial_guesses', 0)  # the last solution is the initial guess of the next solve
+        self.compact_model = (reho, ampl)
+        self.compact_inputs_fingerprint = None  # the sets may be completed by the build
+        self.compact_model_key = self.get_compact_model_key(scenario)
+        return ampl
+
+    def solve_compact_model(self, scenario):
+        ampl = self.get_compact_model(scenario)
+        with profiler.stage('solve_compact_model'):
+            ampl.solve()
+        exitcode = exitcode_from_ampl(ampl)
+        return ampl, exitcode
+
+    def release_compact_model(self):
+        """
+        Deletes the AMPL model of the compact formulation kept between the optimizations, see ``get_compact_model``.
+        """
+        if self.compact_model is not None:
+            self.compact_model[1].close()
+        self.compact_model = None
+        self.compact_model_key = None
+        gc.collect()  # free memory
+
     def execute_dantzig_wolfe_decomposition(self, scenario, Scn_ID, Pareto_ID=0, epsilon_init=None):
 
-        # Initiation
-        self.pool = mp.Pool(mp.cpu_count())
-        self.iter = 0  # new scenario has to start at iter = 0
         scenario, SP_scenario, SP_scenario_init = self.select_SP_obj_decomposition(scenario)
-
-        self.logger.info('INITIATION, Iter:' + str(self.iter) + ' Pareto_ID: ' + str(Pareto_ID))
-        self.initiate_decomposition(SP_scenario_init, Scn_ID=Scn_ID, Pareto_ID=Pareto_ID, epsilon_init=epsilon_init)
-        self.logger.info('MASTER INITIATION, Iter:' + str(self.iter))
-        self.MP_iteration(scenario, Scn_ID=Scn_ID, binary=False, Pareto_ID=Pareto_ID)
+        if self.resumed_decomposition == (Scn_ID, Pareto_ID):
+            # the state of the last MP iteration was restored by load_checkpoint
+            self.resumed_decomposition = None
+            self.logger.info('RESUME AFTER MASTER ITERATION, Iter:' + str(self.iter) + ' Pareto_ID: ' + str(Pareto_ID))
+        else:
+            # Initiation
+            self.iter = 0  # new scenario has to start at iter = 0
+            self.decomposition_position = (Scn_ID, Pareto_ID)
+            self.logger.info('INITIATION, Iter:' + str(self.iter) + ' Pareto_ID: ' + str(Pareto_ID))
+            self.initiate_decomposition(SP_scenario_init, Scn_ID=Scn_ID, Pareto_ID=Pareto_ID, epsilon_init=epsilon_init)
+            self.logger.info('MASTER INITIATION, Iter:' + str(self.iter))
+            self.MP_iteration(scenario, Scn_ID=Scn_ID, binary=False, Pareto_ID=Pareto_ID)
+            self.save_checkpoint()
 
         # Iteration
         while self.iter < self.DW_params['max_iter'] - 1:  # last iteration is used to run the binary MP.
@@ -110,21 +220,31 @@ class REHO(MasterProblem):
             self.logger.info('MASTER ITERATION, Iter:' + str(self.iter) + ' Pareto_ID: ' + str(Pareto_ID))
             self.MP_iteration(scenario, Scn_ID=Scn_ID, binary=False, Pareto_ID=Pareto_ID)
 
-            if self.check_Termination_criteria(SP_scenario, Scn_ID=Scn_ID, Pareto_ID=Pareto_ID) and (self.iter > 3):
-                break
+            if self.check_Termination_criteria(SP_scenario, Scn_ID=Scn_ID, Pareto_ID=Pareto_ID):
+                if self.iter > 3 or self.stopping_criteria['gap_reached'].iloc[-1]:
+                    break
+            self.manage_columns(SP_scenario, Scn_ID=Scn_ID, Pareto_ID=Pareto_ID)
+            self.save_checkpoint()
 
         # Finalization
+        self.release_pending_SPs(Scn_ID, Pareto_ID)
         self.logger.info(self.stopping_criteria)
         self.iter += 1
         self.logger.info('LAST MASTER ITERATION, Iter:' + str(self.iter) + ' Pareto_ID: ' + str(Pareto_ID))
         self.MP_iteration(scenario, Scn_ID=Scn_ID, binary=True, Pareto_ID=Pareto_ID)
-        self.pool.close()
+        self.extract_selected_SPs(Scn_ID, Pareto_ID)
+        self.release_persistent_SPs()
+        self.release_persistent_MP()
+        self.decomposition_position = None
 
         return None, None
     
     def generate_pareto_curve(self):
 
         Scn_ID = self.scenario['name']
+        self.checkpoint_run = ('generate_pareto_curve', )
+        self.compact_inputs_fingerprint = None  # the inputs may have changed since the last optimization
+        profiler.enable(self.method['profile'])  # the flag is shared by the instances of the process
 
         def get_objectives_values(ampl, objectives, Pareto_ID):
 
@@ -132,8 +252,9 @@ class REHO(MasterProblem):
             surfaces = pd.DataFrame.from_dict({bui: self.buildings_data[bui]["ERA"] for bui in self.buildings_data}, orient="index")
             surfaces.columns = ["ERA"]
 
+            # the results of the point give the same values as the compact model, e.g. for a point restored from a checkpoint
             def annualized_investment():
-                if self.method['building-scale'] or self.method['district-scale']:
+                if self.method['building-scale'] or self.method['district-scale'] or ampl is None:
                     df_inv = self.results[Scn_ID][Pareto_ID]["df_Performance"]
                     district = (df_inv.Costs_inv[-1] + df_inv.Costs_rep[-1]) / self.ERA
                     buildings = df_inv.Costs_inv[:-1].div(surfaces.ERA) + df_inv.Costs_rep[:-1].div(surfaces.ERA)
@@ -149,7 +270,7 @@ class REHO(MasterProblem):
                 return district, buildings
 
             def opex_per_house():
-                if self.method['building-scale'] or self.method['district-scale']:
+                if self.method['building-scale'] or self.method['district-scale'] or ampl is None:
                     df_op = self.results[Scn_ID][Pareto_ID]["df_Performance"]
                     district = df_op.Costs_op[-1] / self.ERA
                     building = df_op.Costs_op[:-1].div(surfaces.ERA)
@@ -201,20 +322,20 @@ class REHO(MasterProblem):
             objective1 = self.scenario["Objective"][0]
             scenario['Objective'] = objective1
 
-            if self.method['district-scale']:
-                ampl, exitcode = self.execute_dantzig_wolfe_decomposition(scenario, Scn_ID, Pareto_ID=1)
+            if 1 in self.results.get(Scn_ID, {}):
+                ampl = None  # completed before the checkpoint
             else:
-                if self.method['use_facades'] or self.method['use_pv_orientation']:
-                    reho = SubProblem(self.infrastructure, self.buildings_data, self.local_data, self.parameters, self.set_indexed, self.cluster,
-                                      scenario, self.method, self.solver, self.qbuildings_data)
+                profiler.set_labels(Scn_ID=Scn_ID, Pareto_ID=1, Iter=None, House=None)
+                if self.method['district-scale']:
+                    ampl, exitcode = self.execute_dantzig_wolfe_decomposition(scenario, Scn_ID, Pareto_ID=1)
                 else:
-                    reho = SubProblem(self.infrastructure, self.buildings_data, self.local_data, self.parameters, self.set_indexed, self.cluster,
-                                      scenario, self.method, self.solver)
-                ampl, exitcode = reho.solve_model()
+                    ampl, exitcode = self.solve_compact_model(scenario)
 
-            scenario = {'Objective': objective1}
-            self.add_df_Results(ampl, Scn_ID, 1, scenario)
-            self.get_KPIs(Scn_ID, Pareto_ID=1)
+                scenario = {'Objective': objective1}
+                self.add_df_Results(ampl, Scn_ID, 1, scenario)
+                self.get_KPIs(Scn_ID, Pareto_ID=1)
+                self.collect_stage_profile()
+                self.save_checkpoint()
 
             obj_values = get_objectives_values(ampl, self.scenario["Objective"], Pareto_ID=1)
 
@@ -232,20 +353,20 @@ class REHO(MasterProblem):
             else:
                 Pareto_ID = self.nPareto + 2
 
-            if self.method['district-scale']:
-                ampl, exitcode = self.execute_dantzig_wolfe_decomposition(scenario, Scn_ID, Pareto_ID=Pareto_ID)
+            if Pareto_ID in self.results.get(Scn_ID, {}):
+                ampl = None  # completed before the checkpoint
             else:
-                if self.method['use_facades'] or self.method['use_pv_orientation']:
-                    reho = SubProblem(self.infrastructure, self.buildings_data, self.local_data, self.parameters, self.set_indexed, self.cluster,
-                                      scenario, self.method, self.solver, self.qbuildings_data)
+                profiler.set_labels(Scn_ID=Scn_ID, Pareto_ID=Pareto_ID, Iter=None, House=None)
+                if self.method['district-scale']:
+                    ampl, exitcode = self.execute_dantzig_wolfe_decomposition(scenario, Scn_ID, Pareto_ID=Pareto_ID)
                 else:
-                    reho = SubProblem(self.infrastructure, self.buildings_data, self.local_data, self.parameters, self.set_indexed, self.cluster,
-                                      scenario, self.method, self.solver)
-                ampl, exitcode = reho.solve_model()
+                    ampl, exitcode = self.solve_compact_model(scenario)
 
-            scenario = {'Objective': objective2}
-            self.add_df_Results(ampl, Scn_ID, Pareto_ID, scenario)
-            self.get_KPIs(Scn_ID, Pareto_ID=Pareto_ID)
+                scenario = {'Objective': objective2}
+                self.add_df_Results(ampl, Scn_ID, Pareto_ID, scenario)
+                self.get_KPIs(Scn_ID, Pareto_ID=Pareto_ID)
+                self.collect_stage_profile()
+                self.save_checkpoint()
 
             obj_values = get_objectives_values(ampl, self.scenario["Objective"], Pareto_ID=Pareto_ID)
 
@@ -297,11 +418,24 @@ class REHO(MasterProblem):
         obj1_house_max = obj1_upper_bound["building_obj1"]
         obj1_house_min = obj1_lower_bound["building_obj1"]
 
+        if self.method['adaptive_pareto']:
+            # Intermediate Pareto points placed where the front is the least known
+            scenario = add_constraints_from_self_scenario()
+            scenario['Objective'] = self.scenario["Objective"][1]
+            self.epsilon_constraints['EMOO_obj1'] = np.array([])
+            upper_bound_ID = self.total_Pareto if not self.method['switch_off_second_objective'] else self.nPareto + 2
+            bounds = {1: obj1_lower_bound, upper_bound_ID: obj1_upper_bound}
+            self.optimize_adaptive_pareto_points(scenario, Scn_ID, range(2, upper_bound_ID), bounds)
+            sort_pareto_points()
+            self.logger.info(str(obj1_min) + " " + str(obj1_max))
+            return
+
         # Intermediate Pareto points: OPEX optimization with CAPEX constraint
         scenario = add_constraints_from_self_scenario()
         scenario['Objective'] = self.scenario["Objective"][1]
         self.epsilon_constraints['EMOO_obj1'] = np.array([])
 
+        points = []
         for nParetoIT in range(2, self.nPareto + 2):
             # Computation of the intermediate RES values
             obj1_eps_lim = (obj1_max - obj1_min) / (self.nPareto + 1) * (nParetoIT - 1) + obj1_min
@@ -314,24 +448,7 @@ class REHO(MasterProblem):
 
             self.epsilon_constraints['EMOO_obj1'] = np.append(self.epsilon_constraints['EMOO_obj1'], obj1_eps_lim)
             self.logger.info('---------------> ' + str(self.scenario["Objective"][0]) + ' LIMIT: ' + str(obj1_eps_lim))
-
-            # Results computation
-            if self.method['district-scale']:
-                ampl, exitcode = self.execute_dantzig_wolfe_decomposition(scenario, Scn_ID, Pareto_ID=nParetoIT, epsilon_init=epsilon_init)
-            else:
-                if self.method['use_facades'] or self.method['use_pv_orientation']:
-                    reho = SubProblem(self.infrastructure, self.buildings_data, self.local_data, self.parameters, self.set_indexed,
-                                      self.cluster, scenario, self.method, self.solver, self.qbuildings_data)
-                else:
-                    reho = SubProblem(self.infrastructure, self.buildings_data, self.local_data, self.parameters, self.set_indexed,
-                                      self.cluster, scenario, self.method, self.solver)
-                ampl, exitcode = reho.solve_model()
-
-            self.add_df_Results(ampl, Scn_ID, nParetoIT, scenario)
-            self.get_KPIs(Scn_ID, Pareto_ID=nParetoIT)
-
-            del ampl
-            gc.collect()  # free memory
+            points.append((copy.deepcopy(scenario), nParetoIT, epsilon_init))
 
         if not self.method['switch_off_second_objective']:
 
@@ -357,31 +474,192 @@ class REHO(MasterProblem):
 
                 self.epsilon_constraints['EMOO_obj2'] = np.append(self.epsilon_constraints['EMOO_obj2'], obj2_eps_lim)
                 self.logger.info('---------------> ' + str(self.scenario["Objective"][1]) + ' LIMIT: ' + str(obj2_eps_lim))
-                # results computation
-                if self.method['district-scale']:
-                    ampl, exitcode = self.execute_dantzig_wolfe_decomposition(scenario, Scn_ID, Pareto_ID=nParetoIT, epsilon_init=epsilon_init)
-                else:
-                    if self.method['use_facades'] or self.method['use_pv_orientation']:
-                        reho = SubProblem(self.infrastructure, self.buildings_data, self.local_data, self.parameters,
-                                          self.set_indexed, self.cluster, scenario, self.method, self.solver, self.qbuildings_data)
-                    else:
-                        reho = SubProblem(self.infrastructure, self.buildings_data, self.local_data, self.parameters,
-                                          self.set_indexed, self.cluster, scenario, self.method, self.solver)
-                    ampl, exitcode = reho.solve_model()
-
-                self.add_df_Results(ampl, Scn_ID, nParetoIT, scenario)
-                self.get_KPIs(Scn_ID, Pareto_ID=nParetoIT)
+                points.append((copy.deepcopy(scenario), nParetoIT, epsilon_init))
 
-                del ampl
-                gc.collect()  # free memory
+        # the intermediate points only depend on their epsilon constraints
+        self.optimize_pareto_points(points, Scn_ID)
 
         sort_pareto_points()
 
         self.logger.info(str(obj1_min) + " " + str(obj1_max))
 
+    def optimize_pareto_point(self, scenario, Scn_ID, Pareto_ID, epsilon_init=None):
+        """
+        Optimizes a Pareto point with the epsilon constraints of ``scenario`` and stores its results.
+        """
+        profiler.set_labels(Scn_ID=Scn_ID, Pareto_ID=Pareto_ID, Iter=None, House=None)
+        if self.method['district-scale']:
+            ampl, exitcode = self.execute_dantzig_wolfe_decomposition(scenario, Scn_ID, Pareto_ID=Pareto_ID, epsilon_init=epsilon_init)
+        else:
+            ampl, exitcode = self.solve_compact_model(scenario)
+
+        self.add_df_Results(ampl, Scn_ID, Pareto_ID, scenario)
+        self.get_KPIs(Scn_ID, Pareto_ID=Pareto_ID)
+        self.collect_stage_profile()
+        self.save_checkpoint()
+
+        del ampl
+        gc.collect()  # free memory
+
+    def optimize_pareto_points(self, points, Scn_ID):
+        """
+        Optimizes the intermediate points of the Pareto curve, given as ``(scenario, Pareto_ID, epsilon_init)``.
+
+        With ``method['parallel_pareto']``, the points are solved concurrently by ``method['n_workers_pareto']`` worker
+        processes, each on a copy of the model. Their results are then merged in the order of the Pareto IDs.
+        For the decomposition, the feasible solutions of each point are renumbered to their own range when merged, and
+        the solutions of the other points are not shared (``include_all_solutions`` is not applied between concurrent points).
+        The points already completed, e.g. restored from a checkpoint (see ``resume``), are not optimized again.
+        """
+        points = [point for point in points if point[1] not in self.results.get(Scn_ID, {})]
+        if not self.method['parallel_pareto'] or len(points) < 2:
+            for scenario, Pareto_ID, epsilon_init in points:
+                self.optimize_pareto_point(scenario, Scn_ID, Pareto_ID, epsilon_init)
+            return
+
+        n_workers = sub_problem_pool.get_n_workers(self.method['n_workers_pareto'], len(points))
+        self.logger.info('Solve ' + str(len(points)) + ' Pareto points with ' + str(n_workers) + ' workers')
+        self.release_persistent_SPs()
+        self.release_persistent_MP()
+
+        states = dict()
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            futures = {executor.submit(solve_pareto_point, self, scenario, Scn_ID, Pareto_ID, epsilon_init, self.feasible_solutions): Pareto_ID
+                       for scenario, Pareto_ID, epsilon_init in points}
+            sub_problem_pool.collect_results(futures, states.__setitem__, logger=self.logger)
+
+        first_feasible_solution = self.feasible_solutions
+        for scenario, Pareto_ID, epsilon_init in points:
+            self.merge_pareto_point_state(Scn_ID, Pareto_ID, states[Pareto_ID], first_feasible_solution)
+        self.save_checkpoint()
+
+    def optimize_adaptive_pareto_points(self, scenario, Scn_ID, Pareto_IDs, bounds):
+        """
+        Optimizes the intermediate points of the Pareto curve one segment of the front at a time.
+
+        The front is normalized by its bounds and the segment between two neighbouring points spanning the largest
+        rectangle is bisected: a large rectangle means a large gap between the points or a strongly curved front, and
+        the sum of the rectangles bounds the hypervolume left to discover. The new point minimizes the second objective
+        with the first one constrained to the middle of the segment. The sampling stops when all the ``Pareto_IDs``
+        are used or when the sum of the rectangles is below ``method['pareto_tolerance']``.
+        With ``method['parallel_pareto']``, ``method['n_workers_pareto']`` segments are bisected at once.
+
+        Parameters
+        ----------
+        scenario : dict
+            Scenario of the intermediate points, minimizing the second objective.
+        Scn_ID : str
+            Scenario name.
+        Pareto_IDs : list
+            IDs available for the intermediate points.
+        bounds : dict
+            Objective values of the bounds of the curve, as returned by ``get_objectives_values``, by Pareto ID.
+        """
+        objective1 = self.scenario["Objective"][0]
+        front = {Pareto_ID: (obj_values["district_obj1"], obj_values["district_obj2"]) for Pareto_ID, obj_values in bounds.items()}
+        obj1_house = {Pareto_ID: obj_values["building_obj1"] for Pareto_ID, obj_values in bounds.items()}
+        obj1_min, obj1_max = front[min(front)][0], front[max(front)][0]
+
+        if self.method['parallel_pareto']:
+            batch = sub_problem_pool.get_n_workers(self.method['n_workers_pareto'], len(Pareto_IDs))
+        else:
+            batch = 1
+        Pareto_IDs = list(Pareto_IDs)
+        while Pareto_IDs:
+            segments, hypervolume_gap = select_pareto_segments(front, min(batch, len(Pareto_IDs)))
+            self.logger.info('Hypervolume gap of the Pareto curve: ' + str(hypervolume_gap))
+            if not segments or hypervolume_gap <= self.method['pareto_tolerance']:
+                break
+
+            points = []
+            for a, b in segments:
+                Pareto_ID = Pareto_IDs.pop(0)
+                obj1_eps_lim = (front[a][0] + front[b][0]) / 2
+                if self.method['building-scale'] and obj1_max != obj1_min:
+                    position = (obj1_eps_lim - obj1_min) / (obj1_max - obj1_min)
+                    epsilon_init = obj1_house[min(front)] + position * (obj1_house[max(front)] - obj1_house[min(front)])
+                else:
+                    epsilon_init = None
+
+                if objective1 in ["OPEX", "CAPEX", "TOTEX", "GWP"]:
+                    scenario['EMOO']['EMOO_' + objective1] = obj1_eps_lim
+                else:
+                    scenario['EMOO']['EMOO_lca'] = {objective1: obj1_eps_lim}
+
+                self.epsilon_constraints['EMOO_obj1'] = np.append(self.epsilon_constraints['EMOO_obj1'], obj1_eps_lim)
+                self.logger.info('---------------> ' + str(objective1) + ' LIMIT: ' + str(obj1_eps_lim))
+                points.append((copy.deepcopy(scenario), Pareto_ID, epsilon_init))
+
+            self.optimize_pareto_points(points, Scn_ID)
+            for scenario_point, Pareto_ID, epsilon_init in points:
+                front[Pareto_ID] = self.get_pareto_objectives(Scn_ID, Pareto_ID)
+
+    def get_pareto_objectives(self, Scn_ID, Pareto_ID):
+        """
+        Returns the district values of both objectives of a Pareto point, per m2 of ERA, from its results.
+        """
+        df_Performance = self.results[Scn_ID][Pareto_ID]["df_Performance"].xs("Network")
+        obj_values = []
+        for obj in self.scenario["Objective"]:
+            if obj == "CAPEX":
+                value = df_Performance["Costs_inv"] + df_Performance["Costs_rep"]
+            elif obj == "OPEX":
+                value = df_Performance["Costs_op"]
+            elif obj == "TOTEX":
+                value = df_Performance["Costs_inv"] + df_Performance["Costs_rep"] + df_Performance["Costs_op"]
+            elif obj == "GWP":
+                value = df_Performance["GWP_op"] + df_Performance["GWP_constr"]
+            else:
+                value = self.results[Scn_ID][Pareto_ID]["df_lca_Performance"][obj]["Network"]
+            obj_values.append(value / self.ERA)
+        return tuple(obj_values)
+
+    # results of the decomposition appended by each Pareto point
+    pareto_tracking_attributes = ['stopping_criteria', 'number_SP_solutions', 'solver_attributes_SP', 'solver_attributes_MP', 'reduced_costs']
+
+    def get_pareto_point_state(self, Scn_ID, Pareto_ID, lengths):
+        """
+        Returns the results of a Pareto point solved by a worker, see ``optimize_pareto_points``. ``lengths`` gives the
+        number of rows of the ``pareto_tracking_attributes`` before the point was solved.
+        """
+        state = {'results': self.results[Scn_ID][Pareto_ID]}
+        if self.method['profile']:
+            state['stage_profile'] = self.stage_profile
+            state['model_template_counts'] = self.model_template_counts
+        if self.method['district-scale']:
+            state['results_SP'] = [(key, self.results_SP.get_results(key)) for key in self.results_SP.keys_list if key[0:2] == (Scn_ID, Pareto_ID)]
+            state['results_MP'] = self.results_MP[Scn_ID][Pareto_ID]
+            state['lower_bounds'] = {key: value for key, value in self.lower_bounds.items() if key == (Scn_ID, Pareto_ID)}
+            state['feasible_solutions'] = self.feasible_solutions
+            for attribute in self.pareto_tracking_attributes:
+                state[attribute] = getattr(self, attribute).iloc[lengths[attribute]:]
+        return state
+
+    def merge_pareto_point_state(self, Scn_ID, Pareto_ID, state, first_feasible_solution):
+        """
+        Adds the results of a Pareto point solved by a worker, see ``get_pareto_point_state``. The worker numbered its
+        feasible solutions from ``first_feasible_solution``, they are shifted after the feasible solutions already merged.
+        """
+        offset = self.feasible_solutions - first_feasible_solution if self.method['district-scale'] else 0
+        self.results.setdefault(Scn_ID, dict())[Pareto_ID] = shift_feasible_solutions(state['results'], offset)
+        if 'stage_profile' in state:
+            self.add_stage_records(state['stage_profile'].to_dict('records'))
+            self.add_model_template_counts([state['model_template_counts']])
+        if self.method['district-scale']:
+            keys = [(key[0], key[1], key[2], key[3] + offset, key[4]) for key, df_Results in state['results_SP']]
+            assert all(key[3] >= self.feasible_solutions for key in keys), 'feasible solutions of the Pareto points overlap'
+            for key, (_, df_Results) in zip(keys, state['results_SP']):
+                self.results_SP.add(*key, df_Results)
+            self.results_MP.setdefault(Scn_ID, dict())[Pareto_ID] = shift_feasible_solutions(state['results_MP'], offset)
+            self.lower_bounds.update(state['lower_bounds'])
+            self.feasible_solutions = state['feasible_solutions'] + offset
+            for attribute in self.pareto_tracking_attributes:
+                setattr(self, attribute, pd.concat([getattr(self, attribute), shift_feasible_solutions(state[attribute], offset)]))
+            col = self.number_SP_solutions.columns.difference(["House"])
+            self.number_MP_solutions = self.number_SP_solutions[col].groupby('MP_solution').mean(numeric_only=True)
+
     def get_DHN_costs(self):
 
-        self.pool = mp.Pool(mp.cpu_count())
         self.iter = 0  # new scenario has to start at iter = 0
         method = self.method['building-scale']
         self.method['building-scale'] = True
@@ -405,16 +683,19 @@ class REHO(MasterProblem):
         for bui in self.infrastructure.houses.keys():
             self.infrastructure.Units_Parameters.loc["DHN_pipes_" + bui, ["Units_Fmax", "Cost_inv2"]] = [heat_flow[bui] * 1.001, dhn_invh]
 
-        self.pool.close()
+        self.release_persistent_SPs()  # the SPs of the next decomposition are built with the new DHN parameters
+        self.release_persistent_MP()
         self.method['building-scale'] = method
         self.initialize_optimization_tracking_attributes()
 
     def add_df_Results(self, ampl, Scn_ID, Pareto_ID, scenario):
-        if self.method['building-scale'] or self.method['district-scale']:
-            df_Results = self.get_df_Results_from_MP_and_SPs(Scn_ID, Pareto_ID)
-        else:
-            df_Results = write_results.get_df_Results_from_SP(ampl, scenario, self.method, self.buildings_data)
-            # self.get_solver_attributes(Scn_ID, Pareto_ID, ampl)
+        profiler.set_labels(Scn_ID=Scn_ID, Pareto_ID=Pareto_ID, Iter=None, House=None)
+        with profiler.stage('add_df_Results'):
+            if self.method['building-scale'] or self.method['district-scale']:
+                df_Results = self.get_df_Results_from_MP_and_SPs(Scn_ID, Pareto_ID)
+            else:
+                df_Results = write_results.get_df_Results_from_SP(ampl, scenario, self.method, self.buildings_data)
+                # self.get_solver_attributes(Scn_ID, Pareto_ID, ampl)
 
         if Scn_ID not in self.results:
             self.results[Scn_ID] = {}
@@ -443,6 +724,10 @@ class REHO(MasterProblem):
 
         for column in ["Costs_op", "Costs_inv", "Costs_cft", "GWP_op", "GWP_constr"]:
             df_Performance.loc[:, column] = last_results["df_District"][column]
+        if (self.multiplicity != 1).any():  # the MP values of an archetype include all the buildings it represents
+            houses = self.multiplicity.index
+            columns = ["Costs_op", "Costs_inv", "Costs_cft", "GWP_op", "GWP_constr"]
+            df_Performance.loc[houses, columns] = df_Performance.loc[houses, columns].div(self.multiplicity, axis=0)
         df_Performance.loc['Network', 'ANN_factor'] = df_Performance['ANN_factor'][0]
 
         if self.method["actors_problem"]:
@@ -463,7 +748,8 @@ class REHO(MasterProblem):
         df_network = last_results["df_District_t"].copy()
         df_network[["Network_supply", "Network_demand"]] = df_network[["Network_supply", "Network_demand"]].divide(h_op, axis=0, level='Period')
 
-        df_network["Uncontrollable_load"] = df.groupby(["Layer", "Period", "Time"]).sum()["Uncontrollable_load"]
+        multiplicity = self.multiplicity.reindex(df.index.get_level_values('Hub'), fill_value=1).values
+        df_network["Uncontrollable_load"] = df["Uncontrollable_load"].mul(multiplicity).groupby(["Layer", "Period", "Time"]).sum()
 
         df_network = pd.concat([df_network], keys=['Network'], names=['Hub']).reorder_levels(['Layer', 'Hub', 'Period', 'Time'])
         df_network = df_network.rename(columns={"Cost_demand_network": "Cost_demand",
@@ -542,15 +828,10 @@ class REHO(MasterProblem):
         if self.method["save_data_input"]:
             df_Results["df_Buildings"] = df_Buildings
 
-            # df_Weather
-            ids = self.number_SP_solutions.iloc[0]
-            df_Weather = self.results_SP[ids["Scn_ID"]][ids["Pareto_ID"]][ids["Iter"]][ids["FeasibleSolution"]][ids["House"]]["df_Weather"]
-            df_Results["df_Weather"] = df_Weather
-
-            # df_Index
-            ids = self.number_SP_solutions.iloc[0]
-            df_Index = self.results_SP[ids["Scn_ID"]][ids["Pareto_ID"]][ids["Iter"]][ids["FeasibleSolution"]][ids["House"]]["df_Index"]
-            df_Results["df_Index"] = df_Index
+            # df_Weather and df_Index, the same for all the SPs: taken from a selected SP, whose results are complete with lazy extraction
+            SP_results = self.results_SP.get_results(self.results_SP.columns[tuple(MP_selection[0])][0])
+            df_Results["df_Weather"] = SP_results["df_Weather"]
+            df_Results["df_Index"] = SP_results["df_Index"]
 
         # df_Buildings_t
         df_Buildings_t = self.get_final_SPs_results(MP_selection, 'df_Buildings_t')
@@ -581,15 +862,12 @@ class REHO(MasterProblem):
         return df_Results
 
     def get_final_SPs_results(self, MP_selection, df_name):
-        data = self.return_combined_SP_results(self.results_SP, df_name)
-        df = pd.DataFrame()
-        for idx in MP_selection.values:
-            df_idx = data.xs(idx, level=('FeasibleSolution', 'house'), drop_level=False)
-            df = pd.concat([df, df_idx])
-        return df
+        return self.results_SP.select(df_name, MP_selection.values)
 
     def get_KPIs(self, Scn_ID=0, Pareto_ID=0):
-        df_KPI, df_Economics = calculate_KPIs(self.results[Scn_ID][Pareto_ID], self.infrastructure, self.buildings_data, self.cluster, self.local_data["df_Timestamp"], self.local_data["df_Emissions"])
+        with profiler.stage('calculate_KPIs'):
+            df_KPI, df_Economics = calculate_KPIs(self.results[Scn_ID][Pareto_ID], self.infrastructure, self.buildings_data, self.cluster,
+                                                  self.local_data["df_Timestamp"], self.local_data["df_Emissions"])
         self.results[Scn_ID][Pareto_ID]["df_KPIs"] = df_KPI
         self.results[Scn_ID][Pareto_ID]["df_Economics"] = df_Economics
         if self.method['building-scale']:
@@ -670,3 +948,77 @@ class REHO(MasterProblem):
 
                     writer.close()
                     self.logger.info('Results are saved in ' + result_file_path)
+
+
+def select_pareto_segments(front, n_segments=1):
+    """
+    Selects the segments of a Pareto front to bisect.
+
+    Parameters
+    ----------
+    front : dict
+        Values of both objectives of each Pareto point, by Pareto ID.
+    n_segments : int
+        Maximal number of segments returned.
+
+    Returns
+    -------
+    list
+        Pairs of neighbouring Pareto IDs, by decreasing area of the rectangle they span in the normalized objective space.
+    float
+        Sum of the areas of the rectangles, an upper bound of the normalized hypervolume missing between the points.
+    """
+    points = pd.DataFrame.from_dict(front, orient='index', columns=['obj1', 'obj2']).sort_values(['obj1', 'obj2'])
+    ranges = points.max() - points.min()
+    ranges[ranges == 0] = 1
+    points = (points - points.min()) / ranges
+
+    delta = points.diff().iloc[1:].abs()
+    areas = pd.Series((delta['obj1'] * delta['obj2']).values, index=list(zip(points.index[:-1], points.index[1:])))
+    # the segments that cannot be bisected on the first objective are already resolved
+    areas = areas[delta['obj1'].values > 1e-6]
+    segments = areas[areas > 0].sort_values(ascending=False, kind='stable')
+    return list(segments.index[0:n_segments]), areas.sum()
+
+
+def shift_feasible_solutions(results, offset):
+    """
+    Returns the results (DataFrames or nested dictionaries of DataFrames) with the feasible solutions, in the index
+    level or the column ``FeasibleSolution``, shifted by ``offset``. The DataFrames are not modified.
+    """
+    if isinstance(results, dict):
+        return {key: shift_feasible_solutions(value, offset) for key, value in results.items()}
+    if offset == 0 or not isinstance(results, (pd.DataFrame, pd.Series)):
+        return results
+    if 'FeasibleSolution' in results.index.names:
+        results = results.copy(deep=False)
+        if isinstance(results.index, pd.MultiIndex):
+            level = results.index.names.index('FeasibleSolution')
+            results.index = results.index.set_levels(results.index.levels[level] + offset, level=level)
+        else:
+            results.index = results.index + offset
+    if isinstance(results, pd.DataFrame) and 'FeasibleSolution' in results.columns:
+        results = results.assign(FeasibleSolution=results['FeasibleSolution'] + offset)
+    return results
+
+
+def solve_pareto_point(reho, scenario, Scn_ID, Pareto_ID, epsilon_init, feasible_solutions):
+    """
+    Optimizes a Pareto point in a worker process, on the copy ``reho`` of the model, see ``REHO.optimize_pareto_points``.
+    """
+    # the worker processes, persistent models and shared memory of the parent are not transferred
+    reho.pool = None
+    reho.shared_local_data = None
+    reho.ampl_MP = None
+    reho.compact_model = None
+    reho.pending_SPs = dict()
+    reho.SP_data_sent, reho.SP_data_fingerprints = dict(), dict()
+    reho.method = dict(reho.method, checkpoint=None, profile_stream=None)  # the checkpoints and the profile are written by the parent process
+    reho.stage_profile = pd.DataFrame()
+    reho.model_template_counts = {'hits': 0, 'misses': 0, 'hit_rate': None}
+    profiler.enable(reho.method['profile'])
+    reho.feasible_solutions = feasible_solutions
+    lengths = {attribute: len(getattr(reho, attribute)) for attribute in reho.pareto_tracking_attributes}
+    with reho:
+        reho.optimize_pareto_point(scenario, Scn_ID, Pareto_ID, epsilon_init)
+        return reho.get_pareto_point_state(Scn_ID, Pareto_ID, lengths)
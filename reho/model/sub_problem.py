@@ -7,6 +7,7 @@ import reho.model.preprocessing.EV_profile_generator as EV_gen
 import reho.model.preprocessing.buildings_profiles as buildings_profiles
 import reho.model.preprocessing.emissions_parser as emissions
 import reho.model.preprocessing.weather as weather
+import reho.model.profiler as profiler
 from reho.model.preprocessing.QBuildings import *
 
 __doc__ = """
@@ -69,20 +70,31 @@ class SubProblem:
         self.method_sp = method
         self.solver = solver
         self.parameters_to_ampl = dict()
+        self.time_end = None  # (Period, TimeEnd) of each period, see set_streams_temperature
 
     def build_model_without_solving(self):
-        self.initialize_parameters_for_ampl_and_python()
-        ampl = self.init_ampl_model()
-        ampl = self.set_weather_data(ampl)
-        ampl = self.set_ampl_sets(ampl)
-        self.set_emissions_profiles()
-        self.set_temperature_and_EVs_profiles()
-        self.set_HP_parameters(ampl)
-        self.set_streams_temperature(ampl)
+        # each stage is timed when the profiler is enabled, see method['profile']
+        with profiler.stage('initialize_parameters'):
+            self.initialize_parameters_for_ampl_and_python()
+        with profiler.stage('init_ampl_model'):
+            ampl = self.init_ampl_model()
+        with profiler.stage('set_weather_data'):
+            ampl = self.set_weather_data(ampl)
+        with profiler.stage('set_ampl_sets'):
+            ampl = self.set_ampl_sets(ampl)
+        with profiler.stage('set_profiles'):
+            self.set_emissions_profiles()
+            self.set_temperature_and_EVs_profiles()
+            self.set_HP_parameters(ampl)
+        with profiler.stage('set_streams_temperature'):
+            self.set_streams_temperature(ampl)
         if self.method_sp['use_pv_orientation']:
-            self.set_PV_models(ampl)
-        ampl = self.send_parameters_and_sets_to_ampl(ampl)
-        ampl = self.set_scenario(ampl)
+            with profiler.stage('set_PV_models'):
+                self.set_PV_models(ampl)
+        with profiler.stage('send_parameters_and_sets_to_ampl'):
+            ampl = self.send_parameters_and_sets_to_ampl(ampl)
+        with profiler.stage('set_scenario'):
+            ampl = self.set_scenario(ampl)
         return ampl
 
     def initialize_parameters_for_ampl_and_python(self):
@@ -122,107 +134,83 @@ class SubProblem:
             except:
                 raise Exception("No AMPL license was found. Please refer to the documentation to set the AMPL license.")
 
-        # -AMPL (GNU) OPTIONS
-        ampl.setOption('solution_round', 11)
+        ampl.cd(path_to_ampl_model)
+        ampl.eval(get_model_template(self.get_ampl_options(), self.get_model_files()))
+
+        return ampl
 
-        ampl.setOption('presolve_eps', 1e-4)  # -ignore difference between upper and lower bound by this tolerance
-        ampl.setOption('presolve_inteps', 1e-6)  # -tolerance added/substracted to each upper/lower bound
-        ampl.setOption('presolve_fixeps', 1e-9)
+    def get_ampl_options(self):
+        """
+        Returns the AMPL options of the SP, as statements.
+        """
+        # -AMPL (GNU) OPTIONS
+        options = ['option solution_round 11;',
+                   'option presolve_eps 1e-4;',  # -ignore difference between upper and lower bound by this tolerance
+                   'option presolve_inteps 1e-6;',  # -tolerance added/substracted to each upper/lower bound
+                   'option presolve_fixeps 1e-9;']
         if not self.method_sp['print_logs']:
-            ampl.setOption('show_stats', 0)
-            ampl.setOption('solver_msg', 0)
+            options += ['option show_stats 0;', 'option solver_msg 0;']
 
         # -SOLVER OPTIONS
-        ampl.setOption('solver', self.solver)
+        options.append('option solver ' + self.solver + ';')
         if self.solver == "gurobi":
-            ampl.eval("option gurobi_options 'NodeFileStart=0.5';")
+            options.append("option gurobi_options 'NodeFileStart=0.5';")
         if self.solver == "cplex":
-            ampl.eval("option cplex_options 'bestbound mipgap=5e-7 integrality=1e-09 timing=1 timelimit=3000';")
-
+            options.append("option cplex_options 'bestbound mipgap=5e-7 integrality=1e-09 timing=1 timelimit=3000';")
+        return tuple(options)
+
+    def get_model_files(self):
+        """
+        Returns the model files of the SP, as ``(directory, file)``, depending on the units and on the methods. The
+        statements evaluated between the files are given as ``(None, statement)``.
+        """
         # -----------------------------------------------------------------------------------------------------#
         #  MODEL FILES
         # -----------------------------------------------------------------------------------------------------#
-        ampl.cd(path_to_ampl_model)
-        ampl.read('sub_problem.mod')
+        unit_types = self.infrastructure_sp.UnitTypes
+        files = [(path_to_ampl_model, 'sub_problem.mod')]
 
         # Energy conversion Units
-        ampl.cd(path_to_units)
-        if 'ElectricalHeater' in self.infrastructure_sp.UnitTypes:
-            ampl.read('electrical_heater.mod')
-        if 'NG_Boiler' in self.infrastructure_sp.UnitTypes:
-            ampl.read('ng_boiler.mod')
-        if 'OIL_Boiler' in self.infrastructure_sp.UnitTypes:
-            ampl.read('oil_boiler.mod')
-        if 'WOOD_Stove' in self.infrastructure_sp.UnitTypes:
-            ampl.read('wood_stove.mod')
-        if 'HeatPump' in self.infrastructure_sp.UnitTypes:
-            ampl.read('heatpump.mod')
-        if 'Air_Conditioner' in self.infrastructure_sp.UnitTypes:
-            ampl.read('air_conditioner.mod')
-        if 'ThermalSolar' in self.infrastructure_sp.UnitTypes:
-            ampl.read('thermal_solar.mod')
-        if 'DataHeat' in self.infrastructure_sp.UnitTypes:
-            ampl.read('data_heat.mod')
-        if 'NG_Cogeneration' in self.infrastructure_sp.UnitTypes:
-            ampl.read('ng_cogeneration.mod')
-        if 'DHN_hex' in self.infrastructure_sp.UnitTypes:
-            ampl.read('DHN_hex.mod')
-            ampl.read('DHN_pipes.mod')
-        if 'PV' in self.infrastructure_sp.UnitTypes:
+        unit_files = [('ElectricalHeater', 'electrical_heater.mod'), ('NG_Boiler', 'ng_boiler.mod'), ('OIL_Boiler', 'oil_boiler.mod'),
+                      ('WOOD_Stove', 'wood_stove.mod'), ('HeatPump', 'heatpump.mod'), ('Air_Conditioner', 'air_conditioner.mod'),
+                      ('ThermalSolar', 'thermal_solar.mod'), ('DataHeat', 'data_heat.mod'), ('NG_Cogeneration', 'ng_cogeneration.mod'),
+                      ('DHN_hex', 'DHN_HEX.mod'), ('DHN_hex', 'DHN_pipes.mod')]
+        files += [(path_to_units, file) for unit, file in unit_files if unit in unit_types]
+        if 'PV' in unit_types:
             if self.method_sp['use_pv_orientation']:
-                ampl.read('pv_orientation.mod')
+                files.append((path_to_units, 'pv_orientation.mod'))
             else:
-                ampl.read('pv.mod')
+                files.append((path_to_units, 'pv.mod'))
 
         # district Units
-        if 'EV' in self.infrastructure_sp.UnitTypes:
-            ampl.cd(path_to_district_units)
-            ampl.read('evehicle.mod')
+        if 'EV' in unit_types:
+            files.append((path_to_district_units, 'evehicle.mod'))
         # Storage Units
-        ampl.cd(path_to_units_storage)
-        if 'WaterTankSH' in self.infrastructure_sp.UnitTypes:
-            ampl.read('heatstorage.mod')
-        if 'WaterTankDHW' in self.infrastructure_sp.UnitTypes:
-            ampl.read('dhwstorage.mod')
-        if 'Battery' in self.infrastructure_sp.UnitTypes:
-            ampl.read('battery.mod')
-        ampl.cd(path_to_ampl_model)
+        unit_files = [('WaterTankSH', 'heatstorage.mod'), ('WaterTankDHW', 'dhwstorage.mod'), ('Battery', 'battery.mod')]
+        files += [(path_to_units_storage, file) for unit, file in unit_files if unit in unit_types]
 
         # Objectives, epsilon constraints and specific constraints
-        ampl.read('scenario.mod')
+        files.append((path_to_ampl_model, 'scenario.mod'))
 
         # TODO: integrate all storage units into infrastructure (avoid using ampl eval)
         if self.method_sp['use_Storage_Interperiod']:
-            ampl.eval(
-                'set UnitsOfStorage := setof{u in UnitsOfType["Battery_interperiod"] union UnitsOfType["PTES_storage"]'
-                'union UnitsOfType["PTES_conversion"] union UnitsOfType["CH4storage"]'
-                'union UnitsOfType["H2storage"] union UnitsOfType["SOEFC"]'
-                'union UnitsOfType["Methanizer"] union UnitsOfType["FuelCell"]'
-                'union UnitsOfType["Electrolyzer"] union UnitsOfType["WaterTankSH_interperiod"]'
-                'union UnitsOfType["SolidLiquidLHS"]'
-                '} u;')
+            files.append((None,
+                          'set UnitsOfStorage := setof{u in UnitsOfType["Battery_interperiod"] union UnitsOfType["PTES_storage"]'
+                          'union UnitsOfType["PTES_conversion"] union UnitsOfType["CH4storage"]'
+                          'union UnitsOfType["H2storage"] union UnitsOfType["SOEFC"]'
+                          'union UnitsOfType["Methanizer"] union UnitsOfType["FuelCell"]'
+                          'union UnitsOfType["Electrolyzer"] union UnitsOfType["WaterTankSH_interperiod"]'
+                          'union UnitsOfType["SolidLiquidLHS"]'
+                          '} u;'))
 
             # Storage Units
-            ampl.cd(path_to_units_storage)
-            ampl.read('h2_storage.mod')
-            ampl.read('heatstorage_interperiod.mod')
-            ampl.read('LHS_storage.mod')
-            ampl.read('battery_interperiod.mod')
-            ampl.read('PTES.mod')
-            ampl.read('CH4_tank.mod')
-
+            files += [(path_to_units_storage, file) for file in ['h2_storage.mod', 'heatstorage_interperiod.mod', 'LHS_storage.mod',
+                                                                 'battery_interperiod.mod', 'PTES.mod', 'CH4_tank.mod']]
             # H2 Units
-            ampl.cd(path_to_units_h2)
-            ampl.read('fuel_cell.mod')
-            ampl.read('electrolyser.mod')
-            ampl.read('SOEFC.mod')
-            ampl.read('methanizer.mod')
-
-            ampl.cd(path_to_units)
-            ampl.read('heat_curtailment.mod')
-            ampl.cd(path_to_ampl_model)
+            files += [(path_to_units_h2, file) for file in ['fuel_cell.mod', 'electrolyser.mod', 'SOEFC.mod', 'methanizer.mod']]
+            files.append((path_to_units, 'heat_curtailment.mod'))
 
-        return ampl
+        return tuple(files)
 
     def set_weather_data(self, ampl):
         # -----------------------------------------------------------------------------------------------------#
@@ -376,33 +364,19 @@ class SubProblem:
                 del self.parameters_sp["T_source_cool"]
 
     def set_streams_temperature(self, ampl):
-
         df_end = ampl.getParameter('TimeEnd').getValues().toPandas()
-        timesteps = int(df_end['TimeEnd'].sum())
-        df_Streams_T = pd.DataFrame(columns=["Period", "Time", "Streams", "Streams_Tout", "Streams_Tin"])
-        df_Streams_T = df_Streams_T.set_index(["Period", "Time", "Streams"])
-
-        index = [[(i, j + 1) for j in list(range(int(df_end["TimeEnd"][i])))] for i in df_end.index]
-        index = [j for i in index for j in i]
-        index = pd.MultiIndex.from_tuples(index, names=["Period", "Time"])
+        time_end = tuple((p, int(df_end['TimeEnd'][p])) for p in df_end.index)
+        self.time_end = time_end
 
+        streams = []
         for bui in self.infrastructure_sp.houses:
             for unit_data in self.infrastructure_sp.houses[bui]["units"]:
                 for i, T_level in enumerate(unit_data["StreamsOfUnit"]):
-                    stream = unit_data["name"] + '_' + bui + '_' + T_level
-                    df = pd.DataFrame(np.repeat(stream, timesteps), index=index, columns=["Streams"])
-                    df["Streams_Tout"] = unit_data["stream_Tout"][i]
-                    df["Streams_Tin"] = unit_data["stream_Tin"][i]
-                    df.set_index("Streams", append=True, inplace=True)
-                    df_Streams_T = pd.concat([df_Streams_T, df])
+                    streams.append((unit_data["name"] + '_' + bui + '_' + T_level, unit_data["stream_Tout"][i], unit_data["stream_Tin"][i]))
             for stream in self.infrastructure_sp.StreamsOfBuilding[bui]:
-                df = pd.DataFrame(np.repeat(stream, timesteps), index=index, columns=["Streams"])
-                df["Streams_Tout"] = 40  # default value that is changed in data_stream.dat
-                df["Streams_Tin"] = 50  # default value that is changed in data_stream.dat
-                df.set_index("Streams", append=True, inplace=True)
-                df_Streams_T = pd.concat([df_Streams_T, df])
+                streams.append((stream, 40, 50))  # default values that are changed in data_stream.dat
 
-        self.parameters_to_ampl['streams_T'] = df_Streams_T.reorder_levels([2, 0, 1])
+        self.parameters_to_ampl['streams_T'] = get_streams_temperature(tuple(streams), time_end)
 
     def set_PV_models(self, ampl):
         # --------------- PV Panels ---------------------------------------------------------------------------#
@@ -531,38 +505,10 @@ class SubProblem:
                 raise ValueError('Type Error setting AMPLPY Set', s)
 
         # set new input Parameter
-        for i in self.parameters_to_ampl:
-
-            if isinstance(self.parameters_to_ampl[i], np.ndarray):
-                Para = ampl.getParameter(i)
-                Para.setValues(self.parameters_to_ampl[i])
-
-            elif isinstance(self.parameters_to_ampl[i], list):
-                Para = ampl.getParameter(i)
-                Para.setValues(np.array(self.parameters_to_ampl[i]))
-
-            elif isinstance(self.parameters_to_ampl[i], pd.DataFrame):
-                ampl.setData(self.parameters_to_ampl[i])
-
-            elif isinstance(self.parameters_to_ampl[i], pd.Series):
-                self.parameters_to_ampl[i].name = i
-                df = pd.DataFrame(self.parameters_to_ampl[i])
-                ampl.setData(df)
-
-            elif isinstance(self.parameters_to_ampl[i], dict):
-                Para = ampl.getParameter(i)
-                Para.setValues(self.parameters_to_ampl[i])
-
-            elif isinstance(self.parameters_to_ampl[i], float):
-                Para = ampl.getParameter(i)
-                Para.setValues([self.parameters_to_ampl[i]])
-
-            elif isinstance(self.parameters_to_ampl[i], int):
-                Para = ampl.getParameter(i)
-                Para.setValues([self.parameters_to_ampl[i]])
-
-            else:
-                raise ValueError('Type Error setting AMPLPY Parameter', i)
+        parameters = self.parameters_to_ampl
+        if self.time_end is not None:
+            parameters = index_profiles(parameters, self.infrastructure_sp.Set['House'], self.time_end)
+        send_parameters_to_ampl(ampl, parameters)
 
         # TODO remove data_stream.dat
         ampl.readData('data_stream.dat')
@@ -643,6 +589,60 @@ class SubProblem:
 
         return ampl
 
+    def update_scenario(self, ampl, scenario):
+        """
+        Sets a new scenario to an AMPL model which has already been built: the objective function, the epsilon
+        constraints and the specific constraints are selected again, the sets and the parameters are kept.
+
+        Parameters
+        ----------
+        ampl : AMPL
+            Model returned by ``build_model_without_solving``.
+        scenario : dict
+            New scenario, with the same ``exclude_units`` and ``enforce_units`` as the one of the built model.
+
+        Returns
+        -------
+        ampl : AMPL
+            The updated model, ready to be solved.
+        """
+        if 'exclude_units' not in scenario:
+            scenario['exclude_units'] = []
+        if 'enforce_units' not in scenario:
+            scenario['enforce_units'] = []
+        # the specific constraints of the previous scenario are dropped by set_scenario only if they are known
+        for specific_constraint in self.scenario_sp.get('specific', []):
+            if specific_constraint not in scenario.get('specific', []):
+                try:
+                    ampl.getConstraint(specific_constraint).drop()
+                except Exception as e:
+                    logging.warning('Specific constraint "' + str(specific_constraint) + '" of the previous scenario could not be dropped: ' + repr(e))
+        self.scenario_sp = scenario
+        return self.set_scenario(ampl)
+
+    def update_parameters(self, ampl, parameters):
+        """
+        Sends new values of parameters to an AMPL model which has already been built, without reading the model files again.
+
+        Parameters
+        ----------
+        ampl : AMPL
+            Model returned by ``build_model_without_solving``.
+        parameters : dict
+            Parameters to update, usually the dual values of a new Dantzig-Wolfe iteration.
+
+        Returns
+        -------
+        ampl : AMPL
+            The updated model, ready to be solved.
+        """
+        for i in parameters:
+            self.parameters_sp[i] = parameters[i]
+            self.parameters_to_ampl[i] = parameters[i]
+        send_parameters_to_ampl(ampl, parameters)
+
+        return ampl
+
     def solve_model(self):
         ampl = self.build_model_without_solving()
 
@@ -693,6 +693,22 @@ def initialize_default_methods(method):
         method['parallel_computation'] = True
     if 'switch_off_second_objective' not in method:
         method['switch_off_second_objective'] = False
+    if 'parallel_pareto' not in method:
+        method['parallel_pareto'] = False
+    if 'n_workers_pareto' not in method:
+        method['n_workers_pareto'] = None
+    if 'checkpoint' not in method:
+        method['checkpoint'] = None
+    if 'profile' not in method:
+        method['profile'] = False
+    if 'profile_stream' not in method:
+        method['profile_stream'] = None
+    if 'persistent_compact_model' not in method:
+        method['persistent_compact_model'] = False
+    if 'adaptive_pareto' not in method:
+        method['adaptive_pareto'] = False
+    if 'pareto_tolerance' not in method:
+        method['pareto_tolerance'] = 0
 
     if 'fix_units' not in method:
         method['fix_units'] = False
@@ -735,6 +751,258 @@ def initialize_default_methods(method):
     return method
 
 
+# tables of the stream temperatures already built in this process, see get_streams_temperature
+_streams_temperature_cache = dict()
+streams_temperature_cache_size = 256
+
+
+def get_streams_temperature(streams, time_end):
+    """
+    Returns the temperatures of the streams at each time step, indexed on ``(Streams, Period, Time)``. The tables are
+    kept in the process, the SPs of the same building reuse them: they must not be modified.
+
+    Parameters
+    ----------
+    streams : tuple
+        ``(stream, Tout, Tin)`` of each stream.
+    time_end : tuple
+        ``(Period, TimeEnd)`` of each period.
+
+    Returns
+    -------
+    pd.DataFrame
+        With the columns ``Streams_Tout`` and ``Streams_Tin``.
+    """
+    key = (streams, time_end)
+    if key not in _streams_temperature_cache:
+        periods = np.concatenate([np.repeat(p, n) for p, n in time_end])
+        times = np.concatenate([np.arange(1, n + 1) for p, n in time_end])
+        names, Tout, Tin = zip(*streams) if len(streams) > 0 else ((), (), ())
+        index = pd.MultiIndex.from_arrays([np.repeat(np.array(names, dtype=object), len(periods)), np.tile(periods, len(names)),
+                                           np.tile(times, len(names))], names=["Streams", "Period", "Time"])
+        df_Streams_T = pd.DataFrame({"Streams_Tout": np.repeat(np.array(Tout, dtype=float), len(periods)),
+                                     "Streams_Tin": np.repeat(np.array(Tin, dtype=float), len(periods))}, index=index)
+        if len(_streams_temperature_cache) >= streams_temperature_cache_size:
+            del _streams_temperature_cache[next(iter(_streams_temperature_cache))]  # the oldest table
+        _streams_temperature_cache[key] = df_Streams_T
+    return _streams_temperature_cache[key]
+
+
+# AMPL statements of the SP models already read in this process, see get_model_template
+_model_templates = dict()
+model_templates_size = 64
+_model_template_counts = {'hits': 0, 'misses': 0}
+
+
+def get_model_template(options, model_files):
+    """
+    Returns the AMPL statements declaring the model of a SP: the options followed by the content of the model files.
+    The files are read once per configuration in the process, the SPs with the same units, methods and solver share
+    the same statements.
+
+    Parameters
+    ----------
+    options : tuple
+        AMPL options, see ``SubProblem.get_ampl_options``.
+    model_files : tuple
+        ``(directory, file)`` of the model files, see ``SubProblem.get_model_files``.
+
+    Returns
+    -------
+    str
+    """
+    key = (options, model_files)
+    if key in _model_templates:
+        _model_template_counts['hits'] += 1
+    else:
+        _model_template_counts['misses'] += 1
+        statements = list(options)
+        for directory, file in model_files:
+            if directory is None:
+                statements.append(file)
+            else:
+                with open(os.path.join(directory, file)) as f:
+                    statements.append(f.read())
+        if len(_model_templates) >= model_templates_size:
+            del _model_templates[next(iter(_model_templates))]  # the oldest statements
+        _model_templates[key] = '\n'.join(statements)
+    return _model_templates[key]
+
+
+def pop_model_template_counts():
+    """
+    Returns the hits and misses of the model templates in the current process since the last call and resets them.
+    """
+    counts = dict(_model_template_counts)
+    _model_template_counts.update({'hits': 0, 'misses': 0})
+    return counts
+
+
 def exitcode_from_ampl(ampl):
     solve_result = ampl.getData('solve_result').toList()[0]
     return 0 if solve_result == 'solved' else solve_result
+
+
+def get_solver_attributes_from_ampl(Scn_ID, Pareto_ID, ampl):
+    """
+    Reads the information on the last optimization (CPU time, nb constraints, ...) from an AMPL model.
+    """
+    time = ampl.getValue('_total_solve_time')
+    constr = ampl.getValue('_ncons')
+    pres_constr = ampl.getValue('_sncons')  # after presolve
+    var = ampl.getValue('_nvars')
+    pres_var = ampl.getValue('_snvars')  # after presolve
+    binaries = ampl.getValue('_snbvars')  # after presolve
+    integer = ampl.getValue('_snivars')  # after presolve
+    no_ojectives = ampl.getValue('_snobjs')  # after presolve
+    val_objectives = ampl.getCurrentObjective().getValues().toList()[0]
+
+    mux = pd.MultiIndex.from_tuples([(Scn_ID, Pareto_ID)], names=['Scn_ID', 'Pareto_ID'])
+    df = pd.DataFrame([[time, constr, pres_constr, var, pres_var, binaries, integer, no_ojectives, val_objectives]], index=mux,
+                      columns=['solving_time', 'constraints', 'presolve_constraints', 'variables', 'presolve_variables',
+                               'presolve_binaries', 'presolve_integer', 'no_objective', 'val_objective'])
+    return df
+
+
+def fix_units_in_ampl(ampl, houses, fix_units_list, df_fix_Units):
+    """
+    Fixes the size and the use of the units listed in ``fix_units_list`` to the values given in ``df_fix_Units``.
+    """
+    for unit in fix_units_list:
+        for h in houses:
+            if unit == 'PV':
+                ampl.getVariable('Units_Mult').get('PV_' + h).fix(df_fix_Units.Units_Mult.loc['PV_' + h] * 0.999)
+                ampl.getVariable('Units_Use').get('PV_' + h).fix(float(df_fix_Units.Units_Use.loc['PV_' + h]))
+            else:
+                ampl.getVariable('Units_Mult').get(unit + '_' + h).fix(df_fix_Units.Units_Mult.loc[unit + '_' + h])
+                ampl.getVariable('Units_Use').get(unit + '_' + h).fix(float(df_fix_Units.Units_Use.loc[unit + '_' + h]))
+    return ampl
+
+
+def fix_design_in_ampl(ampl, df_design):
+    """
+    Fixes the size and the use of all the units to the values given in ``df_design``, see ``write_results.get_SP_design``.
+    """
+    ampl.getVariable('Units_Mult').setValues(df_design['Units_Mult'].astype(float).to_dict())
+    ampl.getVariable('Units_Use').setValues(df_design['Units_Use'].astype(float).to_dict())
+    ampl.eval('fix Units_Mult; fix Units_Use;')
+    return ampl
+
+
+# profiles given as flat arrays, indexed on {h in House, p in Period, t in Time[p]} and {p in Period, t in Time[p]}
+house_profiles = ['Domestic_electricity', 'HeatGains', 'SolarGains', 'DHW_flowrate', 'T_comfort_min']
+period_profiles = ['T_ext', 'I_global']
+
+
+def index_profiles(parameters, houses, time_end):
+    """
+    Returns a copy of the parameters where the arrays of the ``house_profiles`` and ``period_profiles`` are Series
+    indexed on ``(House, Period, Time)`` and ``(Period, Time)``, in the order in which AMPL reads the arrays. The profiles
+    sharing an index are then sent with a single ``setData`` by ``send_parameters_to_ampl``. The arrays of another
+    length are kept.
+
+    Parameters
+    ----------
+    parameters : dict
+        Values of the parameters, indexed by their name in the AMPL model.
+    houses : array
+        Elements of the set ``House``.
+    time_end : tuple
+        ``(Period, TimeEnd)`` of each period.
+    """
+    periods = np.concatenate([np.repeat(p, n) for p, n in time_end])
+    times = np.concatenate([np.arange(1, n + 1) for p, n in time_end])
+    houses = np.array(houses, dtype=object)
+    index_house = pd.MultiIndex.from_arrays([np.repeat(houses, len(periods)), np.tile(periods, len(houses)), np.tile(times, len(houses))],
+                                            names=['House', 'Period', 'Time'])
+    index_period = pd.MultiIndex.from_arrays([periods, times], names=['Period', 'Time'])
+
+    parameters = dict(parameters)
+    for names, index in [(house_profiles, index_house), (period_profiles, index_period)]:
+        for name in names:
+            value = parameters.get(name)
+            if isinstance(value, np.ndarray) and value.ndim == 1 and value.dtype.kind in 'biuf' and len(value) == len(index):
+                parameters[name] = pd.Series(value.astype(float), index=index)
+    return parameters
+
+
+def send_parameters_to_ampl(ampl, parameters):
+    """
+    Sends the parameters to an AMPL model with as few calls as possible:
+
+    - the pandas parameters sharing the same index are joined in a single DataFrame, sent with one ``setData``,
+    - the finite scalars are assigned in a single ``let`` statement,
+    - the numeric arrays are sent as contiguous float arrays, which amplpy passes as a NumPy buffer, the lists and
+      dictionaries one by one. The profiles should be indexed first, see ``index_profiles``.
+
+    The scalars are assigned by ``let`` once the sets are sent, as they were by ``setValues``. In both cases, AMPL checks
+    the restrictions of a parameter (e.g. ``>= 0``) when the model is generated for the next solve, and a parameter
+    unknown to the model raises an error.
+
+    Parameters
+    ----------
+    ampl : AMPL
+        Model whose parameters are set.
+    parameters : dict
+        Values of the parameters, indexed by their name in the AMPL model.
+
+    Raises
+    ------
+    ValueError
+        If the type of a parameter is not supported.
+    """
+    frames = []
+    statements = []
+    for name, value in parameters.items():
+        if isinstance(value, pd.Series):
+            value = value.to_frame(name)
+
+        if isinstance(value, pd.DataFrame):
+            if not value.empty:
+                add_to_frame_group(frames, value)
+            continue
+
+        drop_from_frame_groups(frames, name)  # the last value given to a parameter is kept, as when sent one by one
+        if isinstance(value, np.ndarray):
+            if value.dtype.kind in 'biuf':
+                value = np.ascontiguousarray(value, dtype=float)
+            ampl.getParameter(name).setValues(value)
+        elif isinstance(value, list):
+            ampl.getParameter(name).setValues(np.array(value))
+        elif isinstance(value, dict):
+            ampl.getParameter(name).setValues(value)
+        elif isinstance(value, (float, int)):
+            if np.isfinite(value):
+                statements.append('let ' + name + ' := ' + repr(float(value)) + ';')
+            else:
+                ampl.getParameter(name).setValues([value])
+        else:
+            raise ValueError('Type Error setting AMPLPY Parameter', name)
+
+    if len(statements) > 0:
+        ampl.eval(' '.join(statements))
+    for group in frames:
+        ampl.setData(group[0] if len(group) == 1 else pd.concat(group, axis=1))
+
+
+def add_to_frame_group(frames, df):
+    """
+    Appends ``df`` to the last group of DataFrames with the same index, unless one of its columns is in this group or in
+    a group sent after it. Otherwise ``df`` starts a new group.
+    """
+    for group in reversed(frames):
+        if any(column in existing.columns for existing in group for column in df.columns):
+            break
+        if group[0].index.equals(df.index):
+            group.append(df)
+            return
+    frames.append([df])
+
+
+def drop_from_frame_groups(frames, name):
+    for group in frames:
+        for i, df in enumerate(group):
+            if name in df.columns:
+                group[i] = df.drop(columns=name)
+        group[:] = [df for df in group if len(df.columns) > 0]
+    frames[:] = [group for group in frames if len(group) > 0]
@@ -0,0 +1,377 @@
+import gc
+import multiprocessing as mp
+import uuid
+import weakref
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import reho.model.postprocessing.write_results as write_results
+from reho.model.sub_problem import *
+
+__doc__ = """
+File for handling the worker processes solving the sub-problems of the decomposition.
+"""
+
+# AMPL sub-problems kept alive in the current process, indexed on the building
+_persistent_SPs = dict()
+
+
+class SubProblemPool:
+    """
+    Pool of worker processes where each building is always solved by the same worker.
+
+    The affinity between buildings and workers allows to keep the AMPL model of a building alive in its worker
+    from one Dantzig-Wolfe iteration to the next, with the static data of the building, see ``execute_SP``. The pool is
+    meant to live as long as the model, see ``MasterProblem.get_pool``.
+
+    Parameters
+    ----------
+    houses : list
+        IDs of the buildings to distribute among the workers.
+    n_workers : int, optional
+        Number of worker processes. By default, one per CPU.
+    weights : dict, optional
+        Expected solving effort of each building. The buildings are then distributed to balance the load of the workers
+        (largest first, each one to the least loaded worker). By default, round-robin.
+    """
+
+    def __init__(self, houses, n_workers=None, weights=None):
+        self.n_workers = get_n_workers(n_workers, len(houses))
+        self.executors = [ProcessPoolExecutor(max_workers=1) for _ in range(self.n_workers)]
+        if weights is None:
+            self.affinity = {h: i % self.n_workers for i, h in enumerate(houses)}
+        else:
+            load = [0.0] * self.n_workers
+            self.affinity = {}
+            for h in order_tasks(houses, weights):
+                worker = load.index(min(load))
+                self.affinity[h] = worker
+                load[worker] += weights[h]
+
+        # the workers are stopped when the pool is garbage collected or at the exit of the interpreter, if not closed before
+        self.finalizer = weakref.finalize(self, shutdown_executors, self.executors)
+
+    def get_worker(self, task):
+        """
+        Returns the worker assigned to the task, a new task goes to the worker with the fewest tasks.
+        """
+        if task not in self.affinity:
+            n_tasks = [list(self.affinity.values()).count(i) for i in range(self.n_workers)]
+            self.affinity[task] = n_tasks.index(min(n_tasks))
+        return self.affinity[task]
+
+    def submit(self, task, fn, *args):
+        """
+        Executes ``fn(*args)`` in the worker assigned to the task (e.g. the building ``h``) and returns a future.
+        """
+        return self.executors[self.get_worker(task)].submit(fn, *args)
+
+    def execute_on_all_workers(self, fn, *args):
+        """
+        Executes ``fn(*args)`` in every worker and waits for the results.
+        """
+        futures = [executor.submit(fn, *args) for executor in self.executors]
+        return [future.result() for future in futures]
+
+    def close(self):
+        self.finalizer()
+
+
+def shutdown_executors(executors):
+    for executor in executors:
+        executor.shutdown(wait=True)
+
+
+def get_n_workers(n_workers=None, n_tasks=None):
+    """
+    Returns the number of worker processes to start, one per CPU by default and never more than the number of tasks.
+    """
+    if n_workers is None:
+        n_workers = mp.cpu_count()
+    if n_tasks is not None:
+        n_workers = min(n_workers, n_tasks)
+    return max(1, n_workers)
+
+
+def order_tasks(tasks, weights=None):
+    """
+    Sorts the tasks by decreasing weight, so that the longest tasks are submitted first and do not end up as stragglers.
+    Tasks without weight keep their order, after the others.
+    """
+    if weights is None:
+        return list(tasks)
+    return sorted(tasks, key=lambda task: -weights.get(task, 0))
+
+
+def collect_results(futures, store, raise_errors=True, logger=None):
+    """
+    Stores the results of the futures as soon as they are completed.
+
+    Parameters
+    ----------
+    futures : dict
+        Futures and the corresponding task, e.g. the house ID.
+    store : function
+        Called with ``(task, result)`` for each successful task.
+    raise_errors : bool
+        If True, an exception is raised once all the tasks are completed if some of them failed.
+    logger : logging.Logger, optional
+        Logs the failed tasks.
+
+    Returns
+    -------
+    errors : dict
+        Exception raised by each failed task.
+    """
+    errors = {}
+    for future in as_completed(futures):
+        task = futures[future]
+        try:
+            result = future.result()
+        except Exception as e:
+            errors[task] = e
+            if logger is not None:
+                logger.warning('Task ' + str(task) + ' failed: ' + repr(e))
+            continue
+        store(task, result)
+
+    if raise_errors and len(errors) > 0:
+        failed = ', '.join(str(task) for task in errors)
+        raise Exception('Failed for ' + failed + ': ' + repr(list(errors.values())[0])) from list(errors.values())[0]
+    return errors
+
+
+def execute_SP(h, scenario, parameters, Scn_ID, Pareto_ID, keep_model=False, SP_data=None, iter=None, extraction='full', solution=None,
+               design=None):
+    """
+    Solves the sub-problem of building ``h`` in the current process.
+
+    The static data of the building is sent once with ``SP_data`` and kept in the process, the following calls only
+    send the scenario and the parameters which change (dual values ``pi``, ``pi_GWP``, ``pi_lca`` and ``beta_duals``).
+    With ``keep_model``, the AMPL model is also kept and only the new parameters are sent to it, as long as the
+    scenario does not change.
+
+    Parameters
+    ----------
+    h : string
+        House ID
+    scenario : dict
+        Scenario of the sub-problem
+    parameters : dict
+        Parameters updated at each call.
+    Scn_ID : int
+        scenario ID
+    Pareto_ID : int
+        pareto ID
+    keep_model : bool
+        Keeps the AMPL model alive for the next call.
+    SP_data : dict, optional
+        Static data of the building, see ``MasterProblem.get_SP_data``. Required at the first call.
+    iter : int, optional
+        Iteration of the decomposition, label of the stages recorded by the profiler.
+    extraction : str
+        Results extracted, ``full`` or ``column`` (see ``write_results.get_df_Results_from_SP``). The results of a
+        ``column`` extraction keep the inputs of the SP under ``SP_inputs`` and its design under ``SP_design`` to solve
+        it again with a ``full`` extraction. With ``keep_model``, they also identify the solution held by the AMPL model
+        under ``SP_solution``.
+    solution : str, optional
+        ``SP_solution`` of the results to extract: if the AMPL model kept in the process still holds it, its full results
+        are read without solving.
+    design : pd.DataFrame, optional
+        ``SP_design`` of the results to extract: the size and the use of the units are fixed to it before solving.
+
+    Returns
+    -------
+    df_Results :
+        results of the optimization (unit installed, power exchanged, costs, GWP emissions, ...)
+    attr :
+        results of the optimization process (CPU time, objective value, nb variables or constraints, ...)
+    """
+    if SP_data is not None:
+        release_persistent_SPs([h])
+        _persistent_SPs[h] = {'data': SP_data}
+    elif h not in _persistent_SPs:
+        raise KeyError('The data of the sub-problem of ' + h + ' has not been sent to this process.')
+    SP_entry = _persistent_SPs[h]
+    data = SP_entry['data']
+    profiler.enable(data['method']['profile'])
+    with profiler.labels(Scn_ID=Scn_ID, Pareto_ID=Pareto_ID, Iter=iter, House=h), profiler.stage('execute_SP'):
+        return solve_SP(h, scenario, parameters, Scn_ID, Pareto_ID, keep_model, SP_entry, extraction, solution, design)
+
+
+def solve_SP(h, scenario, parameters, Scn_ID, Pareto_ID, keep_model, SP_entry, extraction='full', solution=None, design=None):
+    """
+    Builds the AMPL model of the SP of building ``h``, or updates the one kept in ``SP_entry``, and solves it, see ``execute_SP``.
+    """
+    data = SP_entry['data']
+    if solution is not None and SP_entry.get('solution') == solution:
+        # the model kept in the process still holds the solution
+        SP, ampl = SP_entry['SP'], SP_entry['ampl']
+        with profiler.stage('get_df_Results_from_SP'):
+            df_Results = write_results.get_df_Results_from_SP(ampl, SP.scenario_sp, SP.method_sp, data['buildings_data'], extraction=extraction)
+        return df_Results, get_solver_attributes_from_ampl(Scn_ID, Pareto_ID, ampl)
+
+    scenario_key = repr(scenario)
+    if keep_model and SP_entry.get('scenario_key') == scenario_key:
+        SP = SP_entry['SP']
+        with profiler.stage('update_parameters'):
+            ampl = SP.update_parameters(SP_entry['ampl'], parameters)
+    else:
+        release_persistent_SPs([h], keep_data=True)
+        parameters_SP = dict(parameters)
+        parameters_SP.update(data['parameters_SP'])  # as in split_parameter_sets_per_building
+        if 'beta_duals' in parameters:
+            parameters_SP['beta_duals'] = parameters['beta_duals']
+        SP = SubProblem(data['infrastructure'], data['buildings_data_SP'], data['local_data'], parameters_SP, dict(data['set_indexed']),
+                        data['cluster'], scenario, data['method'], data['solver'], data['qbuildings_data'])
+        ampl = SP.build_model_without_solving()
+        if data['fix_units'] is not None:
+            ampl = fix_units_in_ampl(ampl, [h], *data['fix_units'])
+        if design is not None:
+            ampl = fix_design_in_ampl(ampl, design)
+        if keep_model:
+            SP_entry.update({'scenario_key': scenario_key, 'SP': SP, 'ampl': ampl})
+
+    with profiler.stage('solve_SP'):
+        ampl.solve()
+    exitcode = exitcode_from_ampl(ampl)
+
+    df_Results = get_SP_results(ampl, SP.scenario_sp, SP.method_sp, data['buildings_data'], extraction, (h, scenario, parameters))
+    if keep_model:
+        SP_entry['solution'] = uuid.uuid4().hex
+        if extraction == 'column':
+            df_Results['SP_solution'] = SP_entry['solution']
+    attr = get_solver_attributes_from_ampl(Scn_ID, Pareto_ID, ampl)
+
+    if not keep_model:
+        ampl.close()
+        del ampl
+        gc.collect()  # free memory
+
+    if exitcode != 0:
+        # It might be that the solution is optimal with unscaled infeasibilities. So we check if we really found a solution (via its cost value)
+        if exitcode != 'solved?' or df_Results["df_Performance"]['Costs_op'][0] + df_Results["df_Performance"]['Costs_inv'][0] == 0:
+            raise Exception('Sub problem did not converge')
+
+    return df_Results, attr
+
+
+def get_SP_data_fingerprint(h):
+    """
+    Returns the fingerprint of the static data of house ``h`` kept in the current process, None if there is none.
+    """
+    return _persistent_SPs.get(h, {}).get('data', {}).get('fingerprint')
+
+
+def get_SP_results(ampl, scenario, method, buildings_data, extraction, SP_inputs):
+    """
+    Extracts the results of a solved SP. With ``extraction='column'``, the inputs ``SP_inputs`` and the design of the SP
+    are added to the results, to extract its full results later, see ``MasterProblem.extract_selected_SPs``.
+    """
+    with profiler.stage('get_df_Results_from_SP'):
+        df_Results = write_results.get_df_Results_from_SP(ampl, scenario, method, buildings_data, extraction=extraction)
+    if extraction == 'column':
+        df_Results['SP_inputs'] = SP_inputs
+        df_Results['SP_design'] = write_results.get_SP_design(ampl)
+    return df_Results
+
+
+def release_persistent_SPs(houses=None, keep_data=False):
+    """
+    Deletes the AMPL sub-problems kept in the current process and, unless ``keep_data``, the data of the buildings.
+    """
+    if houses is None:
+        houses = list(_persistent_SPs.keys())
+    for h in houses:
+        if h in _persistent_SPs:
+            SP_entry = _persistent_SPs[h] if keep_data else _persistent_SPs.pop(h)
+            ampl = SP_entry.pop('ampl', None)
+            SP_entry.pop('SP', None)
+            SP_entry.pop('scenario_key', None)
+            SP_entry.pop('solution', None)
+            if ampl is not None:
+                ampl.close()
+                del ampl
+    gc.collect()  # free memory
+
+
+class SharedLocalData:
+    """
+    Places the large numerical arrays of ``local_data`` (irradiation of the sky patches, emissions, ...) in shared
+    memory, so that the workers read them without receiving and storing their own copy.
+
+    The object is sent to the workers instead of ``local_data`` and is unpickled there as a ``local_data`` dictionary
+    whose arrays point to the shared memory. The arrays are read-only.
+
+    Parameters
+    ----------
+    local_data : dict
+        See ``reho.model.preprocessing.local_data.return_local_data``
+    min_size : int
+        Arrays smaller than this number of bytes are pickled as usual.
+    """
+
+    def __init__(self, local_data, min_size=2 ** 20):
+        self.blocks = []
+        self.descriptor = {}
+        for key, value in local_data.items():
+            if isinstance(value, pd.DataFrame) and len(set(value.dtypes)) == 1 and np.issubdtype(value.dtypes.iloc[0], np.number):
+                values = value.to_numpy()
+            elif isinstance(value, np.ndarray) and np.issubdtype(value.dtype, np.number):
+                values = value
+            else:
+                values = None
+            if values is None or values.nbytes < min_size:
+                self.descriptor[key] = ('object', value)
+                continue
+            block = shared_memory.SharedMemory(create=True, size=values.nbytes)
+            np.ndarray(values.shape, dtype=values.dtype, buffer=block.buf)[...] = values
+            self.blocks.append(block)
+            if isinstance(value, pd.DataFrame):
+                self.descriptor[key] = ('DataFrame', block.name, values.shape, values.dtype.str, value.index, value.columns)
+            else:
+                self.descriptor[key] = ('ndarray', block.name, values.shape, values.dtype.str)
+        # the shared memory is freed when the object is garbage collected or at the exit of the interpreter, if not closed before
+        self.finalizer = weakref.finalize(self, release_blocks, self.blocks)
+
+    def __reduce__(self):
+        return attach_shared_local_data, (self.descriptor,)
+
+    def close(self):
+        self.finalizer()
+
+
+def release_blocks(blocks):
+    for block in blocks:
+        block.close()
+        block.unlink()
+    blocks.clear()
+
+
+# local_data attached to the shared memory in the current process, indexed on the shared memory blocks
+_shared_local_data = dict()
+
+
+def attach_shared_local_data(descriptor):
+    """
+    Rebuilds ``local_data`` in a worker from the descriptor of ``SharedLocalData``.
+    """
+    key = tuple(value[1] for value in descriptor.values() if value[0] != 'object')
+    if key in _shared_local_data:
+        return _shared_local_data[key][0]
+    local_data = {}
+    blocks = []
+    for name, value in descriptor.items():
+        if value[0] == 'object':
+            local_data[name] = value[1]
+            continue
+        block = shared_memory.SharedMemory(name=value[1])
+        blocks.append(block)
+        values = np.ndarray(value[2], dtype=np.dtype(value[3]), buffer=block.buf)
+        values.flags.writeable = False
+        if value[0] == 'DataFrame':
+            local_data[name] = pd.DataFrame(values, index=value[4], columns=value[5], copy=False)
+        else:
+            local_data[name] = values
+    _shared_local_data[key] = (local_data, blocks)  # the blocks have to stay open as long as the arrays are used
+    return local_data
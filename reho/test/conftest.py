@@ -0,0 +1,152 @@
+import logging
+from concurrent.futures import Future
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from reho.model.master_problem import MasterProblem
+from reho.model.sub_problem import initialize_default_methods
+
+
+def get_SP_attributes(Scn_ID=0, Pareto_ID=1, solving_time=1.0):
+    """
+    Solver attributes of a SP, as returned by ``get_solver_attributes_from_ampl``.
+    """
+    return pd.DataFrame({'solving_time': [solving_time]}, index=pd.MultiIndex.from_tuples([(Scn_ID, Pareto_ID)], names=['Scn_ID', 'Pareto_ID']))
+
+
+def build_master_problem(houses=('Building1', 'Building2'), method=None, DW_params=None, cls=MasterProblem):
+    """
+    Builds a MasterProblem (or a subclass) without buildings data nor AMPL: the attributes of the decomposition are
+    initialized by ``initialise_DW_params`` and ``initialize_optimization_tracking_attributes``.
+    """
+    MP = cls.__new__(cls)
+    MP.method = initialize_default_methods(dict({'district-scale': True, 'parallel_computation': False}, **(method or {})))
+    MP.infrastructure = SimpleNamespace(houses={h: {} for h in houses}, lca_kpis=[], Set={'HousesOfLayer': {'Electricity': list(houses)}})
+    MP.buildings_data = {h: {'ERA': 100.0 * (i + 1)} for i, h in enumerate(houses)}
+    MP.cluster = {'Periods': 1, 'PeriodDuration': 2}
+    MP.logger = logging.getLogger('reho.test')
+    MP.DW_params = MP.initialise_DW_params(dict(DW_params or {}), MP.cluster, MP.buildings_data)
+    MP.pool, MP.shared_local_data, MP.SP_submission_times, MP.SP_data_sent = None, None, dict(), dict()
+    MP.stage_profile, MP.model_template_counts = pd.DataFrame(), {'hits': 0, 'misses': 0, 'hit_rate': None}
+    MP.initialize_optimization_tracking_attributes()
+    return MP
+
+
+class ToyPool:
+    """
+    Pool of worker processes replaced by futures set in the current process. The SPs of the ``slow_houses`` only return
+    when ``release`` is called, the next ones return immediately.
+    """
+
+    def __init__(self, solve_SP, slow_houses=()):
+        self.solve_SP = solve_SP
+        self.slow_houses = set(slow_houses)
+        self.waiting = dict()
+
+    def submit(self, h, fn, *args):
+        future = Future()
+        if h in self.slow_houses:
+            self.waiting[h] = future
+        else:
+            future.set_result(self.solve_SP(h))
+        return future
+
+    def release(self, h):
+        self.slow_houses.discard(h)
+        self.waiting.pop(h).set_result(self.solve_SP(h))
+
+    def execute_on_all_workers(self, fn, *args):
+        return [fn(*args)]
+
+    def close(self):
+        pass
+
+
+class ToyDecomposition:
+    """
+    Decomposition of a toy problem without AMPL. The n-th SP of a house returns a column of cost ``SP_costs[house][n]``
+    (the last cost afterwards). The MP selects the cheapest column of each house, its dual value for the house is the
+    cost of this column: the reduced cost of a column is its cost minus the one of the selected column.
+    """
+
+    def __init__(self, MP, SP_costs, slow_houses=()):
+        self.MP = MP
+        self.SP_costs = SP_costs
+        self.n_solved = {h: 0 for h in SP_costs}
+        self.duals = dict()
+        MP.get_SP_data_to_send = lambda h: None
+        MP.SP_execution = lambda scenario, Scn_ID, Pareto_ID, h: self.solve_SP(h)
+        MP.get_SP_parameters = lambda scenario, Scn_ID, Pareto_ID, h: (scenario, {})
+        MP.get_dual_values_SPs = self.get_dual_values
+        MP.get_reduced_cost = self.get_reduced_cost
+        if MP.method['parallel_computation']:
+            MP.pool = ToyPool(self.solve_SP, slow_houses)
+
+    def solve_SP(self, h):
+        costs = self.SP_costs[h]
+        cost = costs[min(self.n_solved[h], len(costs) - 1)]
+        self.n_solved[h] += 1
+        return {'cost': cost}, get_SP_attributes()
+
+    def get_dual_values(self, Scn_ID, Pareto_ID, iter, House, dual_variable):
+        index = pd.MultiIndex.from_product([['Electricity'], [1], [1, 2]], names=['Layer', 'Period', 'Time'])
+        return pd.Series(sum(self.duals[iter].values()), index=index) if dual_variable != 'beta' else pd.Series([1.0])
+
+    def get_reduced_cost(self, scenario, Scn_ID, Pareto_ID, h, SP_results_h, column_id, iter=None):
+        return SP_results_h['cost'] - self.duals[self.MP.iter if iter is None else iter][h]
+
+    def solve_MP(self, Scn_ID, Pareto_ID):
+        MP = self.MP
+        columns = {key: MP.results_SP.get_results(key)['cost'] for key in MP.results_SP.keys_list if key[0:2] == (Scn_ID, Pareto_ID)}
+        best = {h: min((cost, key[3]) for key, cost in columns.items() if key[4] == h) for h in MP.infrastructure.houses}
+        index = pd.MultiIndex.from_tuples(sorted({(key[3], key[4]) for key in columns}), names=['FeasibleSolution', 'Hub'])
+        lambdas = [1.0 if best[h][1] == f else 0.0 for f, h in index]
+        MP.results_MP.setdefault(Scn_ID, {}).setdefault(Pareto_ID, {})[MP.iter] = {'df_DW': pd.DataFrame({'lambda': lambdas}, index=index)}
+        self.duals[MP.iter] = {h: cost for h, (cost, f) in best.items()}
+        index = pd.MultiIndex.from_tuples([(MP.iter, Scn_ID, Pareto_ID)], names=['Iter', 'Scn_ID', 'Pareto_ID'])
+        attr = pd.DataFrame({'val_objective': [sum(self.duals[MP.iter].values())]}, index=index)
+        MP.solver_attributes_MP = pd.concat([MP.solver_attributes_MP, attr])
+
+    def initiate(self, Scn_ID=0, Pareto_ID=1):
+        for h in self.MP.infrastructure.houses:
+            self.MP.add_df_Results_SP(Scn_ID, Pareto_ID, 0, h, *self.solve_SP(h))
+        self.MP.feasible_solutions = 1
+        self.solve_MP(Scn_ID, Pareto_ID)
+
+    def iterate(self, Scn_ID=0, Pareto_ID=1):
+        """
+        Executes an iteration of the decomposition and returns if it terminates.
+        """
+        self.MP.iter += 1
+        self.MP.SP_iteration({'Objective': 'TOTEX'}, Scn_ID, Pareto_ID)
+        self.solve_MP(Scn_ID, Pareto_ID)
+        return self.MP.check_Termination_criteria({'Objective': 'TOTEX'}, Scn_ID, Pareto_ID)
+
+    def run(self, Scn_ID=0, Pareto_ID=1):
+        """
+        Executes the decomposition until a termination criterion is reached, returns the number of iterations.
+        """
+        self.initiate(Scn_ID, Pareto_ID)
+        while self.MP.iter < self.MP.DW_params['max_iter'] and not self.iterate(Scn_ID, Pareto_ID):
+            pass
+        return self.MP.iter
+
+
+@pytest.fixture
+def master_problem():
+    """
+    Factory of MasterProblems without AMPL, see ``build_master_problem``.
+    """
+    return build_master_problem
+
+
+@pytest.fixture
+def toy_decomposition():
+    """
+    Factory of toy decompositions, see ``ToyDecomposition``.
+    """
+    def build(SP_costs, method=None, DW_params=None, slow_houses=()):
+        return ToyDecomposition(build_master_problem(list(SP_costs), method, DW_params), SP_costs, slow_houses)
+    return build
@@ -0,0 +1,58 @@
+from concurrent.futures import Future
+
+from reho.test.conftest import get_SP_attributes
+
+
+def test_collect_SPs_asynchronously(master_problem):
+    MP = master_problem(method={'parallel_computation': True}, DW_params={'async_fraction': 0.5})
+    for h in MP.infrastructure.houses:
+        MP.add_df_Results_SP(0, 1, 0, h, {'solution': 'init'}, get_SP_attributes())
+    MP.iter, MP.feasible_solutions = 1, 1
+
+    # Building2 is still running when the MP is solved again, its last solution completes the round
+    futures = {Future(): 'Building1', Future(): 'Building2'}
+    fast, slow = list(futures)
+    fast.set_result(({'solution': 'new'}, get_SP_attributes()))
+    assert MP.collect_SPs_asynchronously(futures, 0, 1) == ['Building1']
+    assert MP.complete_SP_round(0, 1) == ['Building2']
+    assert MP.results_SP.get_results((0, 1, 1, 1, 'Building2'))['solution'] == 'init'
+    assert [h for h, iter in MP.pending_SPs.values()] == ['Building2']
+
+    # the late solution is added to the next round
+    MP.iter, MP.feasible_solutions = 2, 2
+    slow.set_result(({'solution': 'late'}, get_SP_attributes()))
+    MP.SP_sync_required = True
+    assert MP.collect_SPs_asynchronously(dict(), 0, 1) == ['Building2']
+    assert MP.results_SP.get_results((0, 1, 2, 2, 'Building2'))['solution'] == 'late'
+    assert len(MP.pending_SPs) == 0 and not MP.SP_sync_required
+
+
+def test_no_termination_with_running_SP(toy_decomposition):
+    SP_costs = {'Building1': [10, 8, 7], 'Building2': [5, 4]}
+    toy = toy_decomposition(SP_costs, method={'parallel_computation': True}, DW_params={'async_fraction': 0.5, 'gap_threshold': 1.0},
+                            slow_houses=['Building2'])
+    toy.initiate()
+
+    # the round is completed with the initial column of Building2, already in the MP: it does not prove optimality nor
+    # give a lower bound while its SP is running
+    assert not toy.iterate()
+    assert toy.MP.skipped_SPs == 1 and toy.MP.SP_sync_required
+    assert toy.MP.lower_bounds == {}
+
+    # the late solution was priced with older dual values, all the SPs are then solved again
+    toy.MP.pool.release('Building2')
+    assert not toy.iterate()
+    assert toy.iterate()
+    assert toy.MP.iter == 3 and toy.MP.skipped_SPs == 0
+    assert toy.MP.stopping_criteria['all_optimal'].tolist() == [False, False, True]
+    df_DW = toy.MP.results_MP[0][1][3]['df_DW']
+    assert len(df_DW) == 8  # 4 rounds of columns
+    assert df_DW[df_DW['lambda'] == 1].index.tolist() == [(2, 'Building1'), (2, 'Building2')]
+
+
+def test_synchronous_decomposition(toy_decomposition):
+    toy = toy_decomposition({'Building1': [10, 8], 'Building2': [5, 6]}, method={'parallel_computation': True})
+    assert toy.run() == 1
+    assert toy.MP.stopping_criteria['all_optimal'].tolist() == [True]
+    df_DW = toy.MP.results_MP[0][1][1]['df_DW']
+    assert df_DW[df_DW['lambda'] == 1].index.tolist() == [(0, 'Building2'), (1, 'Building1')]
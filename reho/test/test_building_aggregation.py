@@ -0,0 +1,54 @@
+import pandas as pd
+
+from reho.model.preprocessing.building_aggregation import aggregate_buildings, disaggregate_results, get_aggregation_error
+
+
+def get_buildings_data():
+    buildings_data = dict()
+    for i, (ERA, id_class) in enumerate([(100, 'I'), (110, 'I'), (105, 'I'), (1000, 'II'), (1100, 'II')]):
+        buildings_data['Building' + str(i + 1)] = {'ERA': ERA, 'id_class': id_class, 'U_h': 0.002, 'SolarRoofArea': ERA / 2,
+                                                   'Th_supply_0': 65, 'Th_return_0': 50, 'x': i,
+                                                   'energy_el_kWh_y': ERA * (30 if id_class == 'I' else 20)}
+    return {'buildings_data': buildings_data}
+
+
+def test_aggregate_buildings():
+    qbuildings_data = get_buildings_data()
+    qbuildings_archetypes, df_archetypes = aggregate_buildings(qbuildings_data, 2, random_state=0)
+
+    clusters = df_archetypes.groupby('archetype').groups
+    assert sorted(sorted(buildings) for buildings in clusters.values()) == [['Building1', 'Building2', 'Building3'], ['Building4', 'Building5']]
+    assert sorted(qbuildings_archetypes['buildings_data']) == sorted(clusters)
+    # the archetypes represent the ERA of the district
+    ERA = sum(b['ERA'] * b['multiplicity'] for b in qbuildings_archetypes['buildings_data'].values())
+    assert abs(ERA - 2415) < 1e-9
+
+    qbuildings_archetypes, df_archetypes = aggregate_buildings(qbuildings_data, 5)
+    assert all(b['multiplicity'] == 1 for b in qbuildings_archetypes['buildings_data'].values())
+
+
+def test_disaggregate_results():
+    qbuildings_data = get_buildings_data()
+    df_archetypes = pd.DataFrame({'archetype': ['Building1', 'Building1'], 'weight': [1, 2]}, index=['Building1', 'Building2'])
+    df_Unit = pd.DataFrame({'Units_Mult': [4.0, 10.0], 'lifetime': [20, 30]}, index=pd.Index(['PV_Building1', 'EV_district'], name='Unit'))
+    df_Performance = pd.DataFrame({'Costs_op': [100.0, 300.0]}, index=pd.Index(['Building1', 'Network'], name='Hub'))
+
+    df_Results = disaggregate_results({'df_Unit': df_Unit, 'df_Performance': df_Performance}, df_archetypes, qbuildings_data['buildings_data'])
+    assert df_Results['df_Unit']['Units_Mult'].to_dict() == {'EV_district': 10, 'PV_Building1': 4, 'PV_Building2': 8}
+    assert df_Results['df_Unit'].loc['PV_Building2', 'lifetime'] == 20
+    assert df_Results['df_Performance']['Costs_op'].to_dict() == {'Building1': 100, 'Building2': 200, 'Network': 300}
+
+
+def test_aggregation_error():
+    qbuildings_data = get_buildings_data()
+    archetypes = ['Building1', 'Building1', 'Building4', 'Building4', 'Building4']
+    df_archetypes = pd.DataFrame({'archetype': archetypes, 'weight': [1, 1.1, 0.105, 1, 1.1]}, index=list(qbuildings_data['buildings_data']))
+    df_error = get_aggregation_error(qbuildings_data, df_archetypes)
+
+    assert list(df_error.index) == ['Building1', 'Building4', 'District']
+    assert (df_error[['ERA', 'SolarRoofArea', 'U_h', 'Th_supply_0']].abs() < 1e-9).all().all()
+    # Building3 (class I) is represented by an archetype of class II
+    assert abs(df_error.loc['Building4', 'id_class'] - 105 / 2205) < 1e-9
+    assert abs(df_error.loc['District', 'id_class'] - 105 / 2415) < 1e-9
+    assert abs(df_error.loc['Building4', 'energy_el_kWh_y'] - (44100 - 45150) / 45150) < 1e-9
+    assert df_error.loc['Building1', 'energy_el_kWh_y'] == 0
@@ -0,0 +1,27 @@
+import pandas as pd
+
+from reho.model.column_pool import ColumnPool
+
+
+def lambdas(values):
+    index = pd.MultiIndex.from_tuples(values.keys(), names=['FeasibleSolution', 'Hub'])
+    return pd.Series(list(values.values()), index=index, name='lambda')
+
+
+def test_archive_unused_columns():
+    pool = ColumnPool(iter_zero=2)
+    assert pool.update(lambdas({(0, 'Building1'): 0, (1, 'Building1'): 1})) == []
+    assert pool.update(lambdas({(0, 'Building1'): 0, (1, 'Building1'): 0.5, (2, 'Building1'): 0.5})) == [(0, 'Building1')]
+    assert not pool.is_active((0, 'Building1')) and pool.is_active((2, 'Building1'))
+
+    pool.restore([(0, 'Building1')])
+    assert pool.is_active((0, 'Building1')) and pool.zero_iterations[(0, 'Building1')] == 0
+
+
+def test_max_columns():
+    pool = ColumnPool(max_columns=2)
+    assert pool.update(lambdas({(0, 'Building1'): 0, (1, 'Building1'): 0, (2, 'Building1'): 1, (0, 'Building2'): 1})) == [(0, 'Building1')]
+
+    # the incumbent is kept even if it exceeds the limit
+    pool = ColumnPool(max_columns=1)
+    assert pool.update(lambdas({(0, 'Building1'): 0.5, (1, 'Building1'): 0.5})) == []
@@ -0,0 +1,77 @@
+import logging
+
+import pandas as pd
+
+from reho.model.reho import REHO
+from reho.model.sub_problem import SubProblem
+
+
+class FakeAMPL:
+
+    def __init__(self):
+        self.closed = False
+
+    def setOption(self, name, value):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def getConstraint(self, name):
+        raise KeyError(name)
+
+
+class FakeSP:
+    builds = 0
+
+    def __init__(self, scenario):
+        self.scenario_sp = scenario
+
+    def build_model_without_solving(self):
+        FakeSP.builds += 1
+        return FakeAMPL()
+
+    def update_scenario(self, ampl, scenario):
+        self.scenario_sp = scenario
+        return ampl
+
+
+def test_persistent_compact_model(master_problem):
+    model = master_problem(houses=['Building1'], method={'persistent_compact_model': True}, cls=REHO)
+    model.parameters, model.set_indexed = {}, {}
+    model.infrastructure.Units_Parameters, model.infrastructure.Grids_Parameters = pd.DataFrame({'Cost_inv2': [1.0]}), pd.DataFrame()
+    model.compact_model, model.compact_model_key, model.compact_inputs_fingerprint = None, None, None
+    model.get_compact_SP = FakeSP
+
+    ampl = model.get_compact_model({'Objective': 'CAPEX', 'exclude_units': []})
+    # the objective and the epsilon constraints are updated in the same model
+    assert model.get_compact_model({'Objective': 'OPEX', 'EMOO': {'EMOO_CAPEX': 10}, 'exclude_units': []}) is ampl
+    assert model.compact_model[0].scenario_sp['Objective'] == 'OPEX'
+    assert FakeSP.builds == 1
+
+    # the units are fixed in the model, it is built again
+    assert model.get_compact_model({'Objective': 'OPEX', 'exclude_units': ['PV']}) is not ampl
+    assert ampl.closed
+    ampl = model.get_compact_model({'Objective': 'OPEX', 'exclude_units': ['PV']})
+    assert FakeSP.builds == 2
+
+    # the inputs are only hashed again at the next optimization run
+    model.infrastructure.Units_Parameters.loc[0, 'Cost_inv2'] = 2.0
+    assert model.get_compact_model({'Objective': 'OPEX', 'exclude_units': ['PV']}) is ampl
+    model.compact_inputs_fingerprint = None
+    model.get_compact_model({'Objective': 'OPEX', 'exclude_units': ['PV']})
+    assert FakeSP.builds == 3
+
+    model.release_compact_model()
+    assert model.compact_model is None
+
+
+def test_update_scenario_logs_errors(caplog):
+    SP = SubProblem.__new__(SubProblem)
+    SP.scenario_sp = {'Objective': 'TOTEX', 'specific': ['enforce_DHN']}
+    SP.set_scenario = lambda ampl: ampl
+    ampl = FakeAMPL()
+    with caplog.at_level(logging.WARNING):
+        assert SP.update_scenario(ampl, {'Objective': 'OPEX'}) is ampl
+    assert 'enforce_DHN' in caplog.text and 'KeyError' in caplog.text
+    assert SP.scenario_sp == {'Objective': 'OPEX', 'exclude_units': [], 'enforce_units': []}
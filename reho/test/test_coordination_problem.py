@@ -0,0 +1,39 @@
+import pandas as pd
+
+from reho.model.coordination_problem import CoordinationProblem, order_districts, split_districts
+
+
+def get_qbuildings_data():
+    buildings_data = {'Building1': {'ERA': 100, 'transformer': 1, 'id_building': 'a'},
+                      'Building2': {'ERA': 300, 'transformer': 2, 'id_building': 'b'},
+                      'Building3': {'ERA': 150, 'transformer': 1, 'id_building': 'c'}}
+    roofs_data = pd.DataFrame({'id_building': ['a', 'b', 'c'], 'area': [10, 20, 30]})
+    return {'buildings_data': buildings_data, 'roofs_data': roofs_data}
+
+
+def get_district_results(supply, demand, costs):
+    df_Time = pd.DataFrame({'dp': [10, 1, 1], 'TimeEnd': [2, 1, 1], 'dt': [1, 1, 1]}, index=pd.Index([1, 2, 3], name='Period'))
+    index = pd.MultiIndex.from_tuples([('Electricity', 'Network', 1, 1), ('Electricity', 'Network', 1, 2), ('Electricity', 'Network', 2, 1),
+                                       ('Electricity', 'Network', 3, 1)], names=['Layer', 'Hub', 'Period', 'Time'])
+    df_Grid_t = pd.DataFrame({'Grid_supply': supply + [100, 100], 'Grid_demand': demand + [0, 0]}, index=index)
+    df_Performance = pd.DataFrame({'Costs_inv': [costs]}, index=['Network'])
+    return {'df_Time': df_Time, 'df_Grid_t': df_Grid_t, 'df_Performance': df_Performance}
+
+
+def test_split_districts():
+    districts = split_districts(get_qbuildings_data())
+    assert {district: list(data['buildings_data']) for district, data in districts.items()} == {1: ['Building1', 'Building3'], 2: ['Building2']}
+    assert list(districts[1]['roofs_data']['id_building']) == ['a', 'c']
+    assert order_districts(districts) == [2, 1]
+
+
+def test_reduced_cost():
+    coordination = CoordinationProblem.__new__(CoordinationProblem)
+    df_Results = get_district_results([5, 0], [0, 3], 100)
+    coordination.results_districts = {(0, 0, 1): df_Results}
+
+    df_grid, costs = coordination.get_district_column(df_Results)
+    assert list(df_grid.index.unique('Period')) == [1]  # extreme periods left out
+    pi = pd.Series([0.2, 0.1], index=pd.MultiIndex.from_tuples([('Electricity', 1, 1), ('Electricity', 1, 2)], names=['Layer', 'Period', 'Time']))
+    # 100 + (5 * 0.2 - 3 * 0.1) * 10 - 50
+    assert abs(coordination.get_reduced_cost(df_grid, costs, pi, 50) - 57) < 1e-9
@@ -0,0 +1,66 @@
+import pandas as pd
+import pytest
+
+
+def stabilized_master_problem(master_problem, method, duals, alpha=0.5):
+    MP = master_problem(DW_params={'dual_stabilization': method, 'stabilization_alpha': alpha})
+    MP.get_dual_values_SPs = lambda Scn_ID, Pareto_ID, iter, House, dual_variable: duals[iter] * (10 if dual_variable == 'beta' else 1)
+    return MP
+
+
+def get_stabilized_duals(MP, iters, lower_bounds=None, mispricing=()):
+    """
+    Stabilizes the dual values of the iterations ``iters`` and returns the ``pi`` given to the SPs. ``lower_bounds`` and
+    ``mispricing`` give the Lagrangian lower bound and the mispricings found by the iterations.
+    """
+    values = []
+    for MP.iter in iters:
+        MP.stabilize_dual_values(0, 1)
+        values.append(MP.get_SP_dual_values(0, 1, 'Building1', 'pi').iloc[0])
+        if lower_bounds is not None:
+            MP.lower_bounds[(0, 1)] = lower_bounds[MP.iter]
+        MP.dual_mispricing = MP.iter in mispricing
+    return values
+
+
+def test_wentges(master_problem):
+    MP = stabilized_master_problem(master_problem, 'wentges', [pd.Series([1.0])] + [pd.Series([3.0])] * 4)
+    # the center only moves to the last separation point when it improved the lower bound
+    assert get_stabilized_duals(MP, [1, 2, 3, 4], lower_bounds={1: 90, 2: 90, 3: 95, 4: 95}) == pytest.approx([1, 2, 2, 2.5])
+    assert MP.dual_center_bound == 95
+
+    # mispricing: the next iteration is priced with the MP duals
+    MP.dual_mispricing = True
+    assert get_stabilized_duals(MP, [5]) == [3] and not MP.dual_stabilized
+
+
+def test_in_out(master_problem):
+    MP = stabilized_master_problem(master_problem, 'in_out', [pd.Series([1.0])] + [pd.Series([3.0])] * 5, alpha=0.75)
+    # the center moves at each mispricing and alpha decreases until the SPs are priced with the MP duals
+    values = get_stabilized_duals(MP, [1, 2, 3, 4, 5, 6], lower_bounds={1: 90, 2: 90, 3: 95, 4: 97.5, 5: 98, 6: 98}, mispricing=[3, 4, 5])
+    assert values == pytest.approx([1, 1.5, 1.5, 2.25, 2.8125, 3])
+    assert not MP.dual_stabilized and MP.dual_center_bound == 98
+
+
+def test_box_step(master_problem):
+    MP = stabilized_master_problem(master_problem, 'box_step', [pd.Series([1.0]), pd.Series([3.0]), pd.Series([3.0])])
+    # the box is sized from the center only
+    assert get_stabilized_duals(MP, [1, 2, 3]) == pytest.approx([1, 1.21, 1.462])
+    assert MP.SP_duals['beta'].iloc[0] == pytest.approx(14.422)
+
+    # the absolute width limits the dual values when the center is 0
+    MP = stabilized_master_problem(master_problem, 'box_step', [pd.Series([0.0]), pd.Series([3.0])])
+    assert get_stabilized_duals(MP, [1, 2]) == pytest.approx([0, 0.01])
+
+
+@pytest.mark.parametrize('method, stabilized', [('wentges', ['wentges', None]), ('in_out', ['in_out'] * 3 + [None])])
+def test_mispricing(toy_decomposition, method, stabilized):
+    # the SPs priced with the stabilized dual values only return columns without negative reduced cost
+    DW_params = {'dual_stabilization': method, 'stabilization_alpha': 0.75, 'threshold_subP_value': 1, 'iter_no_improv': 10}
+    toy = toy_decomposition({'Building1': [10, 8, 9], 'Building2': [5, 6]}, DW_params=DW_params)
+    assert toy.run() == len(stabilized) + 1
+    criteria = toy.MP.stopping_criteria
+    assert criteria['dual_stabilization'].tolist() == [None] + stabilized
+    assert criteria['mispricing'].tolist() == [False] + [s is not None for s in stabilized]
+    assert criteria['all_optimal'].tolist() == [False] * len(stabilized) + [True]
+    assert toy.MP.lower_bounds[(0, 1)] == 13
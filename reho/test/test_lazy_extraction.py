@@ -0,0 +1,105 @@
+import pandas as pd
+
+import reho.model.sub_problem_pool as sub_problem_pool
+from reho.model.postprocessing.results_store import rename_house
+
+
+def get_SP_results(house, costs, SP_inputs=None, grid=1.0, solution=None):
+    df_Results = {'df_Performance': pd.DataFrame({'Costs_op': [costs], 'Costs_inv': [1.0]}, index=pd.Index([house], name='Hub')),
+                  'df_Grid_t': pd.DataFrame({'Grid_supply': [grid, 0.0]}, index=pd.MultiIndex.from_tuples([('Electricity', house), ('NaturalGas', house)],
+                                                                                                         names=['Layer', 'Hub']))}
+    if SP_inputs is not None:
+        df_Results['SP_inputs'] = SP_inputs
+        df_Results['SP_design'] = pd.DataFrame({'Units_Mult': [2.0], 'Units_Use': [1.0]}, index=pd.Index(['PV_' + house], name='Unit'))
+        df_Results['SP_solution'] = solution
+    return df_Results
+
+
+def test_extract_selected_SPs(master_problem, monkeypatch):
+    MP = master_problem(DW_params={'lazy_extraction': True})
+    MP.get_SP_data_to_send = lambda h: None
+    MP.iter = 3
+
+    # Building2 is a copy of the solution of Building1, which is reused at the feasible solution 1
+    SP_inputs = ('Building1', {'Objective': 'TOTEX'}, {'beta_duals': [1.0]})
+    MP.results_SP.add(0, 1, 0, 0, 'Building1', get_SP_results('Building1', 5.0, SP_inputs))
+    MP.results_SP.add(0, 1, 0, 0, 'Building2', rename_house(get_SP_results('Building1', 5.0, SP_inputs), 'Building1', 'Building2'))
+    MP.results_SP.add(0, 1, 1, 1, 'Building1', MP.results_SP.get_results((0, 1, 0, 0, 'Building1')))
+    MP.results_SP.add(0, 1, 1, 1, 'Building2', get_SP_results('Building2', 7.0))  # already complete
+
+    index = pd.MultiIndex.from_tuples([(0, 'Building1'), (0, 'Building2'), (1, 'Building1'), (1, 'Building2')], names=['FeasibleSolution', 'Hub'])
+    MP.results_MP = {0: {1: {3: {'df_DW': pd.DataFrame({'lambda': [0, 1, 1, 1]}, index=index)}}}}
+
+    calls = []
+
+    def execute_SP(h, scenario, parameters, Scn_ID, Pareto_ID, keep_model=False, SP_data=None, iter=None, extraction='full', solution=None,
+                   design=None):
+        calls.append((h, scenario['Objective'], SP_data, extraction))
+        assert list(design.index) == ['PV_Building1']  # design of the solution of Building1, also for its copy
+        df_Results = get_SP_results(h, 5.0)
+        df_Results['df_Unit'] = pd.DataFrame({'Units_Mult': [2.0]}, index=pd.Index(['PV_' + h], name='Unit'))
+        return df_Results, None
+
+    monkeypatch.setattr(sub_problem_pool, 'execute_SP', execute_SP)
+    MP.extract_selected_SPs(0, 1)
+
+    assert calls == [('Building1', 'TOTEX', None, 'full')]  # shared by the columns (0, Building2) and (1, Building1)
+    assert list(MP.results_SP.get_results((0, 1, 0, 0, 'Building2'))['df_Unit'].index) == ['PV_Building2']
+    assert list(MP.results_SP.get_results((0, 1, 1, 1, 'Building1'))['df_Unit'].index) == ['PV_Building1']
+    assert 'SP_inputs' in MP.results_SP.get_results((0, 1, 0, 0, 'Building1'))  # not selected
+    assert 'df_Unit' not in MP.results_SP.get_results((0, 1, 1, 1, 'Building2'))
+    assert MP.results_SP.select('df_Unit', [(0, 'Building2'), (1, 'Building1')])['Units_Mult'].sum() == 4
+
+
+def test_keep_column_results(master_problem, monkeypatch):
+    MP = master_problem(DW_params={'lazy_extraction': True, 'persistent_SP': True})
+    MP.get_SP_data_to_send = lambda h: None
+    MP.iter = 1
+    for h in ['Building1', 'Building2']:
+        MP.results_SP.add(0, 1, 1, 1, h, get_SP_results(h, 5.0, (h, {'Objective': 'TOTEX'}, {}), solution='solution_' + h))
+    index = pd.MultiIndex.from_tuples([(1, 'Building1'), (1, 'Building2')], names=['FeasibleSolution', 'Hub'])
+    MP.results_MP = {0: {1: {1: {'df_DW': pd.DataFrame({'lambda': [1, 1]}, index=index)}}}}
+
+    solutions = dict()
+
+    def execute_SP(h, scenario, parameters, Scn_ID, Pareto_ID, keep_model=False, SP_data=None, iter=None, extraction='full', solution=None,
+                   design=None):
+        solutions[h] = solution
+        df_Results = get_SP_results(h, 5.0, grid=3.0)  # same costs, other grid exchanges
+        df_Results['df_Unit'] = design
+        return df_Results, None
+
+    monkeypatch.setattr(sub_problem_pool, 'execute_SP', execute_SP)
+    MP.extract_selected_SPs(0, 1)
+
+    assert solutions == {'Building1': 'solution_Building1', 'Building2': 'solution_Building2'}
+    for h in ['Building1', 'Building2']:
+        results = MP.results_SP.get_results((0, 1, 1, 1, h))
+        assert 'df_Unit' not in results and results['df_Grid_t']['Grid_supply'].sum() == 1.0
+
+
+def test_failed_extraction(master_problem, monkeypatch):
+    MP = master_problem(DW_params={'lazy_extraction': True})
+    MP.get_SP_data_to_send = lambda h: None
+    MP.iter = 1
+    MP.results_SP.add(0, 1, 1, 1, 'Building1', get_SP_results('Building1', 5.0, ('Building1', {'Objective': 'TOTEX'}, {})))
+    index = pd.MultiIndex.from_tuples([(1, 'Building1')], names=['FeasibleSolution', 'Hub'])
+    MP.results_MP = {0: {1: {1: {'df_DW': pd.DataFrame({'lambda': [1]}, index=index)}}}}
+
+    def execute_SP(*args):
+        raise Exception('Sub problem did not converge')
+
+    monkeypatch.setattr(sub_problem_pool, 'execute_SP', execute_SP)
+    MP.extract_selected_SPs(0, 1)
+    assert 'SP_inputs' in MP.results_SP.get_results((0, 1, 1, 1, 'Building1'))
+
+
+def test_column_results(monkeypatch):
+    monkeypatch.setattr(sub_problem_pool.write_results, 'get_df_Results_from_SP',
+                        lambda ampl, scenario, method, buildings_data, extraction: {'extraction': extraction})
+    monkeypatch.setattr(sub_problem_pool.write_results, 'get_SP_design', lambda ampl: 'design')
+    SP_inputs = ('Building1', {'Objective': 'TOTEX'}, {})
+
+    df_Results = sub_problem_pool.get_SP_results(None, {}, {}, {}, 'column', SP_inputs)
+    assert df_Results == {'extraction': 'column', 'SP_inputs': SP_inputs, 'SP_design': 'design'}
+    assert sub_problem_pool.get_SP_results(None, {}, {}, {}, 'full', SP_inputs) == {'extraction': 'full'}
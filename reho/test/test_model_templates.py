@@ -0,0 +1,73 @@
+import os
+
+import pandas as pd
+
+import reho.model.sub_problem as sub_problem
+from reho.model.sub_problem import SubProblem, get_model_template, pop_model_template_counts
+from reho.paths import path_to_ampl_model, path_to_units, path_to_units_storage
+
+
+def get_SP(unit_types, use_pv_orientation=False):
+    SP = SubProblem.__new__(SubProblem)
+    SP.infrastructure_sp = type('Infrastructure', (), {'UnitTypes': unit_types})()
+    SP.method_sp = {'print_logs': False, 'use_pv_orientation': use_pv_orientation, 'use_Storage_Interperiod': False}
+    SP.solver = 'gurobi'
+    return SP
+
+
+def test_model_files():
+    files = get_SP(pd.Index(['PV', 'Battery', 'DHN_hex']), use_pv_orientation=True).get_model_files()
+    assert files == ((path_to_ampl_model, 'sub_problem.mod'), (path_to_units, 'DHN_HEX.mod'), (path_to_units, 'DHN_pipes.mod'),
+                     (path_to_units, 'pv_orientation.mod'), (path_to_units_storage, 'battery.mod'), (path_to_ampl_model, 'scenario.mod'))
+
+
+def test_model_template(monkeypatch):
+    monkeypatch.setattr(sub_problem, '_model_templates', dict())
+    pop_model_template_counts()
+    for unit_types in [['PV', 'Battery'], ['Battery', 'PV'], ['HeatPump']]:
+        SP = get_SP(pd.Index(unit_types))
+        template = get_model_template(SP.get_ampl_options(), SP.get_model_files())
+
+    assert template.startswith('option solution_round 11;')
+    with open(os.path.join(path_to_units, 'heatpump.mod')) as f:
+        assert f.read() in template
+    assert pop_model_template_counts() == {'hits': 1, 'misses': 2}
+    assert pop_model_template_counts() == {'hits': 0, 'misses': 0}
+
+
+def test_model_templates_size(monkeypatch):
+    monkeypatch.setattr(sub_problem, '_model_templates', dict())
+    monkeypatch.setattr(sub_problem, 'model_templates_size', 2)
+    pop_model_template_counts()
+    for statement in ['first', 'second', 'third', 'second', 'first']:
+        get_model_template((), ((None, statement),))
+
+    assert list(sub_problem._model_templates) == [((), ((None, 'third'),)), ((), ((None, 'first'),))]
+    assert pop_model_template_counts() == {'hits': 1, 'misses': 4}
+
+
+class CountingPool:
+    def __init__(self):
+        self.calls = []
+
+    def execute_on_all_workers(self, fn, *args):
+        self.calls.append(fn.__name__)
+        return [fn(*args)]
+
+    def close(self):
+        pass
+
+
+def test_collect_model_template_counts(master_problem):
+    MP = master_problem()
+    MP.pool = pool = CountingPool()
+    MP.ampl_MP = None
+    pop_model_template_counts()
+    sub_problem._model_template_counts.update(hits=3, misses=1)
+
+    # without profiling, the workers are not queried after each optimization but only when closing
+    MP.collect_stage_profile()
+    assert pool.calls == []
+    MP.close()
+    assert pool.calls == ['pop_model_template_counts']
+    assert MP.model_template_counts == {'hits': 3, 'misses': 1, 'hit_rate': 0.75}
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+
+from reho.model.sub_problem import index_profiles, send_parameters_to_ampl
+
+
+class RecordingAmpl:
+
+    def __init__(self):
+        self.calls = []
+
+    def getParameter(self, name):
+        ampl = self
+
+        class Parameter:
+            def setValues(self, values):
+                ampl.calls.append(('setValues', name, values))
+
+        return Parameter()
+
+    def setData(self, df):
+        self.calls.append(('setData', list(df.columns), df))
+
+    def eval(self, statements):
+        self.calls.append(('eval', statements))
+
+
+def test_send_parameters_to_ampl():
+    index = pd.MultiIndex.from_product([['Electricity'], [1, 2], [1, 2]])
+    GWP = pd.Series([1.0, 2.0, 3.0, 4.0], index=index)
+    units = pd.DataFrame({'Units_Fmin': [0.0, 1.0], 'Units_Fmax': [10.0, 20.0]}, index=['PV', 'Battery'])
+    parameters = {'GWP_supply': GWP, 'Domestic_electricity': np.array([1, 2, 3]), 'EMOO_CAPEX': 2, 'GWP_demand': GWP,
+                  'Units_Parameters': units, 'ERA': {'Building1': 100}, 'EMOO_OPEX': 0.5, 'Units_Fmax': np.array([5.0, 5.0])}
+    ampl = RecordingAmpl()
+    send_parameters_to_ampl(ampl, parameters)
+
+    calls = {call[1] if call[0] != 'setData' else tuple(call[1]): call for call in ampl.calls}
+    assert len(ampl.calls) == 6
+    assert calls['Domestic_electricity'][2].dtype == float
+    assert ('eval', 'let EMOO_CAPEX := 2.0; let EMOO_OPEX := 0.5;') in ampl.calls
+    # the Series with the same index are sent together, with their own names
+    pd.testing.assert_series_equal(calls[('GWP_supply', 'GWP_demand')][2]['GWP_demand'], GWP.rename('GWP_demand'))
+    # Units_Fmax is given again after Units_Parameters: the last value is kept
+    assert ('Units_Fmin',) in calls
+    assert list(calls['Units_Fmax'][2]) == [5.0, 5.0]
+
+
+def test_index_profiles():
+    time_end = ((1, 2), (2, 1))
+    parameters = {'Domestic_electricity': np.arange(6), 'HeatGains': np.ones(6), 'SolarGains': np.zeros(6), 'T_ext': np.array([1.0, 2.0, 3.0]),
+                  'I_global': np.zeros(3), 'DHW_flowrate': np.ones(4), 'Sin_a': np.ones(6)}
+    ampl = RecordingAmpl()
+    send_parameters_to_ampl(ampl, index_profiles(parameters, np.array(['Building1', 'Building2']), time_end))
+
+    # the profiles sharing an index are sent together, the arrays of another length or another parameter one by one
+    calls = {call[1] if call[0] != 'setData' else tuple(call[1]): call for call in ampl.calls}
+    assert len(ampl.calls) == 4
+    df = calls[('Domestic_electricity', 'HeatGains', 'SolarGains')][2]
+    assert df.index.tolist() == [('Building1', 1, 1), ('Building1', 1, 2), ('Building1', 2, 1), ('Building2', 1, 1), ('Building2', 1, 2),
+                                 ('Building2', 2, 1)]
+    assert df['Domestic_electricity'].tolist() == [0, 1, 2, 3, 4, 5]
+    assert calls[('T_ext', 'I_global')][2]['T_ext'].loc[(2, 1)] == 3.0
+    assert {'DHW_flowrate', 'Sin_a'} <= set(calls)
+    assert isinstance(parameters['HeatGains'], np.ndarray)
@@ -0,0 +1,119 @@
+import logging
+
+import pandas as pd
+
+from reho.model.postprocessing.results_store import SubProblemResults
+from reho.model.reho import REHO, select_pareto_segments
+
+
+class ParetoModel(REHO):
+    """
+    REHO without optimization: the results of a Pareto point are its epsilon constraint.
+    """
+
+    def __init__(self, parallel_pareto, checkpoint=None):
+        self.method = {'parallel_pareto': parallel_pareto, 'n_workers_pareto': 2, 'district-scale': False, 'building-scale': False,
+                       'pareto_tolerance': 0, 'checkpoint': checkpoint, 'profile': False}
+        self.scenario = {'Objective': ['CAPEX', 'OPEX']}
+        self.epsilon_constraints = {'EMOO_obj1': []}
+        self.DW_params = {'max_iter': 15}
+        self.logger = logging.getLogger(__name__)
+        self.results = dict()
+        self.pool, self.shared_local_data, self.ampl_MP = None, None, None
+        self.SP_data_sent, self.SP_data_fingerprints = dict(), dict()
+        self.feasible_solutions = 0
+        self.decomposition_position = None
+        self.model_template_counts = {'hits': 0, 'misses': 0, 'hit_rate': None}
+        for attribute in self.pareto_tracking_attributes:
+            setattr(self, attribute, pd.DataFrame())
+
+    def optimize_pareto_point(self, scenario, Scn_ID, Pareto_ID, epsilon_init=None):
+        self.results.setdefault(Scn_ID, dict())[Pareto_ID] = {'EMOO_CAPEX': scenario['EMOO']['EMOO_CAPEX']}
+        self.save_checkpoint()
+
+    def get_pareto_objectives(self, Scn_ID, Pareto_ID):
+        capex = self.results[Scn_ID][Pareto_ID]['EMOO_CAPEX']
+        return capex, 1 / capex
+
+    def close(self):
+        pass
+
+
+def test_optimize_pareto_points():
+    points = [({'EMOO': {'EMOO_CAPEX': 10.0 * i}}, i, None) for i in range(2, 6)]
+    for parallel_pareto in [False, True]:
+        model = ParetoModel(parallel_pareto)
+        model.optimize_pareto_points(points, 'scenario')
+        assert list(model.results['scenario']) == [2, 3, 4, 5]
+        assert [results['EMOO_CAPEX'] for results in model.results['scenario'].values()] == [20, 30, 40, 50]
+
+
+def test_select_pareto_segments():
+    front = {1: (1, 10), 2: (2, 3), 3: (10, 1)}
+    segments, hypervolume_gap = select_pareto_segments(front, n_segments=2)
+    assert segments == [(2, 3), (1, 2)]
+    assert abs(hypervolume_gap - 23 / 81) < 1e-9
+
+
+def test_adaptive_pareto_points():
+    model = ParetoModel(parallel_pareto=False)
+    bounds = {1: {'district_obj1': 1.0, 'district_obj2': 1.0, 'building_obj1': None},
+              6: {'district_obj1': 0.1, 'district_obj2': 10.0, 'building_obj1': None}}
+    model.optimize_adaptive_pareto_points({'EMOO': {}}, 'scenario', range(2, 6), bounds)
+    assert list(model.results['scenario']) == [2, 3, 4, 5]
+    assert abs(model.epsilon_constraints['EMOO_obj1'][0] - 0.55) < 1e-9
+    # the second point refines the steep part of the front
+    assert model.epsilon_constraints['EMOO_obj1'][1] < 0.55
+
+    model = ParetoModel(parallel_pareto=False)
+    model.method['pareto_tolerance'] = 1
+    model.optimize_adaptive_pareto_points({'EMOO': {}}, 'scenario', range(2, 6), bounds)
+    assert 'scenario' not in model.results
+
+
+def test_resume_pareto_points(tmp_path):
+    checkpoint = tmp_path / 'checkpoint.pickle'
+    points = [({'EMOO': {'EMOO_CAPEX': 10.0 * i}}, i, None) for i in range(2, 6)]
+    model = ParetoModel(parallel_pareto=False, checkpoint=checkpoint)
+    model.optimize_pareto_points(points[0:2], 'scenario')
+
+    # the points completed before the interruption are not optimized again
+    model = ParetoModel(parallel_pareto=False)
+    model.load_checkpoint(checkpoint)
+    assert list(model.results['scenario']) == [2, 3]
+    model.results['scenario'][2]['EMOO_CAPEX'] = 'restored'
+    model.optimize_pareto_points(points, 'scenario')
+    assert [results['EMOO_CAPEX'] for results in model.results['scenario'].values()] == ['restored', 30, 40, 50]
+
+
+def get_pareto_point_state(Pareto_ID, first_feasible_solution):
+    """
+    State of a Pareto point with two rounds of feasible solutions for one building.
+    """
+    feasible_solutions = [first_feasible_solution, first_feasible_solution + 1]
+    df_DW = pd.DataFrame({'lambda': [0.0, 1.0]}, index=pd.MultiIndex.from_product([feasible_solutions, ['Building1']], names=['FeasibleSolution', 'Hub']))
+    number_SP_solutions = pd.DataFrame({'Scn_ID': 'scenario', 'Pareto_ID': Pareto_ID, 'Iter': [0, 1], 'House': 'Building1',
+                                        'FeasibleSolution': feasible_solutions, 'MP_solution': [0, 1]})
+    state = {'results': {'df_Performance': pd.DataFrame()}, 'model_template_counts': {'hits': 0, 'misses': 0},
+             'results_SP': [(('scenario', Pareto_ID, i, f, 'Building1'), {'Pareto_ID': Pareto_ID}) for i, f in enumerate(feasible_solutions)],
+             'results_MP': {1: {'df_DW': df_DW}}, 'lower_bounds': {}, 'feasible_solutions': first_feasible_solution + 2,
+             'number_SP_solutions': number_SP_solutions}
+    for attribute in ['stopping_criteria', 'solver_attributes_SP', 'solver_attributes_MP', 'reduced_costs']:
+        state[attribute] = pd.DataFrame()
+    return state
+
+
+def test_merge_pareto_point_states():
+    model = ParetoModel(parallel_pareto=True)
+    model.method['district-scale'] = True
+    model.results_SP, model.results_MP, model.lower_bounds = SubProblemResults(), dict(), dict()
+    model.feasible_solutions = 10
+
+    # both points were solved from the feasible solution 10
+    for Pareto_ID in [2, 3]:
+        model.merge_pareto_point_state('scenario', Pareto_ID, get_pareto_point_state(Pareto_ID, 10), 10)
+
+    assert model.feasible_solutions == 14
+    assert [model.results_SP.get_results(key)['Pareto_ID'] for key in model.results_SP.columns[(13, 'Building1')]] == [3]
+    assert list(model.results_MP['scenario'][3][1]['df_DW'].index.unique('FeasibleSolution')) == [12, 13]
+    assert model.number_SP_solutions['FeasibleSolution'].tolist() == [10, 11, 12, 13]
@@ -0,0 +1,32 @@
+import json
+
+import reho.model.profiler as profiler
+
+
+def test_stage_profile(tmp_path):
+    with profiler.stage('not_recorded'):
+        pass
+    profiler.enable()
+    try:
+        profiler.set_labels(Scn_ID='scenario', Pareto_ID=1, Iter=2, House=None)
+        with profiler.labels(House='Building1'), profiler.stage('solve_SP'):
+            sum(range(1000))
+        profiler.record('SP_roundtrip', 1.5, House='Building1')
+        with profiler.stage('solve_MP'):
+            pass
+        records = profiler.pop_records()
+    finally:
+        profiler.enable(False)
+    assert profiler.pop_records() == []
+
+    df = profiler.get_stage_profile(records)
+    assert list(df['stage']) == ['solve_SP', 'SP_roundtrip', 'solve_MP']
+    assert list(df['House']) == ['Building1', 'Building1', None]  # the labels of a block are restored after it
+    assert (df['Iter'] == 2).all() and (df['wall_time'] >= 0).all()
+    assert df.loc[1, 'wall_time'] == 1.5
+
+    stream = tmp_path / 'profile.jsonl'
+    profiler.stream_records(records, stream)
+    profiler.stream_records(records[0:1], stream)
+    lines = [json.loads(line) for line in stream.read_text().splitlines()]
+    assert [line['stage'] for line in lines] == ['solve_SP', 'SP_roundtrip', 'solve_MP', 'solve_SP']
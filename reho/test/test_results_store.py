@@ -0,0 +1,71 @@
+import copy
+import pickle
+
+import pandas as pd
+import pytest
+
+from reho.model.master_problem import MasterProblem
+from reho.model.postprocessing.results_store import SubProblemResults, rename_house
+
+
+def df_Results(value):
+    df_Performance = pd.DataFrame({'Costs_op': [value, 2 * value]}, index=pd.Index(['Network', 'Building1'], name='Hub'))
+    return {'df_Performance': df_Performance}
+
+
+@pytest.fixture
+def results_SP():
+    results_SP = SubProblemResults()
+    results_SP.add(0, 1, 0, 0, 'Building1', df_Results(1))
+    results_SP.add(0, 1, 0, 0, 'Building2', df_Results(2))
+    results_SP.add(0, 1, 1, 1, 'Building1', df_Results(3))
+    return results_SP
+
+
+def test_combined_as_nested_dict(results_SP):
+    nested = {scn: results_SP[scn] for scn in results_SP}
+    expected = MasterProblem.return_combined_SP_results(nested, 'df_Performance')
+    pd.testing.assert_frame_equal(results_SP.combined('df_Performance'), expected)
+
+    results_SP.add(0, 2, 0, 2, 'Building2', df_Results(4))
+    expected = MasterProblem.return_combined_SP_results({0: results_SP[0]}, 'df_Performance')
+    pd.testing.assert_frame_equal(results_SP.combined('df_Performance'), expected)
+
+
+def test_replace(results_SP):
+    results_SP.combined('df_Performance')
+    results_SP.add(0, 1, 0, 0, 'Building2', df_Results(5))
+    results_SP.add(0, 1, 2, 2, 'Building1', df_Results(6))
+    nested = {scn: results_SP[scn] for scn in results_SP}
+    expected = MasterProblem.return_combined_SP_results(nested, 'df_Performance')
+    pd.testing.assert_frame_equal(results_SP.combined('df_Performance'), expected)
+    assert len(results_SP.keys_list) == 4
+    assert results_SP.last_key(0, 1, 'Building1') == (0, 1, 2, 2, 'Building1')
+
+
+def test_select(results_SP):
+    df = results_SP.select('df_Performance', [(1, 'Building1'), (0, 'Building2')])
+    assert list(df.index.unique('FeasibleSolution')) == [1, 0]
+    assert df.xs('Network', level='Hub')['Costs_op'].tolist() == [3, 2]
+
+
+def test_pickle(results_SP):
+    results = pickle.loads(pickle.dumps(results_SP))
+    assert results.keys_list == results_SP.keys_list
+    assert results[0][1][1][1]['Building1']['df_Performance'].equals(results_SP[0][1][1][1]['Building1']['df_Performance'])
+    assert SubProblemResults(dict(results)).keys_list == results_SP.keys_list
+
+
+def test_copy(results_SP):
+    for results in [copy.copy(results_SP), copy.deepcopy(results_SP)]:
+        assert results.keys_list == results_SP.keys_list
+        assert results.columns == results_SP.columns
+        pd.testing.assert_frame_equal(results.combined('df_Performance'), results_SP.combined('df_Performance'))
+
+
+def test_rename_house():
+    df_Unit = pd.DataFrame({'Units_Mult': [1.0, 2.0]}, index=pd.Index(['PV_Building1', 'HeatPump_Building1'], name='Unit'))
+    results = rename_house(dict(df_Results(1), df_Unit=df_Unit), 'Building1', 'Building12')
+    assert list(results['df_Performance'].index) == ['Network', 'Building12']
+    assert list(results['df_Unit'].index) == ['PV_Building12', 'HeatPump_Building12']
+    assert list(df_Unit.index) == ['PV_Building1', 'HeatPump_Building1']
@@ -0,0 +1,23 @@
+import pandas as pd
+import pytest
+
+
+def test_get_dual_change(master_problem):
+    MP = master_problem()
+    MP.infrastructure.Set['HousesOfLayer']['NaturalGas'] = ['Building2']
+    index = pd.MultiIndex.from_product([['Electricity', 'NaturalGas'], [1], [1, 2]], names=['Layer', 'Period', 'Time'])
+    duals_before = {'pi': pd.Series([0.2, 0.2, 0.1, 0.1], index=index), 'beta': pd.Series([1.0, 0.0])}
+    duals = {'pi': pd.Series([0.2, 0.21, 0.1, 0.2], index=index), 'beta': pd.Series([1.0, 0.0])}
+    assert MP.get_dual_change(duals_before, duals, 'Building1') == pytest.approx(0.05)
+    assert MP.get_dual_change(duals_before, duals, 'Building2') == pytest.approx(0.5)
+
+
+def test_reuse_SP_solutions(toy_decomposition):
+    DW_params = {'dual_change_tolerance': 0.01, 'threshold_subP_value': 1, 'iter_no_improv': 2}  # no termination on the reduced costs
+    toy = toy_decomposition({'Building1': [10, 8], 'Building2': [5, 6]}, DW_params=DW_params)
+    assert toy.run() == 3
+    # the dual values of the third iteration did not change: the last solutions are reused
+    assert toy.n_solved == {'Building1': 3, 'Building2': 3}
+    assert toy.MP.stopping_criteria['skipped_SPs'].tolist() == [0, 0, 2]
+    assert toy.MP.stopping_criteria['max_iter_no_improv_reached'].iloc[-1]
+    assert len(toy.MP.results_MP[0][1][3]['df_DW']) == 8
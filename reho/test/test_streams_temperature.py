@@ -0,0 +1,31 @@
+from types import SimpleNamespace
+
+import pandas as pd
+
+from reho.model.sub_problem import SubProblem
+
+
+class TimeEndAmpl:
+
+    def getParameter(self, name):
+        df = pd.DataFrame({'TimeEnd': [2, 1]}, index=[1, 2])
+        return SimpleNamespace(getValues=lambda: SimpleNamespace(toPandas=lambda: df))
+
+
+def test_streams_temperature():
+    SP = SubProblem.__new__(SubProblem)
+    units = [{'name': 'HeatPump', 'StreamsOfUnit': ['c1', 'c2'], 'stream_Tout': [35.0, 55.0], 'stream_Tin': [30.0, 50.0]}]
+    SP.infrastructure_sp = SimpleNamespace(houses={'Building1': {'units': units}}, StreamsOfBuilding={'Building1': ['Building1_h1']})
+    SP.parameters_to_ampl = dict()
+    SP.set_streams_temperature(TimeEndAmpl())
+
+    df_Streams_T = SP.parameters_to_ampl['streams_T']
+    assert list(df_Streams_T.index.names) == ['Streams', 'Period', 'Time']
+    assert list(df_Streams_T.index) == [(stream, p, t) for stream in ['HeatPump_Building1_c1', 'HeatPump_Building1_c2', 'Building1_h1']
+                                        for p, t in [(1, 1), (1, 2), (2, 1)]]
+    assert list(df_Streams_T['Streams_Tout']) == [35.0] * 3 + [55.0] * 3 + [40.0] * 3
+    assert list(df_Streams_T['Streams_Tin']) == [30.0] * 3 + [50.0] * 3 + [50.0] * 3
+
+    # the table is reused by the next SP of the same building
+    SP.set_streams_temperature(TimeEndAmpl())
+    assert SP.parameters_to_ampl['streams_T'] is df_Streams_T
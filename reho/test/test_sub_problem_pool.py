@@ -0,0 +1,122 @@
+import gc
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import reho.model.actors_problem as actors_problem
+import reho.model.sub_problem_pool as sub_problem_pool
+from reho.model.sub_problem_pool import SharedLocalData, SubProblemPool, collect_results, order_tasks
+
+
+def square(x):
+    if x < 0:
+        raise ValueError('negative value')
+    return x ** 2
+
+
+class ActorsModel:
+    def __init__(self, local_data):
+        self.local_data = local_data
+
+    def run_actors_optimization(self, samples, ids):
+        return sum(self.local_data) + ids
+
+
+def read_local_data(local_data):
+    return local_data['irradiation'].values.sum(), local_data['irradiation'].values.flags.writeable, local_data['location']
+
+
+def test_order_tasks():
+    weights = {'Building1': 100, 'Building2': 400, 'Building3': 200}
+    assert order_tasks(weights.keys(), weights) == ['Building2', 'Building3', 'Building1']
+    assert order_tasks(['Building1', 'Building2']) == ['Building1', 'Building2']
+
+
+def test_pool_balances_workers():
+    weights = {'Building1': 400, 'Building2': 300, 'Building3': 200, 'Building4': 100}
+    pool = SubProblemPool(list(weights), n_workers=2, weights=weights)
+    assert pool.affinity == {'Building1': 0, 'Building2': 1, 'Building3': 1, 'Building4': 0}
+    pool.close()
+
+
+def test_collect_results():
+    results = {}
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        futures = {executor.submit(square, x): x for x in [1, 2, -3]}
+        with pytest.raises(Exception, match='Failed for -3'):
+            collect_results(futures, results.__setitem__)
+    assert results == {1: 1, 2: 4}
+
+    results = {}
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        futures = {executor.submit(square, x): x for x in [1, -3]}
+        errors = collect_results(futures, results.__setitem__, raise_errors=False)
+    assert results == {1: 1} and list(errors) == [-3]
+
+
+def test_actors_problem_sent_once():
+    pool = SubProblemPool(['Building1', 'Building2'], n_workers=2)
+    pool.execute_on_all_workers(actors_problem.set_actors_problem, ActorsModel(list(range(10))))
+    assert [pool.submit(ids, actors_problem.run_actors_sample, None, ids).result() for ids in range(4)] == [45, 46, 47, 48]
+    assert [pool.get_worker(ids) for ids in range(4)] == [0, 1, 0, 1]
+    pool.execute_on_all_workers(actors_problem.set_actors_problem, None)
+    with pytest.raises(AttributeError):
+        pool.submit(0, actors_problem.run_actors_sample, None, 0).result()
+    pool.close()
+
+
+def test_shared_local_data():
+    local_data = {'irradiation': pd.DataFrame(np.ones((200, 1000))), 'location': 'Geneva'}
+    shared_local_data = SharedLocalData(local_data)
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        assert executor.submit(read_local_data, shared_local_data).result() == (200000, False, 'Geneva')
+    shared_local_data.close()
+
+
+def test_release_without_close():
+    shared_local_data = SharedLocalData({'irradiation': np.ones((200, 1000))})
+    name = shared_local_data.descriptor['irradiation'][1]
+    pool = SubProblemPool(['Building1'], n_workers=1)
+    assert pool.submit('Building1', square, 3).result() == 9
+    executor = pool.executors[0]
+
+    del shared_local_data, pool
+    gc.collect()
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=name)
+    with pytest.raises(RuntimeError):
+        executor.submit(square, 3)
+
+
+@pytest.mark.parametrize('parallel', [True, False])
+def test_send_SP_data_once(master_problem, monkeypatch, parallel):
+    MP = master_problem(method={'parallel_computation': parallel})
+    fingerprints = {'Building1': 'a'}
+    MP.get_SP_data_fingerprint = lambda h: fingerprints[h]
+    MP.get_SP_data = lambda h: {'house': h}
+    monkeypatch.setattr(sub_problem_pool, '_persistent_SPs', dict())
+
+    def send():
+        SP_data = MP.get_SP_data_to_send('Building1')
+        if SP_data is not None and not parallel:
+            sub_problem_pool._persistent_SPs['Building1'] = {'data': SP_data}
+        return SP_data
+
+    assert send() == {'house': 'Building1', 'fingerprint': 'a'}
+    assert send() is None
+    # the data is kept from one decomposition to the next, unless the inputs change
+    MP.release_persistent_SPs()
+    assert send() is None
+    fingerprints['Building1'] = 'b'
+    assert send() is None  # fingerprint computed once per decomposition
+    MP.release_persistent_SPs()
+    assert send()['fingerprint'] == 'b'
+    MP.release_persistent_SPs(keep_data=False)
+    assert send() is not None
+    if not parallel:
+        # the data of the process was replaced by another instance
+        sub_problem_pool._persistent_SPs['Building1'] = {'data': {'fingerprint': 'c'}}
+        assert send() is not None
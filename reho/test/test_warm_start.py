@@ -0,0 +1,27 @@
+import pandas as pd
+
+from reho.test.conftest import get_SP_attributes
+
+
+def test_warm_start_decomposition(master_problem):
+    MP = master_problem(method={'include_all_solutions': False}, DW_params={'warm_start_pareto': True})
+    MP.get_dual_values_SPs = lambda Scn_ID, Pareto_ID, iter, House, dual_variable: (Pareto_ID, iter, dual_variable)
+
+    # Pareto point 1: Building1 uses the solutions 0 and 1, Building2 the solution 1
+    for f in range(3):
+        for h in ['Building1', 'Building2']:
+            MP.feasible_solutions = f
+            MP.add_df_Results_SP(0, 1, f, h, {'solution': (f, h)}, get_SP_attributes(solving_time=10.0))
+    index = pd.MultiIndex.from_product([range(3), ['Building1', 'Building2']], names=['FeasibleSolution', 'Hub'])
+    df_DW = {1: pd.DataFrame({'lambda': [0.5, 0, 0.5, 1, 0, 0]}, index=index), 2: pd.DataFrame({'lambda': [0, 0, 1, 1, 0, 0]}, index=index)}
+    MP.results_MP = {0: {1: {iter: {'df_DW': df} for iter, df in df_DW.items()}}}
+    MP.feasible_solutions = 3
+
+    assert not MP.warm_start_decomposition(0, 3)  # no neighbour solved
+    assert MP.warm_start_decomposition(0, 2)
+    assert MP.feasible_solutions == 5
+    seeds = {(key[3], key[4]): MP.results_SP.get_results(key)['solution'] for key in MP.results_SP.keys_list if key[1] == 2}
+    assert seeds == {(3, 'Building1'): (0, 'Building1'), (3, 'Building2'): (1, 'Building2'),
+                     (4, 'Building1'): (1, 'Building1'), (4, 'Building2'): (1, 'Building2')}
+    assert MP.solver_attributes_SP.xs(2, level='Pareto_ID')['solving_time'].sum() == 0
+    assert MP.warm_start_duals['pi'] == (1, 1, 'pi')  # last continuous MP
@@ -0,0 +1,82 @@
+import pandas as pd
+
+from reho.model.postprocessing.write_results import get_df_Results_from_SP
+
+
+class AmplData:
+
+    def __init__(self, df):
+        self.df = df
+
+    def toPandas(self):
+        return self.df
+
+    def getValues(self):
+        return self
+
+    def toList(self):
+        return self.df.iloc[:, 0].tolist()
+
+
+class FakeAmpl:
+    """
+    Returns the value 1 for all the entities of the column results of two buildings, and records the calls to getData.
+    """
+
+    def __init__(self):
+        houses, periods = ['Building1', 'Building2'], [(p, t) for p in [1, 2] for t in [1, 2]]
+        self.indices = {'House': houses, 'Period': [1, 2], 'PeriodTime': periods,
+                        'LayerHouse': [('Electricity', h) for h in houses],
+                        'LayerHousePeriodTime': [('Electricity', h, *pt) for h in houses for pt in periods],
+                        'HouseLayerPeriodTime': [(h, 'Electricity', *pt) for h in houses for pt in periods],
+                        'HousePeriodTime': [(h, *pt) for h in houses for pt in periods],
+                        'LayerPeriodTime': [('Electricity', *pt) for pt in periods]}
+        self.calls = []
+
+    def get_index(self, name):
+        if name in ['Costs_House_op', 'Costs_House_inv', 'Costs_House_rep', 'Costs_House_cft', 'GWP_house_op', 'GWP_house_constr']:
+            return 'House'
+        if name in ['dp', 'TimeEnd', 'dt']:
+            return 'Period'
+        if name in ['T_ext', 'I_global']:
+            return 'PeriodTime'
+        if name == 'Costs_grid_connection_House':
+            return 'LayerHouse'
+        if name in ['Grid_demand', 'Grid_supply']:
+            return 'LayerHousePeriodTime'
+        if name in ['Cost_supply', 'Cost_demand']:
+            return 'HouseLayerPeriodTime'
+        if name == 'Domestic_electricity':
+            return 'HousePeriodTime'
+        if name in ['Network_demand', 'Network_supply', 'Cost_supply_network', 'Cost_demand_network', 'GWP_supply', 'GWP_demand']:
+            return 'LayerPeriodTime'
+        return None  # scalars
+
+    def getData(self, *names):
+        self.calls.append(names)
+        index = {self.get_index(name) for name in names}
+        assert len(index) == 1  # a single indexing set per call
+        index = index.pop()
+        if index is None:
+            return AmplData(pd.DataFrame({name: [1.0] for name in names}))
+        index = pd.Index(self.indices[index], tupleize_cols=False)
+        return AmplData(pd.DataFrame({name: 1.0 for name in names}, index=index))
+
+    def getParameter(self, name):
+        return AmplData(pd.DataFrame({name: [1.0]}))
+
+
+def test_column_extraction():
+    ampl = FakeAmpl()
+    method = {'print_logs': False, 'district-scale': False, 'actors_problem': False, 'save_lca': False}
+    df_Results = get_df_Results_from_SP(ampl, {'Objective': 'TOTEX'}, method, None, extraction='column')
+
+    assert list(df_Results) == ['df_Performance', 'df_Grid_t', 'df_Time']
+    assert len(ampl.calls) == 10
+    df_Performance = df_Results['df_Performance']
+    assert list(df_Performance.index) == ['Building1', 'Building2', 'Network']
+    assert df_Performance.loc['Network', 'Costs_ft'] == 2  # sum of the buildings
+    assert df_Performance.loc['Network', 'Objective'] == -1
+    df_Grid_t = df_Results['df_Grid_t']
+    assert list(df_Grid_t.index.unique('Hub')) == ['Building1', 'Building2', 'Network']
+    assert (df_Grid_t.xs('Network', level='Hub')['Uncontrollable_load'] == 2).all()
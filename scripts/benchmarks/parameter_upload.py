@@ -0,0 +1,129 @@
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from reho.model.sub_problem import index_profiles, send_parameters_to_ampl
+
+__doc__ = """
+Compares the upload of the parameters of a sub-problem to AMPL one by one (former implementation of
+``SubProblem.send_parameters_and_sets_to_ampl``) with ``send_parameters_to_ampl``, for 1, 10 and 100 buildings.
+
+Usage: python parameter_upload.py [number of repetitions]
+       python parameter_upload.py count
+
+The first form times both uploads and needs an AMPL installation. The second one only counts the calls to the AMPL API,
+without AMPL: 25 one by one and 14 in bulk, for any number of buildings. No timing has been measured yet.
+"""
+
+periods, timesteps = 12, 24
+layers = ['Electricity', 'NaturalGas', 'Oil', 'Wood', 'Data', 'Heat']
+units = ['PV', 'Battery', 'HeatPump', 'ElectricalHeater', 'NG_Boiler', 'WaterTankSH', 'WaterTankDHW']
+profiles = ['Domestic_electricity', 'HeatGains', 'SolarGains', 'DHW_flowrate']
+buildings_parameters = ['ERA', 'SolarRoofArea', 'U_h', 'HeatCapacity', 'T_comfort_min_0', 'Th_supply_0', 'Th_return_0', 'Tc_supply_0', 'Tc_return_0']
+units_parameters = ['Units_Fmin', 'Units_Fmax', 'Cost_inv1', 'Cost_inv2', 'GWP_unit1', 'GWP_unit2', 'lifetime']
+scalars = ['EMOO_CAPEX', 'EMOO_OPEX', 'EMOO_GWP', 'EMOO_TOTEX', 'EMOO_grid', 'Network_ext', 'TransformerCapacity']
+
+
+time_end = tuple((p, timesteps) for p in range(1, periods + 1))
+
+
+class CallCounter:
+    """
+    Replaces AMPL to count the calls sending the parameters.
+    """
+
+    def __init__(self):
+        self.calls = 0
+
+    def getParameter(self, name):
+        return self
+
+    def setValues(self, values):
+        self.calls += 1
+
+    def setData(self, df):
+        self.calls += 1
+
+    def eval(self, statements):
+        self.calls += 1
+
+
+def get_model(n_buildings):
+    from amplpy import AMPL
+
+    houses = ['Building' + str(i + 1) for i in range(n_buildings)]
+    ampl = AMPL()
+    ampl.eval('set House; set Period := 1..' + str(periods) + '; set Time{p in Period} := 1..' + str(timesteps) + ';'
+              'set Layers; set Units;')
+    ampl.eval(''.join('param ' + p + '{House, p in Period, t in Time[p]};' for p in profiles))
+    ampl.eval(''.join('param ' + p + '{House};' for p in buildings_parameters))
+    ampl.eval(''.join('param ' + p + '{House, Layers, p in Period, t in Time[p]};' for p in ['Cost_supply', 'Cost_demand']))
+    ampl.eval(''.join('param ' + p + '{Layers, p in Period, t in Time[p]};' for p in ['GWP_supply', 'GWP_demand']))
+    ampl.eval(''.join('param ' + p + '{Units};' for p in units_parameters))
+    ampl.eval(''.join('param ' + p + ';' for p in scalars))
+    ampl.getSet('House').setValues(houses)
+    ampl.getSet('Layers').setValues(layers)
+    ampl.getSet('Units').setValues([unit + '_' + h for unit in units for h in houses])
+    return ampl, houses
+
+
+def get_parameters(houses):
+    rng = np.random.default_rng(0)
+    n = len(houses) * periods * timesteps
+    parameters = {p: rng.random(n) for p in profiles}
+    parameters.update({p: {h: rng.random() for h in houses} for p in buildings_parameters})
+    index = pd.MultiIndex.from_product([houses, layers, range(1, periods + 1), range(1, timesteps + 1)])
+    parameters.update({p: pd.Series(rng.random(len(index)), index=index) for p in ['Cost_supply', 'Cost_demand']})
+    index = pd.MultiIndex.from_product([layers, range(1, periods + 1), range(1, timesteps + 1)])
+    parameters['GWP_supply'] = pd.Series(rng.random(len(index)), index=index)
+    parameters['GWP_demand'] = parameters['GWP_supply']
+    parameters['Units_Parameters'] = pd.DataFrame(rng.random((len(units) * len(houses), len(units_parameters))), columns=units_parameters,
+                                                  index=[unit + '_' + h for unit in units for h in houses])
+    parameters.update({p: float(i) for i, p in enumerate(scalars)})
+    return parameters
+
+
+def send_parameters_one_by_one(ampl, parameters):
+    for i in parameters:
+        if isinstance(parameters[i], np.ndarray):
+            ampl.getParameter(i).setValues(parameters[i])
+        elif isinstance(parameters[i], pd.DataFrame):
+            ampl.setData(parameters[i])
+        elif isinstance(parameters[i], pd.Series):
+            ampl.setData(pd.DataFrame(parameters[i].rename(i)))
+        elif isinstance(parameters[i], dict):
+            ampl.getParameter(i).setValues(parameters[i])
+        elif isinstance(parameters[i], float):
+            ampl.getParameter(i).setValues([parameters[i]])
+
+
+def send_parameters_in_bulk(ampl, parameters, houses):
+    send_parameters_to_ampl(ampl, index_profiles(parameters, houses, time_end))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'count':
+        for n_buildings in [1, 10, 100]:
+            houses = ['Building' + str(i + 1) for i in range(n_buildings)]
+            parameters = get_parameters(houses)
+            counters = [CallCounter(), CallCounter()]
+            send_parameters_one_by_one(counters[0], parameters)
+            send_parameters_in_bulk(counters[1], parameters, houses)
+            print(str(n_buildings) + ' buildings: one by one ' + str(counters[0].calls) + ' calls, bulk ' + str(counters[1].calls) + ' calls')
+        sys.exit()
+
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    for n_buildings in [1, 10, 100]:
+        ampl, houses = get_model(n_buildings)
+        parameters = get_parameters(houses)
+        times = dict()
+        for name, send in [('one by one', send_parameters_one_by_one), ('bulk', lambda ampl, parameters: send_parameters_in_bulk(ampl, parameters, houses))]:
+            start = time.perf_counter()
+            for _ in range(repetitions):
+                send(ampl, parameters)
+            times[name] = (time.perf_counter() - start) / repetitions
+        ampl.close()
+        print(str(n_buildings) + ' buildings: ' + ', '.join(name + ' ' + str(round(t * 1000, 1)) + ' ms' for name, t in times.items()) +
+              ' (speed-up ' + str(round(times['one by one'] / times['bulk'], 2)) + ')')